@@ -22,6 +22,31 @@ class Settings(BaseSettings):
     
     # Database - PostgreSQL only
     DATABASE_URL: str = "postgresql://localhost:5432/ndx"
+    # 连接池（app/utils/engines.py 中按 URL 共享，每个进程每个 URL 一个池）
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    # Background jobs
+    # inprocess: 在 API 进程内启动任务执行线程；external: 由单独的 `python job_worker.py` 进程执行
+    JOB_WORKER_MODE: str = "inprocess"
+    JOB_WORKER_CONCURRENCY: int = 2
+    JOB_MAX_ATTEMPTS: int = 3       # 执行器心跳超时后最多重新排队到第几次领取
+
+    # Daily scheduler (scheduler.py)
+    # 每个交易日收盘后为所有用户执行: 补齐定投 -> 抓取净值 -> 确认交易；多副本时通过 advisory lock 只由一个副本执行
+    SCHEDULER_ENABLED: bool = False
+    SCHEDULER_RUN_AT: str = "21:30"
+    SCHEDULER_TIMEZONE: str = "Asia/Shanghai"
+    SCHEDULER_POLL_SECONDS: int = 60
+    SCHEDULER_MAX_ATTEMPTS: int = 3
+
+    # Trading calendar (tradeDate.py)
+    # 用于从净值推断交易日的宽基指数基金，逗号分隔；进程内日历缓存的刷新检查间隔（秒）
+    CALENDAR_BENCHMARK_FUNDS: str = "000051,110020,050002,510300"
+    CALENDAR_REFRESH_SECONDS: int = 300
 
     # Admin bootstrap (optional)
     # If provided, the app will auto-create this admin on first start
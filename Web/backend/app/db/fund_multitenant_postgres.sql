@@ -20,6 +20,10 @@ CREATE TABLE IF NOT EXISTS transactions (
 CREATE INDEX IF NOT EXISTS idx_transactions_user_date
 ON transactions(user_id, transaction_date DESC, transaction_id DESC);
 
+-- 待确认记录（shares 为空）按基金查找，用于净值写入后的增量确认
+CREATE INDEX IF NOT EXISTS idx_transactions_pending
+ON transactions(fund_code, transaction_date) WHERE shares IS NULL;
+
 CREATE TABLE IF NOT EXISTS fund_overview (
     fund_id BIGSERIAL PRIMARY KEY,
     user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
@@ -53,6 +57,30 @@ CREATE TABLE IF NOT EXISTS fund_nav_history (
 CREATE INDEX IF NOT EXISTS idx_fund_nav_history_code_date
 ON fund_nav_history(fund_code, price_date);
 
+-- 每个基金的最新净值（price_date 最新，同日取 fetched_at 最新，再相同取 nav_id 最大），由 fund_nav_history 上的语句级触发器维护，
+-- 视图直接关联此表，不再对整张净值历史表做 DISTINCT ON
+CREATE TABLE IF NOT EXISTS fund_latest_nav (
+    fund_code TEXT PRIMARY KEY,
+    fund_name TEXT NOT NULL,
+    price_date DATE NOT NULL,
+    unit_nav NUMERIC(20,6) NOT NULL,
+    cumulative_nav NUMERIC(20,6),
+    daily_growth_rate NUMERIC(6,3),
+    data_source TEXT,
+    fetched_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 首次创建时从已有净值历史回填（表非空时跳过）
+INSERT INTO fund_latest_nav (fund_code, fund_name, price_date, unit_nav, cumulative_nav, daily_growth_rate,
+                             data_source, fetched_at)
+SELECT DISTINCT ON (fund_code)
+    fund_code, fund_name, price_date, unit_nav, cumulative_nav, daily_growth_rate, data_source, fetched_at
+FROM fund_nav_history
+WHERE NOT EXISTS (SELECT 1 FROM fund_latest_nav)
+ORDER BY fund_code, price_date DESC, fetched_at DESC, nav_id DESC
+ON CONFLICT (fund_code) DO NOTHING;
+
 -- Auto-invest plans table
 CREATE TABLE IF NOT EXISTS auto_invest_plans (
     plan_id BIGSERIAL PRIMARY KEY,
@@ -73,7 +101,153 @@ CREATE TABLE IF NOT EXISTS auto_invest_plans (
 CREATE INDEX IF NOT EXISTS idx_auto_invest_user
 ON auto_invest_plans(user_id, enabled);
 
+-- 定投生成的交易记录关联来源计划；删除计划时保留交易，仅解除关联
+ALTER TABLE transactions ADD COLUMN IF NOT EXISTS plan_id BIGINT
+REFERENCES auto_invest_plans(plan_id) ON DELETE SET NULL;
+
+-- 同一计划同一天只生成一条交易，重复或并发执行定投补齐不会产生重复记录
+CREATE UNIQUE INDEX IF NOT EXISTS uq_transactions_plan_date
+ON transactions(user_id, plan_id, transaction_date) WHERE plan_id IS NOT NULL;
+
+-- Background jobs (fetch-nav / update-pending / execute-today)
+CREATE TABLE IF NOT EXISTS background_jobs (
+    job_id BIGSERIAL PRIMARY KEY,
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    job_type TEXT NOT NULL,
+    params JSONB NOT NULL DEFAULT '{}'::jsonb,
+    dedup_key TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued','running','succeeded','failed')),
+    progress_current INTEGER NOT NULL DEFAULT 0,
+    progress_total INTEGER,
+    progress_message TEXT,
+    result JSONB,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    heartbeat_at TIMESTAMP WITH TIME ZONE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+
+-- 同一任务（类型+用户+参数）同时只允许一个排队或运行中的实例
+CREATE UNIQUE INDEX IF NOT EXISTS uq_background_jobs_active
+ON background_jobs(dedup_key) WHERE status IN ('queued','running');
+
+CREATE INDEX IF NOT EXISTS idx_background_jobs_queued
+ON background_jobs(created_at) WHERE status = 'queued';
+
+CREATE INDEX IF NOT EXISTS idx_background_jobs_user
+ON background_jobs(user_id, created_at DESC);
+
+-- 每日流水线（scheduler.py）执行记录：steps 为各步骤的耗时与统计
+CREATE TABLE IF NOT EXISTS scheduler_runs (
+    run_id BIGSERIAL PRIMARY KEY,
+    run_date DATE NOT NULL,
+    status TEXT NOT NULL DEFAULT 'running' CHECK (status IN ('running','succeeded','failed')),
+    triggered_by TEXT NOT NULL DEFAULT 'schedule',
+    worker_id TEXT,
+    steps JSONB NOT NULL DEFAULT '[]'::jsonb,
+    error TEXT,
+    started_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+
+-- 同一天同时只允许一个执行中的记录（advisory lock 之外的兜底）
+CREATE UNIQUE INDEX IF NOT EXISTS uq_scheduler_runs_running
+ON scheduler_runs(run_date) WHERE status = 'running';
+
+CREATE INDEX IF NOT EXISTS idx_scheduler_runs_started
+ON scheduler_runs(started_at DESC);
+
+-- 交易日历：cal_date 是否开市。source: seed（内置节假日）/ nav（由基准基金净值推断）/ manual（人工维护，不会被推断覆盖）
+-- 未记录的日期按 工作日即交易日 处理
+CREATE TABLE IF NOT EXISTS trading_calendar (
+    cal_date DATE PRIMARY KEY,
+    is_trading BOOLEAN NOT NULL,
+    source TEXT NOT NULL DEFAULT 'manual',
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 交易日历的覆盖起点：learn_trading_days 能够可靠识别休市日（至少 min_funds 个基准基金覆盖）的第一天
+-- 单行表；为空时以内置节假日的起点为准
+CREATE TABLE IF NOT EXISTS trading_calendar_coverage (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    coverage_start DATE NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 已尝试修补的中间缺口：数据源始终补不上的日期（停牌、数据源缺页）在冷却期内不再重复抓取
+CREATE TABLE IF NOT EXISTS nav_fill_attempts (
+    fund_code TEXT NOT NULL,
+    data_source TEXT NOT NULL,
+    window_start DATE NOT NULL,
+    window_end DATE NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    attempted_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (fund_code, data_source, window_start, window_end)
+);
+
 -- Trigger functions
+CREATE OR REPLACE FUNCTION trg_trading_calendar_touch()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- 各进程通过 MAX(updated_at) 判断日历是否变化
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION trg_fund_latest_nav_refresh()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- 只重算本条语句涉及的基金（changed_rows 为语句的转换表），每个基金按索引取最新一行
+    INSERT INTO fund_latest_nav (fund_code, fund_name, price_date, unit_nav, cumulative_nav, daily_growth_rate,
+                                 data_source, fetched_at, updated_at)
+    SELECT latest.fund_code, latest.fund_name, latest.price_date, latest.unit_nav, latest.cumulative_nav,
+           latest.daily_growth_rate, latest.data_source, latest.fetched_at, CURRENT_TIMESTAMP
+    FROM (SELECT DISTINCT fund_code FROM changed_rows) f
+    CROSS JOIN LATERAL (
+        SELECT h.* FROM fund_nav_history h
+        WHERE h.fund_code = f.fund_code
+        ORDER BY h.price_date DESC, h.fetched_at DESC, h.nav_id DESC
+        LIMIT 1
+    ) latest
+    ON CONFLICT (fund_code) DO UPDATE
+    SET fund_name = EXCLUDED.fund_name,
+        price_date = EXCLUDED.price_date,
+        unit_nav = EXCLUDED.unit_nav,
+        cumulative_nav = EXCLUDED.cumulative_nav,
+        daily_growth_rate = EXCLUDED.daily_growth_rate,
+        data_source = EXCLUDED.data_source,
+        fetched_at = EXCLUDED.fetched_at,
+        updated_at = EXCLUDED.updated_at
+    -- 最新一行没有变化（例如补写更早日期的净值）时不改写
+    WHERE (fund_latest_nav.fund_name, fund_latest_nav.price_date, fund_latest_nav.unit_nav,
+           fund_latest_nav.cumulative_nav, fund_latest_nav.daily_growth_rate, fund_latest_nav.data_source,
+           fund_latest_nav.fetched_at)
+          IS DISTINCT FROM
+          (EXCLUDED.fund_name, EXCLUDED.price_date, EXCLUDED.unit_nav, EXCLUDED.cumulative_nav,
+           EXCLUDED.daily_growth_rate, EXCLUDED.data_source, EXCLUDED.fetched_at);
+
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM fund_latest_nav l
+        WHERE l.fund_code IN (SELECT fund_code FROM changed_rows)
+          AND NOT EXISTS (SELECT 1 FROM fund_nav_history h WHERE h.fund_code = l.fund_code);
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION trg_fund_latest_nav_truncate()
+RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM fund_latest_nav;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
 CREATE OR REPLACE FUNCTION trg_fund_overview_after_insert()
 RETURNS TRIGGER AS $$
 BEGIN
@@ -151,6 +325,11 @@ $$ LANGUAGE plpgsql;
 CREATE OR REPLACE FUNCTION trg_fund_overview_after_fill()
 RETURNS TRIGGER AS $$
 BEGIN
+    -- 记录以待确认状态插入时不会触发 after_insert，首次确认时补建汇总行
+    INSERT INTO fund_overview (user_id, fund_code, fund_name, total_shares, total_cost, average_buy_nav, first_buy_date)
+    VALUES (NEW.user_id, NEW.fund_code, NEW.fund_name, 0, 0, 0, NEW.transaction_date)
+    ON CONFLICT (user_id, fund_code) DO NOTHING;
+
     UPDATE fund_overview
     SET total_shares = ROUND(total_shares + CASE
             WHEN NEW.transaction_type = '买入' THEN COALESCE(NEW.shares, 0)
@@ -205,6 +384,40 @@ FOR EACH ROW
 WHEN (OLD.shares IS NULL AND NEW.shares IS NOT NULL)
 EXECUTE FUNCTION trg_fund_overview_after_fill();
 
+-- 转换表不能用于多事件触发器，插入/更新/删除各建一个，共用同一个函数
+DROP TRIGGER IF EXISTS trg_fund_latest_nav_after_insert ON fund_nav_history;
+CREATE TRIGGER trg_fund_latest_nav_after_insert
+AFTER INSERT ON fund_nav_history
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION trg_fund_latest_nav_refresh();
+
+DROP TRIGGER IF EXISTS trg_fund_latest_nav_after_update ON fund_nav_history;
+CREATE TRIGGER trg_fund_latest_nav_after_update
+AFTER UPDATE ON fund_nav_history
+REFERENCING NEW TABLE AS changed_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION trg_fund_latest_nav_refresh();
+
+DROP TRIGGER IF EXISTS trg_fund_latest_nav_after_delete ON fund_nav_history;
+CREATE TRIGGER trg_fund_latest_nav_after_delete
+AFTER DELETE ON fund_nav_history
+REFERENCING OLD TABLE AS changed_rows
+FOR EACH STATEMENT
+EXECUTE FUNCTION trg_fund_latest_nav_refresh();
+
+DROP TRIGGER IF EXISTS trg_fund_latest_nav_after_truncate ON fund_nav_history;
+CREATE TRIGGER trg_fund_latest_nav_after_truncate
+AFTER TRUNCATE ON fund_nav_history
+FOR EACH STATEMENT
+EXECUTE FUNCTION trg_fund_latest_nav_truncate();
+
+DROP TRIGGER IF EXISTS trg_trading_calendar_touch ON trading_calendar;
+CREATE TRIGGER trg_trading_calendar_touch
+BEFORE UPDATE ON trading_calendar
+FOR EACH ROW
+EXECUTE FUNCTION trg_trading_calendar_touch();
+
 -- Views
 DROP VIEW IF EXISTS fund_realtime_overview;
 CREATE VIEW fund_realtime_overview AS
@@ -230,16 +443,7 @@ SELECT
     COALESCE(mp.data_source, '') AS data_source,
     fo.last_updated
 FROM fund_overview fo
-LEFT JOIN (
-    SELECT DISTINCT ON (fund_code) 
-        fund_code,
-        price_date,
-        unit_nav,
-        daily_growth_rate,
-        data_source
-    FROM fund_nav_history
-    ORDER BY fund_code, price_date DESC, fetched_at DESC
-) mp ON fo.fund_code = mp.fund_code;
+LEFT JOIN fund_latest_nav mp ON fo.fund_code = mp.fund_code;
 
 DROP VIEW IF EXISTS profit_summary;
 CREATE VIEW profit_summary AS
@@ -256,11 +460,5 @@ SELECT
         ELSE 0 
     END AS total_return_rate
 FROM fund_overview fo
-LEFT JOIN (
-    SELECT DISTINCT ON (fund_code) 
-        fund_code,
-        unit_nav
-    FROM fund_nav_history
-    ORDER BY fund_code, price_date DESC, fetched_at DESC
-) mp ON fo.fund_code = mp.fund_code
+LEFT JOIN fund_latest_nav mp ON fo.fund_code = mp.fund_code
 GROUP BY fo.user_id;
@@ -5,9 +5,12 @@ from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 import traceback
 import logging
+import sys
+from pathlib import Path
 from .config import settings
 from .utils.database import init_db, async_session_factory
-from .routes import auth, funds, auto_invest
+from .utils.engines import dispose_engines
+from .routes import auth, funds, auto_invest, jobs, scheduler
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -43,8 +46,46 @@ async def lifespan(app: FastAPI):
                     print("✅ Admin user auto-created on startup")
     except Exception as e:
         print(f"⚠️ Admin bootstrap skipped: {e}")
+    # Background job worker (in-process mode)
+    job_worker = None
+    if settings.JOB_WORKER_MODE == "inprocess":
+        try:
+            backend_dir = Path(__file__).parent.parent
+            if str(backend_dir) not in sys.path:
+                sys.path.insert(0, str(backend_dir))
+            from job_worker import JobWorker
+
+            job_worker = JobWorker(db_url=settings.database_url_sync, concurrency=settings.JOB_WORKER_CONCURRENCY,
+                                   max_attempts=settings.JOB_MAX_ATTEMPTS)
+            job_worker.start()
+        except Exception as e:
+            print(f"⚠️ Job worker not started: {e}")
+    # Daily pipeline scheduler (每个副本都启动，由 advisory lock 决定谁执行)
+    scheduler = None
+    if settings.SCHEDULER_ENABLED:
+        try:
+            backend_dir = Path(__file__).parent.parent
+            if str(backend_dir) not in sys.path:
+                sys.path.insert(0, str(backend_dir))
+            from scheduler import DailyScheduler
+
+            scheduler = DailyScheduler(
+                db_url=settings.database_url_sync,
+                run_at=settings.SCHEDULER_RUN_AT,
+                timezone=settings.SCHEDULER_TIMEZONE,
+                poll_interval=settings.SCHEDULER_POLL_SECONDS,
+                max_attempts=settings.SCHEDULER_MAX_ATTEMPTS,
+            )
+            scheduler.start()
+        except Exception as e:
+            print(f"⚠️ Scheduler not started: {e}")
     yield
     # Shutdown
+    if scheduler:
+        scheduler.stop()
+    if job_worker:
+        job_worker.stop()
+    await dispose_engines()
     print("👋 Shutting down...")
 
 
@@ -77,6 +118,8 @@ app.add_middleware(
 app.include_router(auth.router)
 app.include_router(funds.router)
 app.include_router(auto_invest.router)
+app.include_router(jobs.router)
+app.include_router(scheduler.router)
 
 
 @app.get("/")
@@ -1,7 +1,7 @@
 """Pydantic schemas for request/response validation"""
 from pydantic import BaseModel, EmailStr, Field, field_validator
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import List, Optional
 import re
 
 
@@ -112,3 +112,42 @@ class ProfitSummary(BaseModel):
     total_value: float
     total_profit: float
     total_return_rate: float
+
+
+class Job(BaseModel):
+    """Background job status"""
+    job_id: int
+    job_type: str
+    status: str
+    params: dict
+    progress_current: int
+    progress_total: Optional[int]
+    progress_message: Optional[str]
+    result: Optional[dict]
+    error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+
+class SchedulerRun(BaseModel):
+    """Daily pipeline run（steps: 各步骤名称、耗时秒数与统计）"""
+    run_id: int
+    run_date: date
+    status: str
+    triggered_by: str
+    worker_id: Optional[str]
+    steps: List[dict]
+    error: Optional[str]
+    started_at: datetime
+    finished_at: Optional[datetime]
+    duration_seconds: Optional[float]
+
+
+class JobSubmitted(BaseModel):
+    """Background job submission response"""
+    job_id: int
+    status: str
+    deduplicated: bool
+    success: bool = True
+    message: str
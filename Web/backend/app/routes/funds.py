@@ -3,9 +3,10 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from ..models.schemas import FundOverview, Transaction, NavHistory, ProfitSummary
+from ..models.schemas import FundOverview, Transaction, NavHistory, ProfitSummary, JobSubmitted
 from ..services.auth_service import AuthService
 from ..services.fund_service import FundService
+from ..services.job_service import JobService
 from ..utils.database import get_db
 
 router = APIRouter(prefix="/funds", tags=["Funds"])
@@ -132,72 +133,57 @@ async def initialize_database(
         )
 
 
-@router.post("/fetch-nav")
+@router.post("/fetch-nav", response_model=JobSubmitted, status_code=status.HTTP_202_ACCEPTED)
 async def fetch_nav(
     force_recent_days: int = 0,
     fund_service: FundService = Depends(get_current_fund_service)
 ):
-    """Fetch historical NAV data for all enabled plans
+    """Submit a background job that fetches historical NAV data for all enabled plans
     
     Args:
         force_recent_days: 强制重新抓取最近N天净值（0=仅抓缺失，7=强制抓最近7天）
+
+    通过 GET /jobs/{job_id} 查询进度与结果
     """
     try:
-        details = await fund_service.fetch_history_nav(fund_codes=None, force_recent_days=force_recent_days)
-        
-        if not details:
-            return {
-                "message": "没有启用的定投计划需要抓取",
-                "success": False,
-                "details": []
-            }
-        
-        success_count = sum(1 for d in details if d.get('success', False))
-        total_rows = sum(d.get('rows_written', 0) for d in details)
-        
-        return {
-            "message": f"抓取完成: 成功 {success_count}/{len(details)} 个基金，共导入 {total_rows} 条记录",
-            "success": success_count > 0,
-            "total_plans": len(details),
-            "success_count": success_count,
-            "total_rows_written": total_rows,
-            "details": details
-        }
+        job_service = JobService(fund_service.user_id, fund_service.db)
+        job_id, job_status, deduplicated = await job_service.submit(
+            'fetch_nav', {'force_recent_days': force_recent_days}
+        )
+        return JobSubmitted(
+            job_id=job_id,
+            status=job_status,
+            deduplicated=deduplicated,
+            message="已有相同的抓取任务在执行" if deduplicated else "抓取任务已提交",
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"抓取历史净值失败: {str(e)}"
+            detail=f"提交抓取历史净值任务失败: {str(e)}"
         )
 
 
-@router.post("/update-pending")
+@router.post("/update-pending", response_model=JobSubmitted, status_code=status.HTTP_202_ACCEPTED)
 async def update_pending(
     fund_service: FundService = Depends(get_current_fund_service)
 ):
-    """Update pending transactions"""
+    """Submit a background job that updates pending transactions
+
+    通过 GET /jobs/{job_id} 查询进度与结果
+    """
     try:
-        result = await fund_service.update_pending_transactions()
-        
-        # update_pending_transactions现在返回处理结果字典
-        if result:
-            return {
-                "message": result.get('message', '待确认交易更新完成'),
-                "success": result.get('success', True),
-                "pending_count": result.get('pending_count', 0),
-                "success_count": result.get('success_count', 0),
-                "skip_count": result.get('skip_count', 0),
-                "deleted_count": result.get('deleted_count', 0)
-            }
-        else:
-            return {
-                "message": "没有待确认的交易记录",
-                "success": False,
-                "pending_count": 0
-            }
+        job_service = JobService(fund_service.user_id, fund_service.db)
+        job_id, job_status, deduplicated = await job_service.submit('update_pending')
+        return JobSubmitted(
+            job_id=job_id,
+            status=job_status,
+            deduplicated=deduplicated,
+            message="已有相同的更新任务在执行" if deduplicated else "待确认交易更新任务已提交",
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"更新待确认交易失败: {str(e)}"
+            detail=f"提交更新待确认交易任务失败: {str(e)}"
         )
 
 
@@ -265,8 +251,14 @@ async def batch_create_nav_history(
 ):
     """Batch create NAV history records"""
     try:
-        await fund_service.add_nav_history_batch(nav_records)
-        return {"message": f"成功导入{len(nav_records)}条净值记录"}
+        result, confirmed = await fund_service.add_nav_history_batch(nav_records)
+        return {
+            "message": f"成功导入{len(nav_records)}条净值记录（新增 {result.inserted}，更新 {result.updated}），"
+                       f"自动确认 {confirmed} 条待确认交易",
+            "inserted": result.inserted,
+            "updated": result.updated,
+            "confirmed": confirmed,
+        }
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
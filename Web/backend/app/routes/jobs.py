@@ -0,0 +1,45 @@
+"""Background job routes"""
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from ..models.schemas import Job
+from ..services.auth_service import AuthService
+from ..services.job_service import JobService
+from ..utils.database import get_db
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+security = HTTPBearer()
+
+
+async def get_job_service(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> JobService:
+    """Dependency to get job service for current user"""
+    user = await AuthService.get_current_user(db, credentials.credentials)
+    return JobService(user.id, db)
+
+
+@router.get("", response_model=List[Job])
+async def list_jobs(
+    limit: int = Query(20, ge=1, le=100, description="返回记录数"),
+    job_service: JobService = Depends(get_job_service)
+):
+    """List recent background jobs"""
+    return await job_service.list_jobs(limit)
+
+
+@router.get("/{job_id}", response_model=Job)
+async def get_job(
+    job_id: int,
+    job_service: JobService = Depends(get_job_service)
+):
+    """Get background job status, progress and result"""
+    job = await job_service.get_job(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="任务不存在"
+        )
+    return job
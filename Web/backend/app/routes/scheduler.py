@@ -0,0 +1,37 @@
+"""Daily scheduler routes"""
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from ..config import settings
+from ..models.schemas import SchedulerRun
+from ..services.auth_service import AuthService
+from ..services.scheduler_service import SchedulerService
+from ..utils.database import get_db
+
+router = APIRouter(prefix="/scheduler", tags=["Scheduler"])
+security = HTTPBearer()
+
+
+async def get_scheduler_service(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> SchedulerService:
+    """Dependency to get scheduler service (requires the admin account)"""
+    user = await AuthService.get_current_user(db, credentials.credentials)
+    # 执行记录跨用户（错误信息含用户ID），只对 ADMIN_EMAIL 对应的管理员开放
+    if not settings.ADMIN_EMAIL or user.email.lower() != settings.ADMIN_EMAIL.lower():
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="仅管理员可以查看调度记录"
+        )
+    return SchedulerService(db)
+
+
+@router.get("/runs", response_model=List[SchedulerRun])
+async def list_runs(
+    limit: int = Query(20, ge=1, le=100, description="返回记录数"),
+    scheduler_service: SchedulerService = Depends(get_scheduler_service)
+):
+    """List recent daily pipeline runs with per-step durations"""
+    return await scheduler_service.list_runs(limit)
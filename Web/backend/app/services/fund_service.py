@@ -1,16 +1,23 @@
 """Fund data service backed by SQLAlchemy/AsyncSession"""
 from typing import List, Optional
-import asyncio
 import sys
+from datetime import date
 from pathlib import Path
 
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models.schemas import FundOverview, Transaction, NavHistory, ProfitSummary
-from ..config import settings
 
 sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
+# 后台模块（bulk_load 等）位于 Web/backend
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
 
 
 class FundService:
@@ -121,63 +128,6 @@ class FundService:
         """PostgreSQL 由 init_db 自动创建结构，此处保留占位"""
         return {"message": "PostgreSQL schema is managed automatically"}
 
-    async def fetch_history_nav(self, fund_codes: Optional[List[str]] = None, force_recent_days: int = 0):
-        """抓取历史净值
-        
-        Args:
-            fund_codes: 指定基金代码列表（暂未使用）
-            force_recent_days: 强制重新抓取最近 N 天的净值（0=仅抓取缺失日期，7=强制抓最近7天）
-        """
-        try:
-            import sys
-            from datetime import datetime, timedelta
-            backend_dir = Path(__file__).parent.parent.parent
-            if str(backend_dir) not in sys.path:
-                sys.path.insert(0, str(backend_dir))
-
-            from fetch_history_nav import HistoryNavFetcher
-
-            fetcher = HistoryNavFetcher(
-                db_url=settings.database_url_sync,
-                data_source='fundSpider',
-                user_id=self.user_id,
-            )
-
-            # 如果设置了强制抓取最近 N 天，计算起始日期
-            start_override = None
-            if force_recent_days > 0:
-                start_override = (datetime.now() - timedelta(days=force_recent_days)).strftime('%Y-%m-%d')
-
-            # 运行阻塞任务到线程池，避免阻塞事件循环
-            return await asyncio.to_thread(fetcher.import_enabled_plans, start_override, None)
-        except ImportError as e:
-            raise Exception(f"无法导入历史净值模块: {e}")
-        except Exception as e:
-            raise Exception(f"抓取历史净值失败: {e}")
-
-    async def update_pending_transactions(self, use_target_amount: bool = True, auto_remove_non_trading: bool = True):
-        try:
-            import sys
-            backend_dir = Path(__file__).parent.parent.parent
-            if str(backend_dir) not in sys.path:
-                sys.path.insert(0, str(backend_dir))
-
-            from update_pending_transactions import PendingTransactionUpdater
-
-            updater = PendingTransactionUpdater(
-                db_url=settings.database_url_sync,
-                user_id=self.user_id,
-            )
-            return await asyncio.to_thread(
-                updater.process_pending_records,
-                use_target_amount,
-                auto_remove_non_trading,
-            )
-        except ImportError as e:
-            raise Exception(f"无法导入待确认交易更新模块: {e}")
-        except Exception as e:
-            raise Exception(f"更新待确认交易失败: {e}")
-
     async def add_transaction(
         self,
         fund_code: str,
@@ -223,34 +173,39 @@ class FundService:
         await self.db.commit()
 
     async def add_nav_history_batch(self, nav_records: List[dict]):
-        if not nav_records:
-            return
+        """批量写入净值（COPY 到暂存表后一次性合并），并增量确认与新净值匹配的待确认交易
 
-        sql = text(
-            """
-            INSERT INTO fund_nav_history (
-                fund_code, fund_name, price_date, unit_nav, cumulative_nav, daily_growth_rate, data_source
-            ) VALUES (
-                :fund_code, :fund_name, :price_date, :unit_nav, :cumulative_nav, :daily_growth_rate, :data_source
-            )
-            ON CONFLICT (fund_code, price_date, data_source) DO UPDATE SET
-                unit_nav = EXCLUDED.unit_nav,
-                cumulative_nav = EXCLUDED.cumulative_nav,
-                daily_growth_rate = EXCLUDED.daily_growth_rate,
-                fetched_at = CURRENT_TIMESTAMP
-            """
-        )
+        Returns:
+            (BulkLoadResult, int): 写入结果与自动确认的交易数
+        """
+        from bulk_load import BulkLoadResult, async_bulk_upsert
+        from update_pending_transactions import confirm_written_nav
 
-        for record in nav_records:
-            payload = {
+        if not nav_records:
+            return BulkLoadResult(0, 0), 0
+
+        # asyncpg COPY 按列类型编码，JSON 传入的日期字符串需先转为 date
+        rows = [
+            {
                 "fund_code": record["fund_code"],
                 "fund_name": record.get("fund_name", ""),
-                "price_date": record["price_date"],
+                "price_date": _as_date(record["price_date"]),
                 "unit_nav": record["unit_nav"],
                 "cumulative_nav": record.get("cumulative_nav"),
                 "daily_growth_rate": record.get("daily_growth_rate"),
                 "data_source": record.get("data_source", "fundSpider"),
             }
-            await self.db.execute(sql, payload)
-
+            for record in nav_records
+        ]
+        result = await async_bulk_upsert(self.db, "fund_nav_history", rows)
+        keys = {(row["fund_code"], row["price_date"]) for row in rows}
+        confirmed = 0
+        try:
+            # 保存点：确认失败不影响净值写入
+            async with self.db.begin_nested():
+                outcomes = await self.db.run_sync(lambda session: confirm_written_nav(session, keys))
+            confirmed = sum(1 for item in outcomes if item["status"] == "confirmed")
+        except Exception as e:
+            print(f"自动确认待确认交易失败: {e}")
         await self.db.commit()
+        return result, confirmed
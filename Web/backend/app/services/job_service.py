@@ -0,0 +1,82 @@
+"""Background job service backed by the background_jobs table"""
+import json
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.schemas import Job
+
+JOB_COLUMNS = """
+    job_id, job_type, status, params, progress_current, progress_total, progress_message,
+    result, error, created_at, started_at, finished_at
+"""
+
+
+class JobService:
+    """提交与查询当前用户的后台任务（由 job_worker.JobWorker 执行）"""
+
+    def __init__(self, user_id: int, db: AsyncSession):
+        self.user_id = user_id
+        self.db: AsyncSession = db
+
+    def _dedup_key(self, job_type: str, params: dict) -> str:
+        return f"{job_type}:{self.user_id}:{json.dumps(params, sort_keys=True)}"
+
+    async def submit(self, job_type: str, params: Optional[dict] = None) -> Tuple[int, str, bool]:
+        """提交任务并立即返回 (job_id, status, deduplicated)
+
+        相同类型、用户与参数的任务已在排队或运行时，不新建任务，直接返回已有任务。
+        """
+        params = params or {}
+        dedup_key = self._dedup_key(job_type, params)
+        # 已有任务可能恰好在两条语句之间结束，重试一次即可
+        for _ in range(2):
+            result = await self.db.execute(
+                text(
+                    """
+                    INSERT INTO background_jobs (user_id, job_type, params, dedup_key)
+                    VALUES (:user_id, :job_type, CAST(:params AS JSONB), :dedup_key)
+                    ON CONFLICT (dedup_key) WHERE status IN ('queued','running') DO NOTHING
+                    RETURNING job_id, status
+                    """
+                ),
+                {"user_id": self.user_id, "job_type": job_type, "params": json.dumps(params), "dedup_key": dedup_key},
+            )
+            row = result.first()
+            await self.db.commit()
+            if row:
+                return row[0], row[1], False
+
+            result = await self.db.execute(
+                text(
+                    """
+                    SELECT job_id, status FROM background_jobs
+                    WHERE dedup_key = :dedup_key AND status IN ('queued','running')
+                    LIMIT 1
+                    """
+                ),
+                {"dedup_key": dedup_key},
+            )
+            row = result.first()
+            if row:
+                return row[0], row[1], True
+        raise RuntimeError("提交后台任务失败，请重试")
+
+    async def get_job(self, job_id: int) -> Optional[Job]:
+        result = await self.db.execute(
+            text(f"SELECT {JOB_COLUMNS} FROM background_jobs WHERE user_id = :user_id AND job_id = :job_id"),
+            {"user_id": self.user_id, "job_id": job_id},
+        )
+        row = result.mappings().first()
+        return Job(**dict(row)) if row else None
+
+    async def list_jobs(self, limit: int = 20) -> List[Job]:
+        result = await self.db.execute(
+            text(
+                f"SELECT {JOB_COLUMNS} FROM background_jobs WHERE user_id = :user_id "
+                "ORDER BY created_at DESC, job_id DESC LIMIT :limit"
+            ),
+            {"user_id": self.user_id, "limit": limit},
+        )
+        return [Job(**dict(row)) for row in result.mappings().all()]
@@ -0,0 +1,30 @@
+"""Daily scheduler run history backed by the scheduler_runs table"""
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.schemas import SchedulerRun
+
+
+class SchedulerService:
+    """查询每日流水线（scheduler.DailyScheduler）的执行记录；记录跨用户（错误信息含用户ID），仅管理员可见（见 routes/scheduler.py）"""
+
+    def __init__(self, db: AsyncSession):
+        self.db: AsyncSession = db
+
+    async def list_runs(self, limit: int = 20) -> List[SchedulerRun]:
+        result = await self.db.execute(
+            text(
+                """
+                SELECT run_id, run_date, status, triggered_by, worker_id, steps, error, started_at, finished_at,
+                       EXTRACT(EPOCH FROM COALESCE(finished_at, CURRENT_TIMESTAMP) - started_at)::float
+                           AS duration_seconds
+                FROM scheduler_runs
+                ORDER BY started_at DESC, run_id DESC
+                LIMIT :limit
+                """
+            ),
+            {"limit": limit},
+        )
+        return [SchedulerRun(**dict(row)) for row in result.mappings().all()]
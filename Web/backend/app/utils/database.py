@@ -1,15 +1,12 @@
 """数据库连接与会话管理"""
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from ..config import settings
+from .engines import get_async_engine, get_engine
 from pathlib import Path
 
-# 创建异步引擎
-engine = create_async_engine(
-    settings.database_url_async,
-    echo=settings.DEBUG,
-    future=True
-)
+# 异步引擎（进程共享，见 engines.py）
+engine = get_async_engine(settings.database_url_async)
 
 # 创建会话工厂
 async_session_factory = async_sessionmaker(
@@ -37,8 +34,7 @@ async def init_db():
         await conn.run_sync(Base.metadata.create_all)
         # 基金相关表初始化（PostgreSQL）
         try:
-            from sqlalchemy import create_engine
-            sync_engine = create_engine(settings.database_url_sync, future=True)
+            sync_engine = get_engine(settings.database_url_sync)
             schema_dir = Path(__file__).parent.parent / 'db'
             schema_path = schema_dir / 'fund_multitenant_postgres.sql'
             sql = schema_path.read_text(encoding='utf-8')
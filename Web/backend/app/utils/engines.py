@@ -0,0 +1,68 @@
+"""进程级数据库引擎注册表
+
+同一进程内按 URL 复用引擎（及其连接池），避免每个服务/后台模块实例各自 create_engine、
+每次请求都重新建立 PostgreSQL 连接。连接池参数来自 Settings（DB_POOL_*）。
+
+同步（psycopg2）: 后台模块 HistoryNavFetcher、PendingTransactionUpdater 等
+异步（asyncpg）: FastAPI 的 AsyncSession；异步引擎的连接绑定在创建它们的事件循环上，
+只应在 API 进程的事件循环中使用。
+"""
+import threading
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from ..config import settings
+
+_sync_engines = {}
+_async_engines = {}
+_lock = threading.Lock()
+
+
+def _pool_options() -> dict:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def get_engine(db_url: str | None = None):
+    """返回同步引擎，db_url 为空时使用 settings.database_url_sync"""
+    url = db_url or settings.database_url_sync
+    engine = _sync_engines.get(url)
+    if engine is None:
+        with _lock:
+            engine = _sync_engines.get(url)
+            if engine is None:
+                engine = create_engine(url, future=True, **_pool_options())
+                _sync_engines[url] = engine
+    return engine
+
+
+def get_async_engine(db_url: str | None = None):
+    """返回异步引擎，db_url 为空时使用 settings.database_url_async"""
+    url = db_url or settings.database_url_async
+    engine = _async_engines.get(url)
+    if engine is None:
+        with _lock:
+            engine = _async_engines.get(url)
+            if engine is None:
+                engine = create_async_engine(url, echo=settings.DEBUG, future=True, **_pool_options())
+                _async_engines[url] = engine
+    return engine
+
+
+async def dispose_engines():
+    """关闭所有连接池（应用退出时调用）"""
+    with _lock:
+        sync_engines = list(_sync_engines.values())
+        async_engines = list(_async_engines.values())
+        _sync_engines.clear()
+        _async_engines.clear()
+    for engine in sync_engines:
+        engine.dispose()
+    for engine in async_engines:
+        await engine.dispose()
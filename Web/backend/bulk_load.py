@@ -0,0 +1,208 @@
+'''
+批量写入模块（PostgreSQL）
+先用 COPY 将行写入临时暂存表，再用一条 INSERT ... SELECT ... ON CONFLICT 合并到目标表，
+替代逐行参数化 executemany。同步路径基于 psycopg2 copy_expert，异步路径基于 asyncpg copy_records_to_table。
+
+用法:
+    with engine.begin() as conn:
+        result = bulk_upsert(conn, 'fund_nav_history', rows)
+        print(result.inserted, result.updated)
+
+rows 为字典（或支持 row[column] 的对象），缺失的列按 NULL 处理，合并时使用表定义中的默认值。
+'''
+
+import io
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy import text
+
+BulkLoadResult = namedtuple('BulkLoadResult', ['inserted', 'updated'])
+
+
+class BulkTable:
+    def __init__(self, name, columns, conflict=(), update=(), defaults=None):
+        '''目标表定义
+
+        Args:
+            columns: 写入的列
+            conflict: 唯一约束列，为空表示只插入不合并
+            update: 冲突时更新的列
+            defaults: 暂存值为 NULL 时使用的 SQL 默认表达式
+        '''
+        self.name = name
+        self.columns = tuple(columns)
+        self.conflict = tuple(conflict)
+        self.update = tuple(update)
+        self.defaults = defaults or {}
+
+    @property
+    def staging(self):
+        return f"_bulk_{self.name}"
+
+    def create_staging_sql(self):
+        '''暂存表结构复制目标表的列类型（不含约束），_seq 记录写入顺序，同一键出现多次时以最后一行为准'''
+        return [
+            f"DROP TABLE IF EXISTS {self.staging}",
+            f"CREATE TEMP TABLE {self.staging} ON COMMIT DROP AS "
+            f"SELECT {', '.join(self.columns)} FROM {self.name} WITH NO DATA",
+            f"ALTER TABLE {self.staging} ADD COLUMN _seq BIGINT GENERATED ALWAYS AS IDENTITY",
+        ]
+
+    def merge_sql(self):
+        select_list = ', '.join(
+            f"COALESCE({col}, {self.defaults[col]}) AS {col}" if col in self.defaults else col
+            for col in self.columns
+        )
+        columns = ', '.join(self.columns)
+        if self.conflict:
+            conflict = ', '.join(self.conflict)
+            source = (f"SELECT DISTINCT ON ({conflict}) {select_list} FROM {self.staging} "
+                      f"ORDER BY {conflict}, _seq DESC")
+            assignments = ', '.join(f"{col} = EXCLUDED.{col}" for col in self.update)
+            upsert = f"ON CONFLICT ({conflict}) DO UPDATE SET {assignments}" if assignments else \
+                f"ON CONFLICT ({conflict}) DO NOTHING"
+        else:
+            source = f"SELECT {select_list} FROM {self.staging} ORDER BY _seq"
+            upsert = ""
+        # xmax = 0 表示该行由本语句新插入，否则为冲突后更新
+        return (
+            f"WITH merged AS ("
+            f"INSERT INTO {self.name} ({columns}) {source} {upsert} RETURNING (xmax = 0) AS inserted"
+            f") SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) FROM merged"
+        )
+
+
+TABLES = {
+    'fund_nav_history': BulkTable(
+        'fund_nav_history',
+        columns=('fund_code', 'fund_name', 'price_date', 'unit_nav', 'cumulative_nav',
+                 'daily_growth_rate', 'data_source', 'fetched_at'),
+        conflict=('fund_code', 'price_date', 'data_source'),
+        update=('unit_nav', 'cumulative_nav', 'daily_growth_rate', 'fetched_at'),
+        defaults={'fund_name': "''", 'data_source': "'fundSpider'", 'fetched_at': 'CURRENT_TIMESTAMP'},
+    ),
+    # transactions 没有业务唯一键，只做批量插入
+    'transactions': BulkTable(
+        'transactions',
+        columns=('user_id', 'fund_code', 'fund_name', 'transaction_date', 'nav_date', 'transaction_type',
+                 'target_amount', 'shares', 'unit_nav', 'amount', 'note', 'created_at'),
+        defaults={'amount': '0', 'created_at': 'CURRENT_TIMESTAMP'},
+    ),
+}
+
+
+def _get_table(table):
+    if isinstance(table, BulkTable):
+        return table
+    try:
+        return TABLES[table]
+    except KeyError:
+        raise ValueError(f"不支持批量写入的表: {table}") from None
+
+
+_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _copy_text(value):
+    return str(value).translate(_ESCAPES)
+
+
+# COPY text 格式编码，按值类型直接查表（比逐个 isinstance 判断快）
+_COPY_ENCODERS = {
+    type(None): lambda value: '\\N',
+    float: lambda value: '\\N' if value != value else repr(value),
+    int: str,
+    bool: str,
+    Decimal: str,
+    date: date.isoformat,
+    datetime: datetime.isoformat,
+    str: _copy_text,
+}
+
+
+def _copy_other(value):
+    '''子类（如 numpy.float64、pandas.Timestamp）按其基类编码'''
+    if isinstance(value, float):
+        return _COPY_ENCODERS[float](float(value))
+    if isinstance(value, date):
+        return value.isoformat()
+    return _copy_text(value)
+
+
+def _copy_value(value):
+    '''编码为 COPY text 格式的字段，NaN 与 None 均写为 NULL'''
+    return _COPY_ENCODERS.get(type(value), _copy_other)(value)
+
+
+def _row_values(row, columns):
+    if isinstance(row, dict):
+        return [row.get(col) for col in columns]
+    return [row[col] for col in columns]
+
+
+def _copy_chunks(rows, columns, chunk_rows):
+    '''将行编码为 COPY 文本，每 chunk_rows 行产出一个缓冲区，内存占用与总行数无关'''
+    buffer = io.StringIO()
+    count = 0
+    for row in rows:
+        buffer.write('\t'.join([_copy_value(v) for v in _row_values(row, columns)]))
+        buffer.write('\n')
+        count += 1
+        if count % chunk_rows == 0:
+            buffer.seek(0)
+            yield buffer
+            buffer = io.StringIO()
+    if count % chunk_rows:
+        buffer.seek(0)
+        yield buffer
+
+
+def bulk_upsert(conn, table, rows, chunk_rows=50000):
+    '''在调用方事务中批量写入（同步，psycopg2）
+
+    Args:
+        conn: SQLAlchemy Connection（需处于事务中，如 engine.begin()）
+        table: 表名（见 TABLES）或 BulkTable
+        rows: 可迭代的行，可以是生成器
+        chunk_rows: 每次 COPY 的行数
+
+    Returns:
+        BulkLoadResult: inserted / updated 行数
+    '''
+    spec = _get_table(table)
+    for statement in spec.create_staging_sql():
+        conn.execute(text(statement))
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        copy_sql = f"COPY {spec.staging} ({', '.join(spec.columns)}) FROM STDIN"
+        for chunk in _copy_chunks(rows, spec.columns, chunk_rows):
+            cursor.copy_expert(copy_sql, chunk)
+    finally:
+        cursor.close()
+    inserted, updated = conn.execute(text(spec.merge_sql())).one()
+    return BulkLoadResult(inserted, updated)
+
+
+async def async_bulk_upsert(session, table, rows, chunk_rows=50000):
+    '''在 AsyncSession 当前事务中批量写入（asyncpg），提交由调用方负责
+
+    asyncpg 按列类型编码，日期列需为 date/datetime 对象，数值列为 int/float/Decimal。
+    '''
+    spec = _get_table(table)
+    # 先通过会话执行建表，确保事务已开始，暂存表与后续合并在同一事务中
+    for statement in spec.create_staging_sql():
+        await session.execute(text(statement))
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+    driver = raw.driver_connection
+    batch = []
+    for row in rows:
+        batch.append(tuple(None if isinstance(v, float) and v != v else v for v in _row_values(row, spec.columns)))
+        if len(batch) >= chunk_rows:
+            await driver.copy_records_to_table(spec.staging, records=batch, columns=list(spec.columns))
+            batch = []
+    if batch:
+        await driver.copy_records_to_table(spec.staging, records=batch, columns=list(spec.columns))
+    inserted, updated = (await session.execute(text(spec.merge_sql()))).one()
+    return BulkLoadResult(inserted, updated)
@@ -0,0 +1,160 @@
+'''
+执行定投计划的模块（PostgreSQL）
+按启用计划从开始日期补齐到今天的待确认买入记录
+'''
+
+import os
+from datetime import datetime
+import numpy as np
+from sqlalchemy import text
+from app.utils.engines import get_engine
+from tradeDate import TradeDateChecker
+from plan_schedule import build_schedule
+
+# 候选 (计划, 定投日, 确认日) 按计划顺序展开；多个计划同基金同日时只保留排在前面的计划，
+# 与逐条检查时"先写入者占位"一致。已存在同基金同日交易（含手工录入）的日期跳过
+INSERT_MISSING_SQL = text("""
+    WITH candidates AS (
+        SELECT c.plan_id, c.trade_date, c.confirm_date, c.ord
+          FROM unnest(CAST(:plan_ids AS bigint[]), CAST(:trade_dates AS date[]), CAST(:confirm_dates AS date[]))
+               WITH ORDINALITY AS c(plan_id, trade_date, confirm_date, ord)
+    ),
+    missing AS (
+        SELECT DISTINCT ON (p.fund_code, c.trade_date)
+               c.plan_id, c.trade_date, c.confirm_date, p.plan_name, p.fund_code, p.fund_name, p.amount
+          FROM candidates c
+          JOIN auto_invest_plans p ON p.plan_id = c.plan_id AND p.user_id = :user_id
+         WHERE NOT EXISTS (
+                   SELECT 1 FROM transactions t
+                    WHERE t.user_id = :user_id AND t.fund_code = p.fund_code AND t.transaction_date = c.trade_date
+               )
+         ORDER BY p.fund_code, c.trade_date, c.ord
+    ),
+    inserted AS (
+        INSERT INTO transactions (
+            user_id, plan_id, fund_code, fund_name, transaction_date,
+            nav_date, transaction_type, target_amount, note
+        )
+        SELECT :user_id, plan_id, fund_code, fund_name, trade_date,
+               confirm_date, '买入', amount, '[待确认] ' || plan_name
+          FROM missing
+        ON CONFLICT (user_id, plan_id, transaction_date) WHERE plan_id IS NOT NULL DO NOTHING
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM inserted) AS created, (SELECT COUNT(*) FROM candidates) AS candidates
+""")
+
+
+class AutoInvestExecutor:
+    def __init__(self, user_id: int = 1, db_url: str | None = None):
+        '''初始化定投执行器（仅支持PostgreSQL）'''
+        self.user_id = user_id
+
+        # 获取数据库URL
+        if db_url:
+            self.db_url = self._resolve_db_url(db_url)
+        else:
+            self.db_url = os.getenv('DATABASE_URL', 'postgresql://localhost:5432/ndx')
+            self.db_url = self._resolve_db_url(self.db_url)
+
+        self.engine = get_engine(self.db_url)
+
+    def _resolve_db_url(self, raw: str) -> str:
+        """将数据库URL转换为同步PostgreSQL格式"""
+        if not raw:
+            return 'postgresql://localhost:5432/ndx'
+
+        # Railway等平台可能使用postgres://前缀
+        if raw.startswith('postgres://'):
+            raw = raw.replace('postgres://', 'postgresql://', 1)
+
+        # 确保使用psycopg2驱动（同步）
+        if raw.startswith('postgresql+asyncpg://'):
+            raw = raw.replace('postgresql+asyncpg://', 'postgresql+psycopg2://', 1)
+        elif raw.startswith('postgresql://') and '+' not in raw:
+            raw = raw.replace('postgresql://', 'postgresql+psycopg2://', 1)
+
+        return raw
+
+    def load_enabled_plans(self):
+        '''读取当前用户启用的定投计划'''
+        with self.engine.connect() as conn:
+            result = conn.execute(
+                text("""
+                    SELECT plan_id, plan_name, fund_code, fund_name, amount::float,
+                           frequency, start_date::text, end_date::text
+                    FROM auto_invest_plans
+                    WHERE user_id = :user_id AND enabled = true
+                    ORDER BY created_at DESC
+                """),
+                {"user_id": self.user_id}
+            )
+            return [dict(row) for row in result.mappings().all()]
+
+    def execute_today(self, progress=None):
+        """从各计划开始日期补齐到今天缺失的定投记录
+
+        所有候选日期通过一条 INSERT ... SELECT FROM unnest(...) 写入，同一条语句返回新建与跳过数量。
+        已存在同基金同日交易的日期跳过；(user_id, plan_id, transaction_date) 唯一索引保证重复执行不会产生重复记录。
+
+        Args:
+            progress: 可选回调 progress(current, total, message)，写入完成后调用一次
+
+        Returns:
+            dict: message / transactions_created / skipped / date
+        """
+        # Get today's date
+        today = datetime.now().strftime('%Y-%m-%d')
+
+        # 初始化交易日检查器
+        trade_checker = TradeDateChecker(user_id=self.user_id, db_url=self.db_url)
+
+        print(f"[DEBUG] 用户ID: {self.user_id}")
+
+        enabled_plans = self.load_enabled_plans()
+
+        print(f"[DEBUG] 启用的计划数: {len(enabled_plans)}")
+
+        if not enabled_plans:
+            return {"message": "没有启用的定投计划", "transactions_created": 0}
+
+        # 一次生成所有计划的定投日与T+1确认日（跳过周末和节假日）
+        schedule = build_schedule(enabled_plans, today, trade_checker.calendar)
+        per_plan = np.bincount(schedule['plan_index'], minlength=len(enabled_plans))
+        for plan, count in zip(enabled_plans, per_plan.tolist()):
+            print(f"[DEBUG] 计划 {plan['plan_name']}（{plan['fund_code']}, {plan['frequency']}）"
+                  f" {plan['start_date']} ~ {min(plan['end_date'], today)}: {count} 个潜在定投日期")
+
+        with self.engine.begin() as conn:
+            # 同一用户的补齐串行执行，避免并发调用在"同基金同日已存在"的判断上互相看不见
+            conn.execute(
+                text("SELECT pg_advisory_xact_lock(hashtext('execute_today'), :user_id)"),
+                {"user_id": self.user_id}
+            )
+            transactions_created, candidate_count = conn.execute(
+                INSERT_MISSING_SQL,
+                {
+                    "user_id": self.user_id,
+                    "plan_ids": [enabled_plans[i]['plan_id'] for i in schedule['plan_index'].tolist()],
+                    "trade_dates": schedule['trade_date'].tolist(),
+                    "confirm_dates": schedule['confirm_date'].tolist(),
+                }
+            ).one()
+        skipped_count = candidate_count - transactions_created
+
+        if progress:
+            progress(len(enabled_plans), len(enabled_plans), f"新建 {transactions_created} 条")
+
+        print(f"\n[DEBUG] 执行完成: 新建 {transactions_created} 条, 跳过 {skipped_count} 条")
+
+        return {
+            "message": f"定投计划执行完成: 新建 {transactions_created} 条记录, 跳过已存在 {skipped_count} 条",
+            "transactions_created": transactions_created,
+            "skipped": skipped_count,
+            "date": today
+        }
+
+def execute_today_plans(user_id=1, db_url: str | None = None):
+    """执行指定用户的定投计划（PostgreSQL）"""
+    executor = AutoInvestExecutor(user_id=user_id, db_url=db_url)
+    return executor.execute_today()
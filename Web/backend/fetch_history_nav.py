@@ -3,16 +3,103 @@
 import sys
 import os
 import json
-from datetime import datetime, timedelta
-from sqlalchemy import create_engine, text
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from sqlalchemy import text
+from app.utils.engines import get_engine
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'fundSpider'))
-from fundSpider.fund_info import FuncInfo
+from fundSpider.http_client import get_default_client
+from fundSpider.cache import PageCache, cache_from_env
+from fundSpider.sources import get_data_source
+from tradeDate import get_trading_calendar, learn_trading_days
+from bulk_load import bulk_upsert
+from nav_pipeline import NavPipeline
+from update_pending_transactions import confirm_written_nav
+
+
+def _numeric_column(values, strip_percent=False):
+    """整列转为 float64：数值列直接转换，字符串列去掉空白（及 '%'）后解析，'--'、空串等无法解析的值为 NaN"""
+    if not pd.api.types.is_numeric_dtype(values):
+        values = values.astype('string').str.strip()
+        if strip_percent:
+            values = values.str.replace('%', '', regex=False)
+    return pd.to_numeric(values, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+def _nan_to_none(values):
+    out = values.astype(object)
+    out[np.isnan(values)] = None
+    return out.tolist()
+
+
+def normalize_nav_frame(df, fund_code, fund_name, data_source, existing_dates=()):
+    """将抓取到的净值 DataFrame 整列清洗为 fund_nav_history 的写入参数
+
+    - 日期在 existing_dates 中的行跳过（数组反连接），计入 skipped
+    - 单位净值无法解析的行丢弃
+    - 累计净值、日增长率无法解析时写入 NULL
+
+    Returns:
+        (payloads, skipped): payloads 为 executemany 参数字典列表
+    """
+    dates = pd.to_datetime(df['净值日期']).to_numpy(dtype='datetime64[D]')
+    existing = np.array(sorted(existing_dates), dtype='datetime64[D]')
+    fresh = ~np.isin(dates, existing)
+    skipped = int(len(dates) - fresh.sum())
+
+    unit_nav = _numeric_column(df['单位净值'])
+    keep = fresh & ~np.isnan(unit_nav)
+    cumulative_nav = _numeric_column(df['累计净值'])[keep]
+    growth = _numeric_column(df['日增长率'], strip_percent=True)[keep]
+
+    payloads = [
+        {
+            'fund_code': fund_code,
+            'fund_name': fund_name,
+            'price_date': price_date,
+            'unit_nav': unit,
+            'cumulative_nav': cumulative,
+            'daily_growth_rate': rate,
+            'data_source': data_source,
+        }
+        for price_date, unit, cumulative, rate in zip(
+            dates[keep].tolist(), unit_nav[keep].tolist(), _nan_to_none(cumulative_nav), _nan_to_none(growth)
+        )
+    ]
+    return payloads, skipped
 
 class HistoryNavFetcher:
-    def __init__(self, data_source='fundSpider', db_url: str | None = None, user_id: int = 1):
-        '''初始化净值抓取器（仅支持PostgreSQL）'''
+    def __init__(self, data_source='fundSpider', db_url: str | None = None, user_id: int = 1,
+                 fetch_concurrency: int | None = 4, cache_dir: str | None = None, offline: bool = False,
+                 fetch_workers: int = 2, auto_confirm: bool = True, gap_retry_days: int = 7):
+        '''初始化净值抓取器（仅支持PostgreSQL）
+
+        data_source: 数据源名称（见 fundSpider.sources），同时作为 fund_nav_history.data_source 写入
+        fetch_concurrency: 单个基金分页抓取的并发上限，None 表示逐页顺序抓取
+        cache_dir: 原始响应缓存目录，留空则读取环境变量 NDX_SPIDER_CACHE_DIR
+        offline: 离线回放模式，只从缓存读取页面，不访问网络（需配置缓存目录）
+        fetch_workers: 多基金同步时流水线的抓取线程数（见 nav_pipeline）
+        auto_confirm: 写入净值后在同一事务内确认所有用户中与新净值匹配的待确认交易
+        gap_retry_days: 中间缺口抓取过后，在该天数内不再重复抓取（数据源本身缺失的日期补不上）
+        '''
         self.data_source = data_source
         self.user_id = user_id
+        self.fetch_concurrency = fetch_concurrency
+        self.fetch_workers = fetch_workers
+        self.progress = None    # 可选进度回调 progress(current, total, message)，每抓完一个基金调用一次
+        self.auto_confirm = auto_confirm
+        self.gap_retry_days = gap_retry_days
+        self.confirmed_count = 0    # 本实例写入净值后自动确认的交易数
+        if cache_dir:
+            self.page_cache = PageCache(cache_dir, offline=offline)
+        else:
+            self.page_cache = cache_from_env()
+            if offline:
+                if self.page_cache is None:
+                    raise ValueError("离线模式需要指定 cache_dir 或 NDX_SPIDER_CACHE_DIR")
+                self.page_cache.offline = True
+        self.source = get_data_source(data_source, cache=self.page_cache, concurrency=fetch_concurrency)
         
         # 获取数据库URL（仅支持PostgreSQL）
         if db_url:
@@ -22,7 +109,7 @@ class HistoryNavFetcher:
             self.db_url = os.getenv('DATABASE_URL', 'postgresql://localhost:5432/ndx')
             self.db_url = self._resolve_db_url(self.db_url)
         
-        self.engine = create_engine(self.db_url, future=True)
+        self.engine = get_engine(self.db_url)
 
     def _resolve_db_url(self, raw: str) -> str:
         """将数据库URL转换为同步PostgreSQL格式"""
@@ -41,13 +128,38 @@ class HistoryNavFetcher:
         
         return raw
 
-    def load_enabled_plans(self):
+    def publish_written(self, conn, payloads):
+        """在写入净值的同一事务中发布本批 (fund_code, price_date)，增量确认匹配的待确认交易
+
+        Returns:
+            int: 本批确认的交易数
+        """
+        if not self.auto_confirm or not payloads:
+            return 0
+        try:
+            # 保存点：确认失败只回滚确认部分，不影响本批净值写入
+            with conn.begin_nested():
+                outcomes = confirm_written_nav(conn, {(p['fund_code'], p['price_date']) for p in payloads})
+        except Exception as e:
+            print(f"自动确认失败（净值已写入，可稍后手动更新待确认交易）: {e}")
+            return 0
+        confirmed = sum(1 for item in outcomes if item['status'] == 'confirmed')
+        if confirmed:
+            self.confirmed_count += confirmed
+            users = sorted({item['user_id'] for item in outcomes if item['status'] == 'confirmed'})
+            print(f"新净值自动确认 {confirmed} 条待确认交易（用户: {', '.join(map(str, users))}）")
+        return confirmed
+
+    def load_enabled_plans(self, all_users: bool = False):
         """从数据库读取启用的定投计划并返回列表字典
         
         从 auto_invest_plans 表读取当前用户的定投计划（仅PostgreSQL）
         
-        字段: plan_name, fund_code, fund_name, amount, frequency, start_date, end_date, enabled
+        字段: user_id, plan_name, fund_code, fund_name, amount, frequency, start_date, end_date, enabled
         仅保留 enabled=true 的计划
+
+        Args:
+            all_users: True=读取所有用户的启用计划，False=仅读取当前用户
         """
         # 从数据库读取定投计划
         try:
@@ -55,11 +167,12 @@ class HistoryNavFetcher:
                 result = conn.execute(
                     text("""
                         SELECT plan_name, fund_code, fund_name, amount, frequency, 
-                               start_date::text, end_date::text, enabled
+                               start_date::text, end_date::text, enabled, user_id
                         FROM auto_invest_plans
-                        WHERE user_id = :user_id AND enabled = true
+                        WHERE enabled = true AND (:all_users OR user_id = :user_id)
+                        ORDER BY user_id, plan_id
                     """),
-                    {"user_id": self.user_id}
+                    {"user_id": self.user_id, "all_users": all_users}
                 )
                 rows = result.fetchall()
                 if rows:
@@ -73,7 +186,8 @@ class HistoryNavFetcher:
                             'frequency': row[4],
                             'start_date': row[5],  # 已经是字符串
                             'end_date': row[6],    # 已经是字符串
-                            'enabled': bool(row[7])
+                            'enabled': bool(row[7]),
+                            'user_id': row[8],
                         })
                     print(f"从数据库加载了 {len(results)} 个启用的定投计划")
                     return results
@@ -95,6 +209,7 @@ class HistoryNavFetcher:
             DataFrame: 包含历史净值数据的DataFrame（本函数只抓取数据不写入数据库）
         """
         print(f"正在获取: {fund_name} ({fund_code})")
+        start_display = '基金成立日' if start_date is None else str(start_date)[:10]
         
         # 如果 start_date 为 None，设为一个足够早的日期，让API返回从基金成立日开始的数据
         if start_date is None:
@@ -109,15 +224,12 @@ class HistoryNavFetcher:
         if isinstance(end_date, str):
             end_date = datetime.strptime(end_date, '%Y-%m-%d')
         
-        start_display = '基金成立日'  # 显示为"基金成立日"更友好
         end_display = end_date.strftime('%Y-%m-%d')
         print(f"时间范围: {start_display} ~ {end_display}")
         
-        fund = FuncInfo(code=fund_code, name=fund_name)
-        
-        fund.load_net_value_info(start_date, end_date)
+        batch = self.source.fetch(fund_code, start_date, end_date, fund_name=fund_name)
         
-        df = fund.get_data_frame()
+        df = batch.to_frame()
         
         if df.empty:
             print("未获取到数据")
@@ -171,175 +283,242 @@ class HistoryNavFetcher:
             print(f"{fund_code} 没有可写入的净值数据")
             return 0
         
-        # 一次性查询所有已存在的日期，避免每行都查询数据库
+        # 只查询本批数据日期范围内已存在的日期，避免每行都查询数据库
+        dates = df['净值日期']
         with self.engine.connect() as conn:
             result = conn.execute(
                 text("""
                     SELECT price_date FROM fund_nav_history
                     WHERE fund_code = :fund_code AND data_source = :source
+                      AND price_date BETWEEN :min_date AND :max_date
                 """),
-                {"fund_code": fund_code, "source": self.data_source}
+                {"fund_code": fund_code, "source": self.data_source,
+                 "min_date": dates.min().date(), "max_date": dates.max().date()}
             )
             existing_dates = {row[0] for row in result.fetchall()}
         
-        records = []
-        skipped_count = 0
-        for _, row in df.iterrows():
-            price_date = row.get('净值日期')
-            
-            # 检查该日期数据是否已存在
-            if price_date in existing_dates:
-                skipped_count += 1
-                continue
-            
-            unit_nav = row.get('单位净值')
-            cumulative_nav = row.get('累计净值')
-            daily_growth = row.get('日增长率')
-        
-            if isinstance(daily_growth, str):
-                if daily_growth.strip() == '--' or daily_growth.strip() == '':
-                    daily_growth_rate = None
-                else:
-                    daily_growth_rate = daily_growth.replace('%', '')
-                    try:
-                        daily_growth_rate = float(daily_growth_rate)
-                    except ValueError:
-                        daily_growth_rate = None
-            else:
-                try:
-                    daily_growth_rate = float(daily_growth) if daily_growth is not None else None
-                except Exception:
-                    daily_growth_rate = None
-            try:
-                unit_nav_f = float(unit_nav)
-            except Exception:
-                continue
-            cumulative_nav_f = None
-            try:
-                if cumulative_nav not in (None, '', '--'):
-                    cumulative_nav_f = float(cumulative_nav)
-            except Exception:
-                cumulative_nav_f = None
-            records.append((fund_code, fund_name, price_date, unit_nav_f, cumulative_nav_f, daily_growth_rate,
-                             self.data_source))
+        payloads, skipped_count = normalize_nav_frame(df, fund_code, fund_name, self.data_source, existing_dates)
         if skipped_count > 0:
             print(f"跳过已存在的 {skipped_count} 条记录")
         
-        if not records:
+        if not payloads:
             print(f"{fund_code} 没有可写入的有效净值行（全部已存在或无效）")
             return 0
         
+        # COPY 到暂存表后一次性合并（ON CONFLICT 更新已存在的日期）
+        with self.engine.begin() as conn:
+            result = bulk_upsert(conn, 'fund_nav_history', payloads)
+            affected = result.inserted + result.updated
+            self.publish_written(conn, payloads)
+        
+        total_processed = len(payloads) + skipped_count
+        print(f"写入 fund_nav_history 完成: {fund_code} 新增 {result.inserted} 行，更新 {result.updated} 行，"
+              f"跳过 {skipped_count} 行，共处理 {total_processed} 行")
+        return affected
+
+    @staticmethod
+    def plan_fund_crawl(plans):
+        """将计划列表去重为待抓取基金: 返回 {fund_code: fund_name}，保持首次出现的顺序"""
+        funds = {}
+        for plan in plans:
+            funds.setdefault(plan['fund_code'], plan['fund_name'])
+        return funds
+
+    def plan_missing_windows(self, fund_codes, start_date_override, end_used):
+        """一次查询计算每个基金需要抓取的日期窗口
+
+        以交易日历（工作日且非 trading_calendar 中的休市日）为准，返回:
+          - full: 库中没有该基金任何净值，从基金成立日（或 start_date_override）抓到 end_used
+          - interior: 已有序列中间缺失的连续交易日
+          - tail: 最新净值日期之后到 end_used
+        中间缺口只在交易日历覆盖起点之后检测（更早的年份无法区分节假日与缺失数据），
+        gap_retry_days 天内已抓取过（见 record_fill_attempts）且仍未补上的缺口跳过。
+        start_date_override 为所有窗口的下限。
+
+        Returns:
+            Dict[str, List[Dict]]: fund_code -> [{'kind', 'start', 'end', 'missing_days'}]，
+            start 为 None 表示从基金成立日起；没有缺口的基金对应空列表
+        """
         sql = text(
             """
-            INSERT INTO fund_nav_history (
-                fund_code, fund_name, price_date, unit_nav, cumulative_nav, daily_growth_rate, data_source
-            ) VALUES (
-                :fund_code, :fund_name, :price_date, :unit_nav, :cumulative_nav, :daily_growth_rate, :data_source
+            WITH targets AS (
+                SELECT DISTINCT fund_code FROM unnest(CAST(:codes AS text[])) AS t(fund_code)
+            ),
+            bounds AS (
+                SELECT t.fund_code, MIN(h.price_date) AS first_date, MAX(h.price_date) AS last_date
+                FROM targets t
+                LEFT JOIN fund_nav_history h ON h.fund_code = t.fund_code AND h.data_source = :source
+                GROUP BY t.fund_code
+            ),
+            expected AS (
+                SELECT b.fund_code, d::date AS day,
+                       ROW_NUMBER() OVER (PARTITION BY b.fund_code ORDER BY d) AS rn
+                FROM bounds b
+                CROSS JOIN LATERAL generate_series(
+                    GREATEST(b.first_date, CAST(:calendar_start AS date),
+                             COALESCE(CAST(:start_override AS date), b.first_date)),
+                    LEAST(b.last_date, CAST(:end_used AS date)),
+                    interval '1 day'
+                ) AS d
+                WHERE b.first_date IS NOT NULL
+                  AND EXTRACT(ISODOW FROM d) < 6
+                  AND NOT (d::date = ANY(CAST(:holidays AS date[])))
+            ),
+            missing AS (
+                SELECT e.fund_code, e.day,
+                       e.rn - ROW_NUMBER() OVER (PARTITION BY e.fund_code ORDER BY e.day) AS island
+                FROM expected e
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM fund_nav_history h
+                    WHERE h.fund_code = e.fund_code AND h.data_source = :source AND h.price_date = e.day
+                )
             )
-            ON CONFLICT (fund_code, price_date, data_source) DO UPDATE SET
-                unit_nav = EXCLUDED.unit_nav,
-                cumulative_nav = EXCLUDED.cumulative_nav,
-                daily_growth_rate = EXCLUDED.daily_growth_rate,
-                fetched_at = CURRENT_TIMESTAMP
+            SELECT fund_code, 'interior' AS kind, MIN(day) AS window_start, MAX(day) AS window_end,
+                   COUNT(*) AS missing_days
+            FROM missing m
+            GROUP BY fund_code, island
+            HAVING NOT EXISTS (
+                SELECT 1 FROM nav_fill_attempts a
+                WHERE a.fund_code = m.fund_code AND a.data_source = :source
+                  AND a.window_start <= MIN(m.day) AND a.window_end >= MAX(m.day)
+                  AND a.attempted_at > CURRENT_TIMESTAMP - make_interval(days => :gap_retry_days)
+            )
+            UNION ALL
+            SELECT fund_code, 'tail',
+                   GREATEST(last_date + 1, COALESCE(CAST(:start_override AS date), last_date + 1)),
+                   CAST(:end_used AS date), NULL
+            FROM bounds
+            WHERE last_date IS NOT NULL
+              AND GREATEST(last_date + 1, COALESCE(CAST(:start_override AS date), last_date + 1))
+                  <= CAST(:end_used AS date)
+            UNION ALL
+            SELECT fund_code, 'full', CAST(:start_override AS date), CAST(:end_used AS date), NULL
+            FROM bounds
+            WHERE last_date IS NULL
+            ORDER BY 1, 3 NULLS FIRST
             """
         )
-        payloads = [
-            {
-                'fund_code': rec[0],
-                'fund_name': rec[1],
-                'price_date': rec[2],
-                'unit_nav': rec[3],
-                'cumulative_nav': rec[4],
-                'daily_growth_rate': rec[5],
-                'data_source': rec[6],
-            }
-            for rec in records
-        ]
+        windows = {code: [] for code in fund_codes}
+        calendar = get_trading_calendar(self.engine)
+        with self.engine.connect() as conn:
+            rows = conn.execute(sql, {
+                "codes": list(windows),
+                "source": self.data_source,
+                "calendar_start": calendar.coverage_start,
+                "start_override": start_date_override,
+                "end_used": end_used,
+                "holidays": sorted(calendar.holidays),
+                "gap_retry_days": self.gap_retry_days,
+            }).fetchall()
+        for fund_code, kind, window_start, window_end, missing_days in rows:
+            windows[fund_code].append({
+                'kind': kind,
+                'start': window_start.strftime('%Y-%m-%d') if window_start else None,
+                'end': window_end.strftime('%Y-%m-%d'),
+                'missing_days': missing_days,
+            })
+        return windows
 
+    def record_fill_attempts(self, fund_code, windows):
+        """记录已成功抓取过的中间缺口窗口，供 plan_missing_windows 在冷却期内跳过"""
+        interior = [w for w in windows if w['kind'] == 'interior']
+        if not interior:
+            return
         with self.engine.begin() as conn:
-            result = conn.execute(sql, payloads)
-            affected = result.rowcount or 0
-        
-        total_processed = len(records) + skipped_count
-        print(f"写入 fund_nav_history 完成: {fund_code} 新增 {len(records)} 行，跳过 {skipped_count} 行，共处理 {total_processed} 行")
-        return affected
+            conn.execute(
+                text("""
+                    INSERT INTO nav_fill_attempts (fund_code, data_source, window_start, window_end)
+                    VALUES (:fund_code, :source, CAST(:start AS date), CAST(:end AS date))
+                    ON CONFLICT (fund_code, data_source, window_start, window_end) DO UPDATE
+                    SET attempts = nav_fill_attempts.attempts + 1, attempted_at = CURRENT_TIMESTAMP
+                """),
+                [{"fund_code": fund_code, "source": self.data_source, "start": w['start'], "end": w['end']}
+                 for w in interior],
+            )
+
+    def _run_plans(self, plans, start_date_override, end_date_override):
+        """每个基金只抓取一次（经 NavPipeline 流水线），再展开为每个计划的明细
+
+        多个计划（同一用户或不同用户）指向同一基金时，仅第一个计划计入 rows_written，其余标记 deduplicated，
+        因此所有明细的 rows_written 之和即实际写入的行数。
+        """
+        end_used = end_date_override or datetime.now().strftime('%Y-%m-%d')
+        funds = self.plan_fund_crawl(plans)
+        print(f"\n{len(plans)} 个启用计划共涉及 {len(funds)} 个基金，导入到数据库: {self.db_url}")
+        windows = self.plan_missing_windows(list(funds), start_date_override, end_used)
+        # 抓取、解析、写入三个阶段在基金之间重叠执行
+        pipeline = NavPipeline(self, fetch_workers=self.fetch_workers)
+        fund_results = pipeline.run(funds, windows, end_used)
+        # 抓取失败的基金不记录，下次仍会重试
+        try:
+            for fund_code, result in fund_results.items():
+                if result['success']:
+                    self.record_fill_attempts(fund_code, windows.get(fund_code, []))
+        except Exception as e:
+            print(f"记录缺口抓取失败: {e}")
+        if any(r['rows_written'] for r in fund_results.values()):
+            # 新净值可能包含基准基金，据此回填交易日历
+            try:
+                learn_trading_days(self.engine)
+            except Exception as e:
+                print(f"更新交易日历失败: {e}")
+
+        details = []
+        counted = set()
+        for plan in plans:
+            record = dict(fund_results[plan['fund_code']])
+            record['fund_name'] = plan['fund_name']
+            record['plan_name'] = plan['plan_name']
+            record['user_id'] = plan['user_id']
+            record['deduplicated'] = plan['fund_code'] in counted
+            if record['deduplicated']:
+                record['rows_written'] = 0
+            counted.add(plan['fund_code'])
+            details.append(record)
+
+        # 汇总
+        success_cnt = sum(1 for r in fund_results.values() if r['success'])
+        print(f"\n完成：成功 {success_cnt}/{len(fund_results)} 个基金")
+        if self.auto_confirm:
+            print(f"新净值自动确认待确认交易 {self.confirmed_count} 条")
+        print(f"HTTP统计：{get_default_client().stats.summary()}")
+        if self.page_cache is not None:
+            print(f"页面缓存：{self.page_cache.summary()}")
+        return details
 
     def import_enabled_plans(self, start_date_override: str | None = None, end_date_override: str | None = None):
-            """批量导入启用计划历史净值并返回写入明细
-            Args:
-                start_date_override: 可选覆盖的开始日期 (字符串 'YYYY-MM-DD'，留空则从基金成立日起)
-                end_date_override: 可选覆盖的结束日期 (字符串 'YYYY-MM-DD'，留空则到今天)
-            
-            Returns:
-                List[Dict]: 每个计划的导入结果明细
-            """
+        """批量导入当前用户启用计划的历史净值并返回写入明细
+        Args:
+            start_date_override: 可选覆盖的开始日期 (字符串 'YYYY-MM-DD'，留空则从基金成立日起)
+            end_date_override: 可选覆盖的结束日期 (字符串 'YYYY-MM-DD'，留空则到今天)
+        
+        Returns:
+            List[Dict]: 每个计划的导入结果明细
+        """
+        plans = self.load_enabled_plans()
+        if not plans:
+            return []
+        return self._run_plans(plans, start_date_override, end_date_override)
 
-            plans = self.load_enabled_plans()
-            if not plans:
-                return []
-            end_used_global = end_date_override or datetime.now().strftime('%Y-%m-%d')
-            details = []
-            print(f"\n将导入 {len(plans)} 个启用计划到数据库: {self.db_url}")
-            for plan in plans:
-                fund_code = plan['fund_code']
-                fund_name = plan['fund_name']
-                plan_name = plan['plan_name']
-                # 计算起始日期：如果存在最新净值日期，则从其下一日开始；否则视为基金成立日 (None)
-                latest_date = self.get_latest_nav_date(fund_code)
-                start_used = None
-                if latest_date:
-                    try:
-                        dt_latest = datetime.strptime(latest_date, '%Y-%m-%d')
-                        next_day = dt_latest + timedelta(days=1)
-                        start_used = next_day.strftime('%Y-%m-%d')
-                    except Exception:
-                        start_used = None
-                # 如果用户提供了覆盖开始日期，取二者中较晚的那个
-                if start_date_override:
-                    try:
-                        dt_override = datetime.strptime(start_date_override, '%Y-%m-%d')
-                        if start_used:
-                            dt_start_used = datetime.strptime(start_used, '%Y-%m-%d')
-                            if dt_override > dt_start_used:
-                                start_used = start_date_override
-                        else:
-                            start_used = start_date_override
-                    except Exception:
-                        pass
-                end_used = end_used_global
-                start_display = start_used or '基金成立日'
-                print(f"\n[{fund_code}] {fund_name}\n计划: {plan_name}\n起始: {start_display} 结束: {end_used}")
-                record = {
-                    'fund_code': fund_code,
-                    'fund_name': fund_name,
-                    'plan_name': plan_name,
-                    'start_used': start_display,
-                    'end_used': end_used,
-                    'rows_written': 0,
-                    'success': False,
-                    'error': ''
-                }
-                try:
-                    # 若最新日期已覆盖到结束日期之前（即没有新数据需要抓取），直接跳过抓取
-                    if start_used and start_used > end_used:
-                        print(f"无需要更新的净值：最新已存在日期 {latest_date} 已不早于结束日期 {end_used}")
-                        record['success'] = True
-                        details.append(record)
-                        continue
-                    df = self.fetch_fund_history(fund_code, fund_name, start_used, end_used)
-                    if df is not None and not df.empty:
-                        rows = self.save_nav_history(df, fund_code, fund_name)
-                        record['rows_written'] = rows
-                    record['success'] = True
-                except Exception as e:
-                    record['error'] = str(e)
-                    print(f"导入失败 {fund_name}({fund_code}): {e}")
-                details.append(record)
-            # 汇总
-            success_cnt = sum(1 for d in details if d['success'])
-            print(f"\n完成：成功 {success_cnt}/{len(details)}")
-            return details
+    def import_all_users_plans(self, start_date_override: str | None = None, end_date_override: str | None = None):
+        """汇总所有用户启用计划中的基金，每个基金只抓取一次，按用户返回明细
 
+        Returns:
+            Dict[int, List[Dict]]: user_id -> 该用户每个计划的导入结果明细
+        """
+        plans = self.load_enabled_plans(all_users=True)
+        if not plans:
+            return {}
+        per_user = {}
+        for record in self._run_plans(plans, start_date_override, end_date_override):
+            per_user.setdefault(record['user_id'], []).append(record)
+        return per_user
+
+
+def list_active_users(engine):
+    """返回所有活跃用户的ID"""
+    with engine.connect() as conn:
+        return [row[0] for row in conn.execute(text("SELECT id FROM users WHERE is_active = true ORDER BY id"))]
 
 
 def fetch_nav_history(start_date_override=None, end_date_override=None, 
@@ -359,3 +538,13 @@ def fetch_nav_history(start_date_override=None, end_date_override=None,
     fetcher = HistoryNavFetcher(db_url=db_url, data_source=data_source, user_id=user_id)
     return fetcher.import_enabled_plans(start_date_override, end_date_override)
 
+
+def fetch_nav_history_all_users(start_date_override=None, end_date_override=None,
+                                db_url=None, data_source='fundSpider'):
+    """抓取所有用户启用计划的历史净值，每个基金只抓取一次（PostgreSQL）
+
+    Returns:
+        Dict[int, List[Dict]]: user_id -> 该用户每个计划的导入结果明细
+    """
+    fetcher = HistoryNavFetcher(db_url=db_url, data_source=data_source)
+    return fetcher.import_all_users_plans(start_date_override, end_date_override)
@@ -0,0 +1,90 @@
+'''lsjz 原始响应的磁盘缓存与离线回放
+
+缓存键为请求 URL 与请求参数 (基金代码、起止日期、每页条数、页码) 的 SHA-256，
+切换数据源地址时不会读到另一数据源的页面；文件按哈希前两位分目录存放。过期策略:
+    - 结束日期早于今天 settle_days 个工作日以上的窗口视为已定稿，永不过期
+      （QDII/LOF 等基金净值 T+1、T+2 才公布，最近几天的窗口仍可能补入数据）
+    - 其余窗口 open_window_ttl 秒后过期
+离线模式下只读缓存，未命中时抛出 CacheMissError，不访问网络。
+'''
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+
+
+class CacheMissError(Exception):
+    '''离线模式下缓存未命中'''
+
+
+class PageCache(object):
+    KEY_FIELDS = ('type', 'code', 'sdate', 'edate', 'per', 'page')
+
+    def __init__(self, root, open_window_ttl=600, offline=False, settle_days=2):
+        self.root = Path(root)
+        self.open_window_ttl = open_window_ttl
+        self.settle_days = settle_days
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, url, params):
+        fields = {k: str(params.get(k, '')) for k in self.KEY_FIELDS}
+        payload = json.dumps({'url': url, 'params': fields}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return self.root / key[:2] / f"{key}.txt"
+
+    def ttl_for(self, params):
+        '''返回缓存有效期（秒），None 表示永不过期'''
+        settled = np.busday_offset(np.datetime64(date.today(), 'D'), -self.settle_days, roll='backward')
+        if str(params.get('edate', '')) < str(settled):
+            return None
+        return self.open_window_ttl
+
+    def get(self, url, params):
+        path = self._path(self.key(url, params))
+        text = None
+        try:
+            # 离线回放时忽略过期时间
+            ttl = None if self.offline else self.ttl_for(params)
+            if ttl is None or time.time() - path.stat().st_mtime < ttl:
+                text = path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            if text is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if text is None and self.offline:
+            raise CacheMissError(f"离线模式缓存未命中: {params.get('code')} page={params.get('page')}")
+        return text
+
+    def put(self, url, params, text):
+        path = self._path(self.key(url, params))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(text, encoding='utf-8')
+        os.replace(tmp, path)
+
+    def summary(self):
+        return f"缓存命中 {self.hits} 次，未命中 {self.misses} 次"
+
+
+def cache_from_env():
+    '''根据环境变量 NDX_SPIDER_CACHE_DIR / NDX_SPIDER_OFFLINE / NDX_SPIDER_CACHE_TTL 构建缓存，未配置时返回 None'''
+    root = os.getenv('NDX_SPIDER_CACHE_DIR')
+    if not root:
+        return None
+    offline = os.getenv('NDX_SPIDER_OFFLINE', '').lower() in ('1', 'true', 'yes')
+    ttl = int(os.getenv('NDX_SPIDER_CACHE_TTL', '600'))
+    return PageCache(root, open_window_ttl=ttl, offline=offline)
@@ -0,0 +1,159 @@
+'''本地模拟 F10DataApi (type=lsjz) 的 HTTP 服务，用于无网络压测抓取吞吐与并发参数
+
+净值序列由基金代码确定性生成（工作日视为交易日），可配置响应延迟、每页条数与错误率。
+
+命令行启动:
+    python -m fundSpider.fake_server --port 8765 --latency-ms 80 --error-rate 0.02
+然后将 EastmoneyNavSource(url="http://127.0.0.1:8765/f10/F10DataApi.aspx") 指向它。
+'''
+
+import argparse
+import hashlib
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+API_PATH = '/f10/F10DataApi.aspx'
+HEADER = ("<table class='w782 comm lsjz'><thead><tr><th class='first'>净值日期</th><th>单位净值</th>"
+          "<th>累计净值</th><th>日增长率</th><th>申购状态</th><th>赎回状态</th>"
+          "<th class='tor last'>分红送配</th></tr></thead><tbody>")
+EMPTY_ROW = "<tr><td colspan='7' align='center'>暂无数据!</td></tr>"
+INCEPTION = date(2010, 1, 4)
+
+
+def _parse_day(value, default):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def synthetic_rows(code, start, end):
+    '''生成 [start, end] 内的净值行（日期倒序），同一基金代码每次生成结果相同'''
+    seed = int(hashlib.md5(code.encode('utf-8')).hexdigest()[:8], 16)
+    rng = random.Random(seed)
+    start = max(start, INCEPTION)
+    end = min(end, date.today())
+    rows = []
+    nav = 1.0
+    day = INCEPTION
+    while day <= end:
+        if day.weekday() < 5:
+            growth = rng.gauss(0.03, 1.2)
+            nav = max(0.1, nav * (1 + growth / 100))
+            if day >= start:
+                rows.append((day.isoformat(), nav, nav + 0.5, growth))
+        day += timedelta(days=1)
+    rows.reverse()
+    return rows
+
+
+def render_page(rows, page, per):
+    pages = (len(rows) + per - 1) // per
+    chunk = rows[(page - 1) * per: page * per] if page >= 1 else []
+    if chunk:
+        body = ''.join(
+            f"<tr><td>{d}</td><td class='tor bold'>{u:.4f}</td><td class='tor bold'>{c:.4f}</td>"
+            f"<td class='tor bold red'>{g:.2f}%</td><td>开放申购</td><td>开放赎回</td>"
+            f"<td class='red unbold'></td></tr>"
+            for d, u, c, g in chunk
+        )
+    else:
+        body = EMPTY_ROW
+    return (f'var apidata={{ content:"{HEADER}{body}</tbody></table>",'
+            f'records:{len(rows)},pages:{pages},curpage:{page}}};')
+
+
+class FakeLsjzServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=50.0, jitter_ms=20.0, error_rate=0.0, page_size=None):
+        super().__init__(address, _Handler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.page_size = page_size
+        self.request_count = 0
+        self._rows_cache = {}
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{API_PATH}"
+
+    def rows_for(self, code, start, end):
+        key = (code, start, end)
+        with self._lock:
+            rows = self._rows_cache.get(key)
+        if rows is None:
+            rows = synthetic_rows(code, start, end)
+            with self._lock:
+                self._rows_cache[key] = rows
+        return rows
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        with server._lock:
+            server.request_count += 1
+        parsed = urlparse(self.path)
+        if parsed.path != API_PATH:
+            self.send_error(404)
+            return
+
+        delay = max(0.0, random.gauss(server.latency_ms, server.jitter_ms)) / 1000
+        time.sleep(delay)
+        if server.error_rate and random.random() < server.error_rate:
+            self.send_error(503)
+            return
+
+        qs = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        today = date.today()
+        rows = server.rows_for(qs.get('code', '000000'),
+                               _parse_day(qs.get('sdate'), INCEPTION),
+                               _parse_day(qs.get('edate'), today))
+        per = server.page_size or int(qs.get('per', 49))
+        body = render_page(rows, int(qs.get('page', 1)), per).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_server(host='127.0.0.1', port=0, **options):
+    '''在后台线程启动模拟服务器，返回 server（server.url 为接口地址，用完调用 server.shutdown()）'''
+    server = FakeLsjzServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake eastmoney lsjz server for local benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="平均响应延迟")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="延迟标准差")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 503 的概率")
+    parser.add_argument("--page-size", type=int, default=None, help="每页条数，默认使用请求中的 per")
+    args = parser.parse_args()
+
+    server = FakeLsjzServer((args.host, args.port), latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                            error_rate=args.error_rate, page_size=args.page_size)
+    print(f"模拟 lsjz 服务已启动: {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n已停止")
+
+
+if __name__ == '__main__':
+    main()
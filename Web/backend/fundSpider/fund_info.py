@@ -1,26 +1,49 @@
 '''获取基金信息的模块'''
 
-import requests
+import asyncio
+import threading
 from datetime import datetime
-from bs4 import BeautifulSoup
+from urllib.parse import urlparse
+import numpy as np
 import pandas as pd
+from .http_client import get_default_client
+from .lsjz_parser import parse_rows, parse_summary
+
+# 每个主机一个进程级信号量：多个抓取线程各自 asyncio.run 时也共享同一上限
+# 上限取该主机第一次请求时的 limit
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
+
+
+def _host_semaphore(host, limit):
+    with _host_semaphores_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(limit)
+        return _host_semaphores[host]
+
 
 class FuncInfo(object):
-    def __init__(self, code, name=None):
+    url = "http://fund.eastmoney.com/f10/F10DataApi.aspx"
+    per_page = 49                                   # 每页记录数
+    max_concurrency = 4                             # 异步模式下同一主机的最大并发请求数
+
+    def __init__(self, code, name=None, client=None, cache=None):
         self.code = code                            # 基金代码
         self.name = name                            # 基金名               
-        self._unit_value_ls = []                    # 单位净值list
-        self._cumulative_value_ls = []              # 累计净值list
-        self._daily_growth_rate_ls = []             # 日增长率
-        self._date_ls = []                          # 交易日list
-        self._date2idx_map = {}                     # 交易日 -> 单位净值list/累计净值list.. idx
+        self.client = client or get_default_client()    # 共享HTTP客户端
+        self.cache = cache                          # 原始响应磁盘缓存 (PageCache)，None 表示不缓存
+        self.clear_data()
 
     def clear_data(self):
-        self._unit_value_ls = []
-        self._cumulative_value_ls = []
-        self._daily_growth_rate_ls = []
-        self._date_ls = []
-        self._date2idx_map = {}
+        # 按页追加的列块，读取时合并为连续数组
+        self._chunks = []                           # [(日期序数, 单位净值, 累计净值, 日增长率), ...]
+        self._seen_dates = set()                    # 已入库的日期序数，用于去重
+        self._dates = np.empty(0, dtype=np.int64)   # 交易日（自 1970-01-01 起的天数）
+        self._unit_values = np.empty(0)             # 单位净值 float64
+        self._cumulative_values = np.empty(0)       # 累计净值 float64，缺失为 NaN
+        self._daily_growth_rates = np.empty(0)      # 日增长率(%) float64，缺失为 NaN
+        self._sorted_idx = None                     # 按日期升序的下标，用于按日期查找
+        self._sorted_dates = None                   # 与 _sorted_idx 对应的升序日期
 
     @staticmethod
     def _parse_date(date, fmt):
@@ -30,70 +53,204 @@ class FuncInfo(object):
             raise Exception("date type(%s) error, required: datetime or str" % type(date))
         return date
 
+    def _consolidate(self):
+        if not self._chunks:
+            return
+        parts = [(self._dates, self._unit_values, self._cumulative_values, self._daily_growth_rates)]
+        parts.extend(self._chunks)
+        self._dates, self._unit_values, self._cumulative_values, self._daily_growth_rates = (
+            np.concatenate(col) for col in zip(*parts)
+        )
+        self._chunks = []
+        self._sorted_idx = None
+        self._sorted_dates = None
+
     def _date2idx(self, date):
-        date = self._parse_date(date, "%Y-%m-%d")
-        return self._date2idx_map.get(date)
+        self._consolidate()
+        ordinal = np.datetime64(self._parse_date(date, "%Y-%m-%d"), 'D').astype(np.int64)
+        if self._sorted_idx is None:
+            self._sorted_idx = np.argsort(self._dates, kind='stable')
+            self._sorted_dates = self._dates[self._sorted_idx]
+        sorted_dates = self._sorted_dates
+        pos = np.searchsorted(sorted_dates, ordinal)
+        if pos < len(sorted_dates) and sorted_dates[pos] == ordinal:
+            return int(self._sorted_idx[pos])
+        return None
 
     def get_unit_value(self, date):
         idx = self._date2idx(date)
-        return None if idx is None else self._unit_value_ls[idx]
+        return None if idx is None else float(self._unit_values[idx])
 
     def get_cumulative_value(self, date):
         idx = self._date2idx(date)
-        return None if idx is None else self._cumulative_value_ls[idx]
+        return None if idx is None else float(self._cumulative_values[idx])
 
     def get_daily_growth_rate(self, date):
         idx = self._date2idx(date)
-        return None if idx is None else self._daily_growth_rate_ls[idx]
+        return None if idx is None else float(self._daily_growth_rates[idx])
 
-    def load_net_value_info(self, start_date, end_date):
-        url = "http://fund.eastmoney.com/f10/F10DataApi.aspx"
+    def _build_query(self, start_date, end_date):
         date_fmt = "%Y-%m-%d"
-        info = {
+        return {
             "type": "lsjz",
             "code": self.code,
-            "per": 49,
+            "per": self.per_page,
             "sdate": self._parse_date(start_date, date_fmt),
             "edate": self._parse_date(end_date, date_fmt),
         }
+
+    def _request_page(self, info, page):
+        '''请求第 page 页，返回原始响应文本；配置了缓存时优先读缓存'''
+        params = dict(info, page=page)
+        if self.cache is not None:
+            text = self.cache.get(self.url, params)
+            if text is not None:
+                return text
+        text = self.client.get_text(self.url, params)
+        # 只缓存带分页信息的完整响应
+        if self.cache is not None and parse_summary(text) is not None:
+            self.cache.put(self.url, params, text)
+        return text
+
+    @staticmethod
+    def _parse_page_count(text):
+        '''从响应尾部的 records:N,pages:M 中读取总记录数与总页数，解析失败返回 None'''
+        summary = parse_summary(text)
+        return None if summary is None else summary[:2]
+
+    def _ingest_page(self, text):
+        '''解析一页响应，将新日期的数据作为类型化列块追加，返回本页是否有新数据'''
+        rows = parse_rows(text)
+        if not rows:
+            return False
+        dates, unit_values, cumulative_values, growth_rates = zip(*rows)
+        ordinals = np.array(dates, dtype='datetime64[D]').astype(np.int64)
+        seen = self._seen_dates
+        keep = [i for i, o in enumerate(ordinals.tolist()) if not (o in seen or seen.add(o))]
+        if not keep:
+            return False
+        columns = (ordinals, np.array(unit_values), np.array(cumulative_values), np.array(growth_rates))
+        if len(keep) < len(rows):
+            columns = tuple(col[keep] for col in columns)
+        self._chunks.append(columns)
+        return True
+
+    def load_net_value_info(self, start_date, end_date, concurrency=None):
+        '''抓取 [start_date, end_date] 的历史净值
+
+        concurrency 为 None 时逐页顺序抓取；传入整数时使用 asyncio 并发抓取，
+        concurrency 为同一主机的并发上限。两种模式得到的数据及顺序一致。
+        '''
+        if concurrency:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return asyncio.run(self.aload_net_value_info(start_date, end_date, concurrency))
+            raise RuntimeError("已在事件循环中运行，请直接 await aload_net_value_info()")
+
+        info = self._build_query(start_date, end_date)
         page = 0
-        # fp = open("./output/fund_info/%s_%s_raw.txt" % (self.code, self.name), "w")
         update_flag = True
         while update_flag:
             page = page + 1
-            update_flag = False
-            info["page"] = page
-            r = requests.get(url, info)
-            soup = BeautifulSoup(r.text, 'lxml')
-            th_list = None
-            for idx, tr in enumerate(soup.find_all('tr')):
-                if idx == 0:
-                    th_list = [x.text for x in tr.find_all("th")]
-                else:
-                    tds = tr.find_all('td')
-                    values = [w.text for w in tds]
-                    if values[0] == "暂无数据!":
-                        break
-                    dict_data = dict(zip(th_list, values))
-                    # fp.write("%s\n" % dict_data)
-                    date = dict_data.get("净值日期")
-                    if date and not self._date2idx_map.get(date):
-                        self._date2idx_map[dict_data.get("净值日期")] = len(self._unit_value_ls)
-                        self._unit_value_ls.append(dict_data.get("单位净值"))
-                        self._cumulative_value_ls.append(dict_data.get("累计净值"))
-                        self._date_ls.append(date)
-                        self._daily_growth_rate_ls.append(dict_data.get("日增长率"))  
-                        update_flag = True
+            update_flag = self._ingest_page(self._request_page(info, page))
 
-    def get_data_frame(self):
-        date_list = self._date_ls
-        df = pd.DataFrame({
-            "净值日期": date_list,
-            "单位净值": [self.get_unit_value(date) for date in date_list],
-            "累计净值": [self.get_cumulative_value(date) for date in date_list],
-            "日增长率": [self.get_daily_growth_rate(date) for date in date_list],
-        })
-        return df
+    @staticmethod
+    def _has_new_rows(text, seen):
+        '''无分页信息时顺序翻页的停止条件：本页是否有未见过的日期'''
+        new = False
+        for row in parse_rows(text):
+            if row[0] not in seen:
+                seen.add(row[0])
+                new = True
+        return new
+
+    def _request_pages(self, info, pages, concurrency=None):
+        '''请求一组页面，按传入顺序返回；concurrency 为整数时并发请求'''
+        if not concurrency or len(pages) < 2:
+            return [self._request_page(info, page) for page in pages]
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self._afetch_pages(info, pages, concurrency))
+        raise RuntimeError("已在事件循环中运行，请使用 afetch_page_texts()")
+
+    async def _afetch_pages(self, info, pages, limit):
+        host_sem = _host_semaphore(urlparse(self.url).netloc, limit)
+        # 本次调用最多占用 limit 个线程，主机级上限在请求线程内获取
+        local_sem = asyncio.Semaphore(limit)
+
+        def request(page):
+            with host_sem:
+                return self._request_page(info, page)
+
+        async def fetch(page):
+            async with local_sem:
+                return await asyncio.to_thread(request, page)
+
+        return list(await asyncio.gather(*(fetch(page) for page in pages)))
+
+    def iter_page_texts(self, start_date, end_date, batch_pages=20, concurrency=None):
+        '''流式抓取原始页面文本，每次产出最多 batch_pages 页（list），不在对象中保留任何数据
 
+        天天基金第 1 页为最新数据。先请求第 1 页读取总页数，再从最后一页（最早的数据）开始
+        按批向前抓取，第 1 页最后产出。调用方逐批写库时，中断后库中保留的是从起始日期开始的
+        连续区间，下次同步只需补尾部缺口。响应中没有分页信息时只能从第 1 页逐页向后抓取。
+        '''
+        info = self._build_query(start_date, end_date)
+        first = self._request_page(info, 1)
+        summary = self._parse_page_count(first)
+        if summary is None:
+            seen, page, text = set(), 1, first
+            while self._has_new_rows(text, seen):
+                yield [text]
+                page += 1
+                text = self._request_page(info, page)
+            return
+        _, pages = summary
+        older = list(range(pages, 1, -1))
+        for i in range(0, len(older), batch_pages):
+            yield self._request_pages(info, older[i:i + batch_pages], concurrency)
+        yield [first]
 
+    async def afetch_page_texts(self, start_date, end_date, concurrency=None):
+        '''异步抓取原始页面文本
 
+        先请求第 1 页读取总页数，再并发请求剩余页面，按页码顺序返回。
+        '''
+        info = self._build_query(start_date, end_date)
+        limit = concurrency or self.max_concurrency
+
+        first, = await self._afetch_pages(info, [1], limit)
+        summary = self._parse_page_count(first)
+        if summary is None:
+            # 响应中没有分页信息，退回顺序抓取
+            texts, seen, page = [first], set(), 1
+            while self._has_new_rows(texts[-1], seen):
+                page += 1
+                texts.extend(await self._afetch_pages(info, [page], limit))
+            return texts
+        _, pages = summary
+        return [first, *await self._afetch_pages(info, range(2, pages + 1), limit)]
+
+    async def aload_net_value_info(self, start_date, end_date, concurrency=None):
+        '''异步抓取历史净值
+
+        并发抓取全部页面后按页码顺序合并，保证 get_data_frame 的输出与顺序抓取一致。
+        '''
+        for text in await self.afetch_page_texts(start_date, end_date, concurrency):
+            self._ingest_page(text)
+
+    def get_arrays(self):
+        '''返回各列的 NumPy 数组（零拷贝视图），日期为 datetime64[D]'''
+        self._consolidate()
+        return {
+            "净值日期": self._dates.view('datetime64[D]'),
+            "单位净值": self._unit_values,
+            "累计净值": self._cumulative_values,
+            "日增长率": self._daily_growth_rates,
+        }
+
+    def get_data_frame(self):
+        '''净值列直接引用内部数组，不做拷贝；缺失值为 NaN'''
+        return pd.DataFrame(self.get_arrays(), copy=False)
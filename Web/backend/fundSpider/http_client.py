@@ -0,0 +1,232 @@
+'''爬虫共享的HTTP客户端：连接复用、超时、重试退避、限速、熔断与请求统计'''
+
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class CircuitOpenError(Exception):
+    '''熔断器处于打开状态，请求被直接拒绝'''
+
+
+class RateLimiter(object):
+    '''令牌桶限速器（线程安全），rate 为每秒请求数，burst 为桶容量'''
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, int(rate)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class CircuitBreaker(object):
+    '''连续失败 failure_threshold 次后打开，reset_timeout 秒后只放行一个试探请求，试探结束前其余请求仍被拒绝'''
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False                       # 半开状态下已有试探请求在进行
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def before_request(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if not self._probing and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._probing = True
+                return
+        raise CircuitOpenError("上游服务连续失败，熔断中，请稍后再试")
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._probing = False
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                # 半开状态下的试探失败会重新计时
+                self._opened_at = time.monotonic()
+
+    def release_probe(self):
+        '''请求结束但不计入熔断时（4xx、非网络异常）交还试探名额'''
+        with self._lock:
+            self._probing = False
+
+
+class RequestStats(object):
+    '''请求次数与耗时统计'''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self.requests = 0
+        self.failures = 0
+        self.retries = 0
+        self.rejected = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def reset(self):
+        with self._lock:
+            self._clear()
+
+    def record(self, latency, ok):
+        with self._lock:
+            self.requests += 1
+            if not ok:
+                self.failures += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self):
+        with self._lock:
+            avg = self.total_latency / self.requests if self.requests else 0.0
+            return {
+                'requests': self.requests,
+                'failures': self.failures,
+                'retries': self.retries,
+                'rejected': self.rejected,
+                'avg_latency_ms': round(avg * 1000, 1),
+                'max_latency_ms': round(self.max_latency * 1000, 1),
+            }
+
+    def summary(self):
+        s = self.snapshot()
+        return (f"请求 {s['requests']} 次，失败 {s['failures']} 次，重试 {s['retries']} 次，熔断拒绝 {s['rejected']} 次，"
+                f"平均耗时 {s['avg_latency_ms']}ms，最大耗时 {s['max_latency_ms']}ms")
+
+
+class SpiderHttpClient(object):
+    '''所有爬虫请求共用的HTTP客户端
+
+    Args:
+        connect_timeout / read_timeout: 连接与读取超时（秒）
+        max_retries: 失败后的最大重试次数
+        backoff_base / backoff_max: 指数退避的基数与上限（秒），实际等待为 [0, 上限] 内的随机值
+        rate_limit: 每秒最多请求数，None 表示不限速
+        pool_size: 每个主机保持的连接数，应不小于并发抓取数
+        failure_threshold / reset_timeout: 熔断器参数
+    '''
+
+    RETRY_STATUS = {429, 500, 502, 503, 504}
+
+    def __init__(self, connect_timeout=5.0, read_timeout=15.0, max_retries=3,
+                 backoff_base=0.5, backoff_max=8.0, rate_limit=10.0, pool_size=8,
+                 failure_threshold=5, reset_timeout=30.0):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.stats = RequestStats()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _backoff(self, attempt):
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def get(self, url, params=None):
+        '''GET 请求，失败时按抖动指数退避重试，返回 requests.Response'''
+        attempt = 0
+        while True:
+            try:
+                self.breaker.before_request()
+            except CircuitOpenError:
+                self.stats.record_rejected()
+                raise
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+
+            start = time.monotonic()
+            error = None
+            try:
+                r = self.session.get(url, params=params, timeout=self.timeout)
+                if r.status_code in self.RETRY_STATUS:
+                    error = requests.HTTPError(f"HTTP {r.status_code}", response=r)
+                else:
+                    r.raise_for_status()
+            except requests.RequestException as e:
+                error = e
+            except BaseException:
+                self.breaker.release_probe()
+                raise
+            self.stats.record(time.monotonic() - start, error is None)
+
+            if error is None:
+                self.breaker.record_success()
+                return r
+            # 4xx（429 除外）是请求本身的问题，不重试也不计入熔断
+            response = getattr(error, 'response', None)
+            if response is not None and response.status_code not in self.RETRY_STATUS:
+                self.breaker.release_probe()
+                raise error
+            self.breaker.record_failure()
+            if attempt >= self.max_retries:
+                raise error
+            self.stats.record_retry()
+            time.sleep(self._backoff(attempt))
+            attempt += 1
+
+    def get_text(self, url, params=None):
+        return self.get(url, params).text
+
+    def close(self):
+        self.session.close()
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_default_client():
+    '''进程内共享的默认客户端'''
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = SpiderHttpClient()
+        return _default_client
@@ -0,0 +1,84 @@
+'''天天基金 F10DataApi (type=lsjz) 响应的快速解析模块
+
+响应格式形如:
+    var apidata={ content:"<table>...</table>",records:123,pages:3,curpage:1};
+
+content 内为历史净值表格。这里直接用 lxml.etree 解析表格并返回类型化的元组，
+不再构建 BeautifulSoup 树和逐行 dict。
+'''
+
+import re
+
+from lxml import etree
+
+NAN = float('nan')
+
+# 每行: (净值日期 'YYYY-MM-DD', 单位净值, 累计净值, 日增长率(%))，缺失值为 NaN
+COLUMNS = ('净值日期', '单位净值', '累计净值', '日增长率')
+_SUMMARY_RE = re.compile(r"records:\s*(\d+)\s*,\s*pages:\s*(\d+)\s*,\s*curpage:\s*(\d+)")
+_CONTENT_RE = re.compile(r'content:"(.*?)"\s*,\s*records:', re.S)
+_HTML_PARSER = etree.HTMLParser()
+
+
+def parse_float(value):
+    ''''1.2345' -> 1.2345，'0.12%' -> 0.12，空值/'--'/非法值 -> NaN'''
+    if not value:
+        return NAN
+    value = value.strip().rstrip('%')
+    try:
+        return float(value)
+    except ValueError:
+        return NAN
+
+
+def _cell_text(td):
+    # 绝大多数单元格是纯文本，只有带子节点时才拼接全部文本
+    if len(td):
+        return ''.join(td.itertext()).strip()
+    return (td.text or '').strip()
+
+
+def parse_summary(text):
+    '''读取 (records, pages, curpage)，解析失败返回 None'''
+    m = _SUMMARY_RE.search(text)
+    if not m:
+        return None
+    return int(m.group(1)), int(m.group(2)), int(m.group(3))
+
+
+def parse_rows(text):
+    '''解析表格行，返回 [(date, unit_nav, cumulative_nav, daily_growth_rate), ...]，顺序与响应一致'''
+    m = _CONTENT_RE.search(text)
+    html = m.group(1) if m else text
+    if '<tr' not in html:
+        return []
+    root = etree.fromstring(html, _HTML_PARSER)
+    if root is None:
+        return []
+
+    col_idx = None
+    rows = []
+    for tr in root.iter('tr'):
+        cells = [c for c in tr if c.tag in ('th', 'td')]
+        if not cells:
+            continue
+        if cells[0].tag == 'th':
+            headers = [_cell_text(c) for c in cells]
+            col_idx = [headers.index(name) if name in headers else None for name in COLUMNS]
+            continue
+        if col_idx is None:
+            col_idx = [0, 1, 2, 3]
+        values = [_cell_text(c) for c in cells]
+        if values[0] == "暂无数据!":
+            break
+        d_i, u_i, c_i, g_i = col_idx
+        date = values[d_i] if d_i is not None and d_i < len(values) else ''
+        if not date:
+            continue
+        rows.append((
+            date,
+            parse_float(values[u_i]) if u_i is not None and u_i < len(values) else NAN,
+            parse_float(values[c_i]) if c_i is not None and c_i < len(values) else NAN,
+            parse_float(values[g_i]) if g_i is not None and g_i < len(values) else NAN,
+        ))
+    return rows
@@ -0,0 +1,122 @@
+'''净值数据源接口
+
+数据源按基金代码与日期区间返回类型化的 NavBatch。HistoryNavFetcher 通过
+data_source 名称查找数据源，新的数据源只需实现 fetch 并调用 register_data_source 注册。
+可选实现 iter_batches（流式分批返回）以及 iter_pages / parse_pages（抓取与解析分离），
+未实现时调用方退回 fetch。
+'''
+
+from typing import Protocol
+
+import numpy as np
+import pandas as pd
+
+from .fund_info import FuncInfo
+
+
+class NavBatch(object):
+    '''一个基金的一批净值数据，各列为等长 NumPy 数组
+
+    dates 为 datetime64[D]；unit_nav / cumulative_nav / daily_growth_rate 为 float64，缺失值为 NaN。
+    行顺序与数据源返回一致（天天基金为日期倒序）。
+    '''
+
+    def __init__(self, fund_code, dates, unit_nav, cumulative_nav, daily_growth_rate, fund_name=None):
+        self.fund_code = fund_code
+        self.fund_name = fund_name
+        self.dates = dates
+        self.unit_nav = unit_nav
+        self.cumulative_nav = cumulative_nav
+        self.daily_growth_rate = daily_growth_rate
+
+    def __len__(self):
+        return len(self.dates)
+
+    @classmethod
+    def empty(cls, fund_code, fund_name=None):
+        return cls(fund_code, np.empty(0, dtype='datetime64[D]'), np.empty(0), np.empty(0), np.empty(0), fund_name)
+
+    @classmethod
+    def from_func_info(cls, fund):
+        arrays = fund.get_arrays()
+        return cls(fund.code, arrays["净值日期"], arrays["单位净值"], arrays["累计净值"], arrays["日增长率"], fund.name)
+
+    def to_frame(self):
+        '''转为与 FuncInfo.get_data_frame 相同列名的 DataFrame'''
+        return pd.DataFrame({
+            "净值日期": self.dates,
+            "单位净值": self.unit_nav,
+            "累计净值": self.cumulative_nav,
+            "日增长率": self.daily_growth_rate,
+        }, copy=False)
+
+
+class NavDataSource(Protocol):
+    name: str
+
+    def fetch(self, fund_code, start_date, end_date, fund_name=None) -> NavBatch:
+        '''返回 [start_date, end_date] 内的净值，日期为 datetime 或 'YYYY-MM-DD' 字符串'''
+        ...
+
+
+class EastmoneyNavSource(object):
+    '''天天基金 F10DataApi 数据源（基于 FuncInfo）
+
+    url 可指向本地模拟服务器（见 fundSpider.fake_server）用于压测。
+    '''
+
+    name = 'fundSpider'
+
+    def __init__(self, client=None, cache=None, concurrency=4, url=None):
+        self.client = client
+        self.cache = cache
+        self.concurrency = concurrency
+        self.url = url
+
+    def _make_fund(self, fund_code, fund_name):
+        fund = FuncInfo(code=fund_code, name=fund_name, client=self.client, cache=self.cache)
+        if self.url:
+            fund.url = self.url
+        return fund
+
+    def fetch(self, fund_code, start_date, end_date, fund_name=None):
+        fund = self._make_fund(fund_code, fund_name)
+        fund.load_net_value_info(start_date, end_date, concurrency=self.concurrency)
+        return NavBatch.from_func_info(fund)
+
+    def iter_pages(self, fund_code, start_date, end_date, batch_pages=20):
+        '''流式抓取原始页面文本，每次产出最多 batch_pages 页，从最早的数据开始（见 FuncInfo.iter_page_texts）
+
+        与 parse_pages 配合可把网络与解析放在不同线程，并让内存占用与历史长度无关。
+        '''
+        fund = self._make_fund(fund_code, None)
+        yield from fund.iter_page_texts(start_date, end_date, batch_pages, concurrency=self.concurrency)
+
+    def iter_batches(self, fund_code, start_date, end_date, fund_name=None, batch_pages=20):
+        '''流式返回 NavBatch，每批对应 iter_pages 的一组页面'''
+        for texts in self.iter_pages(fund_code, start_date, end_date, batch_pages):
+            yield self.parse_pages(fund_code, texts, fund_name)
+
+    def parse_pages(self, fund_code, texts, fund_name=None):
+        '''解析 iter_pages 产出的一组页面，结果与 fetch 相同'''
+        fund = self._make_fund(fund_code, fund_name)
+        for text in texts:
+            fund._ingest_page(text)
+        return NavBatch.from_func_info(fund)
+
+
+_SOURCES = {
+    EastmoneyNavSource.name: EastmoneyNavSource,
+}
+
+
+def register_data_source(name, factory):
+    '''注册数据源，factory 接收关键字参数并返回 NavDataSource'''
+    _SOURCES[name] = factory
+
+
+def get_data_source(name, **kwargs):
+    factory = _SOURCES.get(name)
+    if factory is None:
+        raise ValueError(f"未知的数据源: {name}（可选: {', '.join(sorted(_SOURCES))}）")
+    return factory(**kwargs)
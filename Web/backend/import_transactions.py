@@ -6,7 +6,8 @@ import csv
 from datetime import datetime
 import os
 from typing import Optional, Tuple
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from app.utils.engines import get_engine
 from tradeDate import TradeDateChecker
 
 class TransactionImporter:
@@ -22,7 +23,7 @@ class TransactionImporter:
             self.db_url = os.getenv('DATABASE_URL', 'postgresql://localhost:5432/ndx')
             self.db_url = self._resolve_db_url(self.db_url)
         
-        self.engine = create_engine(self.db_url, future=True)
+        self.engine = get_engine(self.db_url)
 
     def _resolve_db_url(self, raw: str) -> str:
         """将数据库URL转换为同步PostgreSQL格式"""
@@ -0,0 +1,290 @@
+'''
+后台任务执行器（PostgreSQL）
+从 background_jobs 表领取排队任务并执行: fetch_nav / update_pending / execute_today
+既可以在 FastAPI 进程内以后台线程运行，也可以单独启动:
+    python job_worker.py --concurrency 2
+'''
+
+import argparse
+import json
+import os
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from app.utils.engines import get_engine
+
+
+def run_fetch_nav(db_url, user_id, params, progress):
+    from fetch_history_nav import HistoryNavFetcher
+
+    fetcher = HistoryNavFetcher(db_url=db_url, data_source='fundSpider', user_id=user_id)
+    fetcher.progress = progress
+    # 如果设置了强制抓取最近 N 天，计算起始日期
+    start_override = None
+    force_recent_days = int(params.get('force_recent_days') or 0)
+    if force_recent_days > 0:
+        start_override = (datetime.now() - timedelta(days=force_recent_days)).strftime('%Y-%m-%d')
+    details = fetcher.import_enabled_plans(start_override, None)
+
+    if not details:
+        return {"message": "没有启用的定投计划需要抓取", "success": False, "details": []}
+    success_count = sum(1 for d in details if d.get('success', False))
+    total_rows = sum(d.get('rows_written', 0) for d in details)
+    return {
+        "message": f"抓取完成: 成功 {success_count}/{len(details)} 个基金，共导入 {total_rows} 条记录",
+        "success": success_count > 0,
+        "total_plans": len(details),
+        "success_count": success_count,
+        "total_rows_written": total_rows,
+        "details": details
+    }
+
+
+def run_update_pending(db_url, user_id, params, progress):
+    from update_pending_transactions import PendingTransactionUpdater
+
+    updater = PendingTransactionUpdater(db_url=db_url, user_id=user_id)
+    result = updater.process_pending_records(
+        params.get('use_target_amount', True),
+        params.get('auto_remove_non_trading', True),
+    )
+    if not result:
+        return {"message": "没有待确认的交易记录", "success": False, "pending_count": 0}
+    return result
+
+
+def run_execute_today(db_url, user_id, params, progress):
+    from execute_plans import AutoInvestExecutor
+
+    executor = AutoInvestExecutor(user_id=user_id, db_url=db_url)
+    result = executor.execute_today(progress=progress)
+    result.setdefault("success", True)
+    return result
+
+
+# job_type -> handler(db_url, user_id, params, progress) -> 可JSON序列化的结果
+JOB_HANDLERS = {
+    'fetch_nav': run_fetch_nav,
+    'update_pending': run_update_pending,
+    'execute_today': run_execute_today,
+}
+
+
+class JobWorker:
+    def __init__(self, db_url: str | None = None, concurrency: int = 2, poll_interval: float = 1.0,
+                 stale_after_seconds: int = 600, max_attempts: int = 3):
+        '''初始化任务执行器（仅支持PostgreSQL）
+
+        Args:
+            concurrency: 同时执行的任务数
+            poll_interval: 队列为空时的轮询间隔（秒）
+            stale_after_seconds: 运行中任务超过该时间没有心跳则视为执行器已崩溃，重新排队
+            max_attempts: 任务最多被领取的次数，超时次数用尽后标记为失败而不再排队
+        '''
+        if db_url:
+            self.db_url = self._resolve_db_url(db_url)
+        else:
+            self.db_url = os.getenv('DATABASE_URL', 'postgresql://localhost:5432/ndx')
+            self.db_url = self._resolve_db_url(self.db_url)
+
+        self.engine = get_engine(self.db_url)
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.stale_after_seconds = stale_after_seconds
+        self.max_attempts = max_attempts
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _resolve_db_url(self, raw: str) -> str:
+        """将数据库URL转换为同步PostgreSQL格式"""
+        if not raw:
+            return 'postgresql://localhost:5432/ndx'
+
+        # Railway等平台可能使用postgres://前缀
+        if raw.startswith('postgres://'):
+            raw = raw.replace('postgres://', 'postgresql://', 1)
+
+        # 确保使用psycopg2驱动（同步）
+        if raw.startswith('postgresql+asyncpg://'):
+            raw = raw.replace('postgresql+asyncpg://', 'postgresql+psycopg2://', 1)
+        elif raw.startswith('postgresql://') and '+' not in raw:
+            raw = raw.replace('postgresql://', 'postgresql+psycopg2://', 1)
+
+        return raw
+
+    def claim(self):
+        """领取最早的排队任务，没有可执行任务时返回 None"""
+        with self.engine.begin() as conn:
+            row = conn.execute(
+                text(
+                    """UPDATE background_jobs
+                         SET status = 'running', started_at = CURRENT_TIMESTAMP, heartbeat_at = CURRENT_TIMESTAMP,
+                             attempts = attempts + 1, worker_id = :worker_id
+                         WHERE job_id = (
+                             SELECT job_id FROM background_jobs
+                             WHERE status = 'queued'
+                             ORDER BY created_at
+                             FOR UPDATE SKIP LOCKED
+                             LIMIT 1
+                         )
+                         RETURNING job_id, user_id, job_type, params"""
+                ),
+                {"worker_id": self.worker_id},
+            ).mappings().first()
+        return dict(row) if row else None
+
+    def _progress_callback(self, job_id):
+        def progress(current, total=None, message=None):
+            with self.engine.begin() as conn:
+                conn.execute(
+                    text(
+                        """UPDATE background_jobs
+                             SET progress_current = :current, progress_total = :total,
+                                 progress_message = :message, heartbeat_at = CURRENT_TIMESTAMP
+                             WHERE job_id = :job_id"""
+                    ),
+                    {"job_id": job_id, "current": current, "total": total, "message": message},
+                )
+        return progress
+
+    def _finish(self, job_id, status, result=None, error=None):
+        # 任务已被判定超时并由其他执行器重新领取时，不覆盖对方的状态
+        with self.engine.begin() as conn:
+            updated = conn.execute(
+                text(
+                    """UPDATE background_jobs
+                         SET status = :status, result = CAST(:result AS JSONB), error = :error,
+                             finished_at = CURRENT_TIMESTAMP
+                         WHERE job_id = :job_id AND worker_id = :worker_id AND status = 'running'"""
+                ),
+                {
+                    "job_id": job_id,
+                    "worker_id": self.worker_id,
+                    "status": status,
+                    "result": json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+                    "error": error,
+                },
+            ).rowcount
+        if not updated:
+            print(f"[job {job_id}] 已不属于本执行器，忽略执行结果")
+
+    def run_job(self, job):
+        job_id = job['job_id']
+        handler = JOB_HANDLERS.get(job['job_type'])
+        print(f"[job {job_id}] 开始执行 {job['job_type']} (user_id={job['user_id']})")
+        if handler is None:
+            self._finish(job_id, 'failed', error=f"未知的任务类型: {job['job_type']}")
+            return
+        try:
+            result = handler(self.db_url, job['user_id'], job['params'] or {}, self._progress_callback(job_id))
+            self._finish(job_id, 'succeeded', result=result)
+            print(f"[job {job_id}] 执行完成")
+        except Exception as e:
+            traceback.print_exc()
+            self._finish(job_id, 'failed', error=str(e))
+            print(f"[job {job_id}] 执行失败: {e}")
+
+    def requeue_stale(self):
+        """将心跳超时的运行中任务重新排队（执行器崩溃或被重启）；领取次数已用尽的任务标记为失败"""
+        with self.engine.begin() as conn:
+            requeued = conn.execute(
+                text(
+                    """UPDATE background_jobs
+                         SET status = 'queued', worker_id = NULL
+                         WHERE status = 'running' AND attempts < :max_attempts
+                           AND heartbeat_at < CURRENT_TIMESTAMP - make_interval(secs => :stale)"""
+                ),
+                {"stale": self.stale_after_seconds, "max_attempts": self.max_attempts},
+            ).rowcount
+            failed = conn.execute(
+                text(
+                    """UPDATE background_jobs
+                         SET status = 'failed', finished_at = CURRENT_TIMESTAMP,
+                             error = '执行器心跳超时，已达到最大尝试次数 ' || attempts
+                         WHERE status = 'running' AND attempts >= :max_attempts
+                           AND heartbeat_at < CURRENT_TIMESTAMP - make_interval(secs => :stale)"""
+                ),
+                {"stale": self.stale_after_seconds, "max_attempts": self.max_attempts},
+            ).rowcount
+        if requeued:
+            print(f"重新排队 {requeued} 个心跳超时的任务")
+        if failed:
+            print(f"{failed} 个心跳超时的任务已达到最大尝试次数，标记为失败")
+
+    def _heartbeat(self):
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(
+                    """UPDATE background_jobs SET heartbeat_at = CURRENT_TIMESTAMP
+                         WHERE worker_id = :worker_id AND status = 'running'"""
+                ),
+                {"worker_id": self.worker_id},
+            )
+
+    def _heartbeat_loop(self):
+        interval = max(1.0, self.stale_after_seconds / 4)
+        while not self._stop.wait(interval):
+            try:
+                self._heartbeat()
+                self.requeue_stale()
+            except Exception as e:
+                print(f"任务心跳失败: {e}")
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            try:
+                job = self.claim()
+            except Exception as e:
+                print(f"领取任务失败: {e}")
+                job = None
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            self.run_job(job)
+
+    def start(self):
+        """在后台线程中启动执行器（FastAPI 进程内模式）"""
+        try:
+            self.requeue_stale()
+        except Exception as e:
+            print(f"检查超时任务失败: {e}")
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)]
+        self._threads += [
+            threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for t in self._threads:
+            t.start()
+        print(f"后台任务执行器已启动: {self.worker_id}，并发 {self.concurrency}")
+
+    def stop(self, timeout: float | None = 5.0):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def run_forever(self):
+        """前台运行直到 Ctrl+C（独立进程模式）"""
+        self.start()
+        try:
+            while any(t.is_alive() for t in self._threads):
+                self._stop.wait(1.0)
+        except KeyboardInterrupt:
+            print("\n正在停止...")
+        finally:
+            self.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the NDX background job worker")
+    parser.add_argument("--db-url", default=None, help="PostgreSQL URL，默认读取 DATABASE_URL")
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    args = parser.parse_args()
+    JobWorker(db_url=args.db_url, concurrency=args.concurrency, poll_interval=args.poll_interval,
+              max_attempts=args.max_attempts).run_forever()
@@ -0,0 +1,242 @@
+'''
+净值同步流水线（PostgreSQL）
+将多基金同步拆成 抓取 -> 解析 -> 批量写入 三个阶段，阶段之间用有界队列连接:
+  - 抓取: fetch_workers 个线程按窗口抓取原始页面（网络）
+  - 解析: 1 个线程把页面解析为类型化的写入行（CPU）
+  - 写入: 调用线程攒批后通过 bulk_load 写入 fund_nav_history（数据库）
+下游变慢时队列写满，上游阻塞在 put 上（背压）。每个窗口按 batch_pages 页分成多个条目，
+写入阶段每批单独提交，内存占用与历史长度无关，中断后已提交的批次保留。
+三个阶段在不同基金之间重叠执行，总耗时接近最慢的那个阶段。
+'''
+
+import queue
+import threading
+import time
+from bulk_load import bulk_upsert
+
+_DONE = object()
+
+
+class StageStats:
+    def __init__(self, name, unit='行'):
+        '''单个阶段的吞吐计数
+
+        busy: 处理数据的时间；blocked: 等待下游队列空位的时间（背压）
+        '''
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.rows = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, rows, busy):
+        with self._lock:
+            self.items += 1
+            self.rows += rows
+            self.busy += busy
+
+    def add_blocked(self, seconds):
+        with self._lock:
+            self.blocked += seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "items": self.items,
+                "rows": self.rows,
+                "busy_seconds": round(self.busy, 3),
+                "blocked_seconds": round(self.blocked, 3),
+                "rows_per_second": round(self.rows / self.busy, 1) if self.busy else None,
+            }
+
+    def summary(self):
+        snap = self.snapshot()
+        rate = f"{snap['rows_per_second']:.0f} {self.unit}/秒" if snap['rows_per_second'] else "-"
+        return (f"{self.name}: {snap['items']} 批 {snap['rows']} {self.unit}，忙碌 {snap['busy_seconds']:.2f}s，"
+                f"{rate}，背压等待 {snap['blocked_seconds']:.2f}s")
+
+
+class NavPipeline:
+    def __init__(self, fetcher, fetch_workers: int = 2, queue_size: int = 4, write_batch_rows: int = 5000,
+                 batch_pages: int = 20):
+        '''基于 HistoryNavFetcher 的数据源与数据库连接构建流水线
+
+        Args:
+            fetcher: HistoryNavFetcher，提供 source / engine / data_source / progress
+            fetch_workers: 抓取线程数（每个线程内的分页并发由数据源的 concurrency 决定）
+            queue_size: 阶段间队列容量（条目数）
+            write_batch_rows: 写入阶段攒够该行数（或上游暂时没有数据）时提交一次
+            batch_pages: 抓取阶段每个条目的页数，内存中最多约 queue_size * 2 * batch_pages 页数据
+        '''
+        self.fetcher = fetcher
+        self.fetch_workers = max(1, fetch_workers)
+        self.queue_size = queue_size
+        self.write_batch_rows = write_batch_rows
+        self.batch_pages = batch_pages
+        self.stats = {'抓取': StageStats('抓取', unit='页'), '解析': StageStats('解析'), '写入': StageStats('写入')}
+
+    def _put(self, q, item, stage):
+        start = time.perf_counter()
+        q.put(item)
+        self.stats[stage].add_blocked(time.perf_counter() - start)
+
+    def _fetch_stage(self, tasks, out_q):
+        source = self.fetcher.source
+        split = hasattr(source, 'iter_pages')
+        while True:
+            try:
+                fund_code, fund_name, window = tasks.get_nowait()
+            except queue.Empty:
+                break
+            base = {'fund_code': fund_code, 'fund_name': fund_name, 'window': window, 'error': None, 'last': False}
+            start_date = window['start'] or '2000-01-01'
+            start = time.perf_counter()
+            final = dict(base, last=True)
+            try:
+                if split:
+                    # 一个窗口按 batch_pages 分成多个条目流过后续阶段，长历史也不会整体驻留内存
+                    for pages in source.iter_pages(fund_code, start_date, window['end'], self.batch_pages):
+                        self.stats['抓取'].add(len(pages), time.perf_counter() - start)
+                        self._put(out_q, dict(base, pages=pages), '抓取')
+                        start = time.perf_counter()
+                else:
+                    final['batch'] = source.fetch(fund_code, start_date, window['end'], fund_name=fund_name)
+                    self.stats['抓取'].add(0, time.perf_counter() - start)
+            except Exception as e:
+                final['error'] = str(e)
+                print(f"抓取失败 {fund_name}({fund_code}) {window['start']}~{window['end']}: {e}")
+            # 窗口结束标记，写入阶段据此判断基金是否完成
+            self._put(out_q, final, '抓取')
+
+    def _fetch_all(self, tasks, out_q):
+        workers = [threading.Thread(target=self._fetch_stage, args=(tasks, out_q), name=f"nav-fetch-{i}", daemon=True)
+                   for i in range(self.fetch_workers)]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        self._put(out_q, _DONE, '抓取')
+
+    def _parse_stage(self, in_q, out_q):
+        # 延迟导入，避免与 fetch_history_nav 循环导入
+        from fetch_history_nav import normalize_nav_frame
+
+        source = self.fetcher.source
+        while True:
+            item = in_q.get()
+            if item is _DONE:
+                self._put(out_q, _DONE, '解析')
+                return
+            start = time.perf_counter()
+            item['payloads'] = []
+            if item['error'] is None:
+                try:
+                    batch = item.pop('batch', None)
+                    if batch is None and item.get('pages'):
+                        batch = source.parse_pages(item['fund_code'], item.pop('pages'), item['fund_name'])
+                    if batch is not None and len(batch):
+                        item['payloads'], _ = normalize_nav_frame(
+                            batch.to_frame(), item['fund_code'], item['fund_name'], self.fetcher.data_source
+                        )
+                except Exception as e:
+                    item['error'] = f"解析失败: {e}"
+            self.stats['解析'].add(len(item['payloads']), time.perf_counter() - start)
+            self._put(out_q, item, '解析')
+
+    def _flush(self, pending, results, remaining):
+        start = time.perf_counter()
+        rows = sum(len(item['payloads']) for item in pending)
+        try:
+            with self.fetcher.engine.begin() as conn:
+                written = [bulk_upsert(conn, 'fund_nav_history', item['payloads']) if item['payloads'] else None
+                           for item in pending]
+                self.fetcher.publish_written(conn, [row for item in pending for row in item['payloads']])
+        except Exception as e:
+            written = [None] * len(pending)
+            for item in pending:
+                item['error'] = item['error'] or f"写入失败: {e}"
+            print(f"批量写入失败: {e}")
+        self.stats['写入'].add(rows, time.perf_counter() - start)
+
+        for item, result in zip(pending, written):
+            record = results[item['fund_code']]
+            if result is not None:
+                record['rows_written'] += result.inserted + result.updated
+            if item['error']:
+                record['error'] = item['error']
+            if not item['last']:
+                continue
+            remaining[item['fund_code']] -= 1
+            if remaining[item['fund_code']] == 0:
+                record['success'] = not record['error']
+                done = sum(1 for v in remaining.values() if v == 0)
+                print(f"[{item['fund_code']}] {record['fund_name']} 写入 {record['rows_written']} 行"
+                      + (f"，错误: {record['error']}" if record['error'] else ""))
+                if self.fetcher.progress:
+                    self.fetcher.progress(done, len(remaining), item['fund_code'])
+        pending.clear()
+
+    def run(self, funds, windows, end_used):
+        '''同步多个基金
+
+        Args:
+            funds: {fund_code: fund_name}
+            windows: plan_missing_windows 的返回值
+            end_used: 结束日期字符串
+
+        Returns:
+            Dict[str, Dict]: fund_code -> 基金级结果 {fund_code, fund_name, start_used, end_used, windows, rows_written, success, error}
+        '''
+        results = {}
+        remaining = {}
+        tasks = queue.Queue()
+        for fund_code, fund_name in funds.items():
+            fund_windows = windows.get(fund_code, [])
+            results[fund_code] = {
+                'fund_code': fund_code,
+                'fund_name': fund_name,
+                'start_used': (fund_windows[0]['start'] or '基金成立日') if fund_windows else None,
+                'end_used': end_used,
+                'windows': [f"{w['start'] or '基金成立日'}~{w['end']}" for w in fund_windows],
+                'rows_written': 0,
+                'success': not fund_windows,
+                'error': ''
+            }
+            remaining[fund_code] = len(fund_windows)
+            for window in fund_windows:
+                tasks.put((fund_code, fund_name, window))
+        if tasks.empty():
+            return results
+
+        fetched_q = queue.Queue(maxsize=self.queue_size)
+        parsed_q = queue.Queue(maxsize=self.queue_size)
+        threads = [
+            threading.Thread(target=self._fetch_all, args=(tasks, fetched_q), name="nav-fetch", daemon=True),
+            threading.Thread(target=self._parse_stage, args=(fetched_q, parsed_q), name="nav-parse", daemon=True),
+        ]
+        wall_start = time.perf_counter()
+        for t in threads:
+            t.start()
+
+        # 写入阶段在调用线程执行，数据库连接不跨线程
+        pending = []
+        while True:
+            item = parsed_q.get()
+            if item is _DONE:
+                break
+            pending.append(item)
+            pending_rows = sum(len(p['payloads']) for p in pending)
+            if pending_rows >= self.write_batch_rows or parsed_q.empty():
+                self._flush(pending, results, remaining)
+        if pending:
+            self._flush(pending, results, remaining)
+        for t in threads:
+            t.join()
+
+        wall = time.perf_counter() - wall_start
+        print(f"\n流水线总耗时 {wall:.2f}s")
+        for stage in self.stats.values():
+            print(f"  {stage.summary()}")
+        return results
@@ -0,0 +1,95 @@
+'''
+定投计划排期引擎
+一次向量化调用生成多个计划（可跨用户）的全部定投日与 T+1 确认日，替代逐日推移 datetime 的循环。
+基于 numpy datetime64 数组与 busday 系列函数，节假日来自交易日历（tradeDate.get_trading_calendar）。
+
+排期规则与原循环一致:
+  - 锚点从 start_date 起按频率推移: daily 1 天、weekly 7 天、monthly 1 个月、quarterly 3 个月
+  - 按月推移时日期逐期截断到当月最后一天且不再恢复（与连续 += relativedelta(months=n) 相同，1/31 -> 2/29 -> 3/29）
+  - 锚点不是交易日的一期直接跳过，不顺延
+  - 未知频率只有 start_date 一期
+  - 确认日为定投日之后的第一个交易日
+'''
+
+import numpy as np
+
+FREQUENCY_DAYS = {'daily': 1, 'weekly': 7}
+FREQUENCY_MONTHS = {'monthly': 1, 'quarterly': 3}
+
+
+def _segment_offsets(counts):
+    '''每段内的序号 0..count-1 拼接在一起，例如 [2, 3] -> [0, 1, 0, 1, 2]'''
+    total = int(counts.sum())
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    return np.arange(total) - starts
+
+
+def _day_step_anchors(starts, ends, step):
+    counts = np.maximum((ends - starts).astype('int64') // step + 1, 0)
+    anchors = np.repeat(starts, counts) + _segment_offsets(counts) * step
+    return anchors, counts
+
+
+def _month_step_anchors(starts, ends, step):
+    start_months = starts.astype('datetime64[M]')
+    counts = np.maximum((ends.astype('datetime64[M]') - start_months).astype('int64') // step + 1, 0)
+    segment = np.repeat(np.arange(len(starts)), counts)
+    months = np.repeat(start_months, counts) + _segment_offsets(counts) * step
+    month_days = ((months + 1).astype('datetime64[D]') - months.astype('datetime64[D]')).astype('int64')
+    start_days = np.repeat((starts - start_months.astype('datetime64[D]')).astype('int64') + 1, counts)
+    # 连续按月推移时日期只会被截断变小：每期的日 = min(起始日, 至今各期当月天数)，即分段累计最小值。
+    # 后一段整体减去更大的偏移，使 minimum.accumulate 不会跨段传递
+    shift = segment * 100
+    days = np.minimum.accumulate(np.minimum(start_days, month_days) - shift) + shift
+    anchors = months.astype('datetime64[D]') + (days - 1)
+    keep = anchors <= np.repeat(ends, counts)
+    return anchors[keep], np.bincount(segment[keep], minlength=len(starts))
+
+
+def build_schedule(plans, end_date, calendar):
+    '''生成所有计划在 [start_date, min(end_date, 计划结束日)] 内的定投日与确认日
+
+    Args:
+        plans: 计划字典列表，需包含 frequency / start_date / end_date（'YYYY-MM-DD' 或 date）
+        end_date: 统一截止日（通常为今天）
+        calendar: tradeDate.TradingCalendar
+
+    Returns:
+        dict: plan_index / trade_date / confirm_date 三个等长数组，按计划顺序、日期升序排列；
+              日期为 datetime64[D]
+    '''
+    busdaycal = calendar.busdaycal
+    cutoff = np.datetime64(str(end_date)[:10], 'D')
+    known = (*FREQUENCY_DAYS, *FREQUENCY_MONTHS)
+    parts = []
+    for frequency in (*known, None):
+        index = np.array([i for i, plan in enumerate(plans)
+                          if plan['frequency'] == frequency or (frequency is None and plan['frequency'] not in known)],
+                         dtype='int64')
+        if not len(index):
+            continue
+        starts = np.array([str(plans[i]['start_date'])[:10] for i in index], dtype='datetime64[D]')
+        ends = np.minimum(np.array([str(plans[i]['end_date'])[:10] for i in index], dtype='datetime64[D]'), cutoff)
+        if frequency in FREQUENCY_DAYS:
+            anchors, counts = _day_step_anchors(starts, ends, FREQUENCY_DAYS[frequency])
+        elif frequency in FREQUENCY_MONTHS:
+            anchors, counts = _month_step_anchors(starts, ends, FREQUENCY_MONTHS[frequency])
+        else:
+            counts = (starts <= ends).astype('int64')
+            anchors = starts[counts == 1]
+        parts.append((np.repeat(index, counts), anchors))
+
+    if not parts:
+        empty = np.array([], dtype='datetime64[D]')
+        return {'plan_index': np.array([], dtype='int64'), 'trade_date': empty, 'confirm_date': empty}
+    plan_index = np.concatenate([p for p, _ in parts])
+    anchors = np.concatenate([a for _, a in parts])
+    trading = np.is_busday(anchors, busdaycal=busdaycal)
+    plan_index, anchors = plan_index[trading], anchors[trading]
+    order = np.lexsort((anchors, plan_index))
+    plan_index, anchors = plan_index[order], anchors[order]
+    return {
+        'plan_index': plan_index,
+        'trade_date': anchors,
+        'confirm_date': np.busday_offset(anchors, 1, roll='forward', busdaycal=busdaycal),
+    }
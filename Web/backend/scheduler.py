@@ -0,0 +1,263 @@
+'''
+每日定投流水线调度器（PostgreSQL）
+收盘后为所有活跃用户依次执行: 补齐定投记录 -> 抓取净值 -> 确认待确认交易
+多副本部署时通过 PostgreSQL 会话级 advisory lock 选主，同一时刻只有一个副本执行；
+每次执行记录在 scheduler_runs 表中（各步骤耗时与统计）。
+既可以在 FastAPI 进程内以后台线程运行，也可以单独执行一次:
+    python scheduler.py --once
+'''
+
+import argparse
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from sqlalchemy import text
+from app.utils.engines import get_engine
+
+# 选主用的 advisory lock 键，与 execute_today 的用户级锁（hashtext('execute_today'), user_id）区分
+LOCK_ARGS = "hashtext('scheduler'), 0"
+
+
+def step_execute_plans(db_url, user_ids):
+    from execute_plans import AutoInvestExecutor
+
+    created = skipped = 0
+    failed = []
+    for user_id in user_ids:
+        try:
+            result = AutoInvestExecutor(user_id=user_id, db_url=db_url).execute_today()
+            created += result.get('transactions_created', 0)
+            skipped += result.get('skipped', 0)
+        except Exception as e:
+            print(f"[scheduler] 用户 {user_id} 执行定投计划失败: {e}")
+            failed.append(user_id)
+    return {"users": len(user_ids), "transactions_created": created, "skipped": skipped, "failed_users": failed}
+
+
+def step_fetch_nav(db_url, user_ids):
+    from fetch_history_nav import HistoryNavFetcher
+
+    # 所有用户的基金去重后只抓取一次；写入净值后自动确认匹配的待确认交易
+    fetcher = HistoryNavFetcher(db_url=db_url)
+    per_user = fetcher.import_all_users_plans()
+    details = [record for records in per_user.values() for record in records]
+    return {
+        "plans": len(details),
+        "success_count": sum(1 for d in details if d['success']),
+        "rows_written": sum(d.get('rows_written', 0) for d in details),
+        "confirmed": fetcher.confirmed_count,
+        "failed_users": sorted({d['user_id'] for d in details if not d['success']}),
+    }
+
+
+def step_confirm_pending(db_url, user_ids):
+    from update_pending_transactions import PendingTransactionUpdater
+
+    pending = confirmed = 0
+    failed = []
+    for user_id in user_ids:
+        try:
+            result = PendingTransactionUpdater(user_id=user_id, db_url=db_url).process_pending_records() or {}
+            pending += result.get('pending_count', 0)
+            confirmed += result.get('success_count', 0)
+        except Exception as e:
+            print(f"[scheduler] 用户 {user_id} 确认待确认交易失败: {e}")
+            failed.append(user_id)
+    return {"users": len(user_ids), "pending_count": pending, "success_count": confirmed, "failed_users": failed}
+
+
+# (步骤名, 处理函数(db_url, user_ids) -> 可JSON序列化的统计)，按顺序执行
+PIPELINE = (
+    ('execute_plans', step_execute_plans),
+    ('fetch_nav', step_fetch_nav),
+    ('confirm_pending', step_confirm_pending),
+)
+
+
+class DailyScheduler:
+    def __init__(self, db_url: str | None = None, run_at: str = "21:30", timezone: str = "Asia/Shanghai",
+                 poll_interval: float = 60.0, max_attempts: int = 3):
+        '''初始化调度器（仅支持PostgreSQL）
+
+        Args:
+            run_at: 每个交易日的执行时间（HH:MM，timezone 时区），基金净值通常在收盘后晚间公布
+            poll_interval: 检查是否到达执行时间的间隔（秒）
+            max_attempts: 同一天失败后最多重试的总次数
+        '''
+        if db_url:
+            self.db_url = self._resolve_db_url(db_url)
+        else:
+            self.db_url = os.getenv('DATABASE_URL', 'postgresql://localhost:5432/ndx')
+            self.db_url = self._resolve_db_url(self.db_url)
+
+        self.engine = get_engine(self.db_url)
+        hour, minute = (int(part) for part in run_at.split(':'))
+        self.run_at = (hour, minute)
+        self.timezone = ZoneInfo(timezone)
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _resolve_db_url(self, raw: str) -> str:
+        """将数据库URL转换为同步PostgreSQL格式"""
+        if not raw:
+            return 'postgresql://localhost:5432/ndx'
+
+        # Railway等平台可能使用postgres://前缀
+        if raw.startswith('postgres://'):
+            raw = raw.replace('postgres://', 'postgresql://', 1)
+
+        # 确保使用psycopg2驱动（同步）
+        if raw.startswith('postgresql+asyncpg://'):
+            raw = raw.replace('postgresql+asyncpg://', 'postgresql+psycopg2://', 1)
+        elif raw.startswith('postgresql://') and '+' not in raw:
+            raw = raw.replace('postgresql://', 'postgresql+psycopg2://', 1)
+
+        return raw
+
+    def is_due(self, now: datetime) -> bool:
+        """交易日且已过执行时间"""
+        from tradeDate import get_trading_calendar
+
+        if (now.hour, now.minute) < self.run_at:
+            return False
+        return get_trading_calendar(self.engine).is_trading_day(now.date())
+
+    def tick(self, force: bool = False):
+        """检查一次：到期且今天尚未成功执行时，抢到锁的副本执行流水线
+
+        Returns:
+            int | None: 本副本执行的 run_id；未执行（未到期、其他副本持有锁、今天已完成）时为 None
+        """
+        now = datetime.now(self.timezone)
+        if not force and not self.is_due(now):
+            return None
+        run_date = now.date()
+        # 会话级锁：持有到流水线结束；进程崩溃时连接断开，锁自动释放
+        with self.engine.connect() as lock_conn:
+            locked = lock_conn.execute(
+                text(f"SELECT pg_try_advisory_lock({LOCK_ARGS})")
+            ).scalar()
+            lock_conn.commit()
+            if not locked:
+                return None
+            try:
+                run_id = self._start_run(run_date, force)
+                if run_id is not None:
+                    self._run_pipeline(run_id)
+                return run_id
+            finally:
+                lock_conn.execute(text(f"SELECT pg_advisory_unlock({LOCK_ARGS})"))
+                lock_conn.commit()
+
+    def _start_run(self, run_date, force):
+        """在持有锁的前提下登记一次执行；今天已成功或重试次数用尽时返回 None"""
+        with self.engine.begin() as conn:
+            # 持有锁时仍为 running 的记录来自已崩溃的副本
+            conn.execute(
+                text("""UPDATE scheduler_runs
+                          SET status = 'failed', error = '执行中断', finished_at = CURRENT_TIMESTAMP
+                          WHERE status = 'running'""")
+            )
+            succeeded, attempts = conn.execute(
+                text("""SELECT COUNT(*) FILTER (WHERE status = 'succeeded'), COUNT(*)
+                          FROM scheduler_runs WHERE run_date = :run_date"""),
+                {"run_date": run_date},
+            ).one()
+            if not force and (succeeded or attempts >= self.max_attempts):
+                return None
+            return conn.execute(
+                text("""INSERT INTO scheduler_runs (run_date, worker_id, triggered_by)
+                        VALUES (:run_date, :worker_id, :triggered_by)
+                        RETURNING run_id"""),
+                {"run_date": run_date, "worker_id": self.worker_id, "triggered_by": 'manual' if force else 'schedule'},
+            ).scalar()
+
+    def _save_steps(self, run_id, steps, status=None, error=None):
+        with self.engine.begin() as conn:
+            conn.execute(
+                text("""UPDATE scheduler_runs
+                          SET steps = CAST(:steps AS JSONB),
+                              status = COALESCE(:status, status), error = :error,
+                              finished_at = CASE WHEN :status IS NULL THEN NULL ELSE CURRENT_TIMESTAMP END
+                          WHERE run_id = :run_id"""),
+                {"run_id": run_id, "steps": json.dumps(steps, ensure_ascii=False, default=str),
+                 "status": status, "error": error},
+            )
+
+    def _run_pipeline(self, run_id):
+        print(f"[scheduler] 开始执行每日流水线 run_id={run_id}")
+        steps = []
+        errors = []
+        from fetch_history_nav import list_active_users
+
+        user_ids = list_active_users(self.engine)
+        for name, handler in PIPELINE:
+            start = time.perf_counter()
+            try:
+                stats = handler(self.db_url, user_ids)
+                if stats.get('failed_users'):
+                    errors.append(f"{name}: 用户 {', '.join(map(str, stats['failed_users']))} 失败")
+            except Exception as e:
+                traceback.print_exc()
+                stats = {"error": str(e)}
+                errors.append(f"{name}: {e}")
+            steps.append({"step": name, "seconds": round(time.perf_counter() - start, 3), **stats})
+            self._save_steps(run_id, steps)
+            print(f"[scheduler] {name} 完成，耗时 {steps[-1]['seconds']:.1f}s")
+        status = 'failed' if errors else 'succeeded'
+        self._save_steps(run_id, steps, status, '; '.join(errors) or None)
+        print(f"[scheduler] 每日流水线结束 run_id={run_id}: {status}")
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"[scheduler] 调度检查失败: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def start(self):
+        """在后台线程中启动调度器（FastAPI 进程内模式）"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="daily-scheduler", daemon=True)
+        self._thread.start()
+        print(f"每日调度器已启动: {self.worker_id}，每个交易日 {self.run_at[0]:02d}:{self.run_at[1]:02d} 执行")
+
+    def stop(self, timeout: float | None = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def run_forever(self):
+        """前台运行直到 Ctrl+C（独立进程模式）"""
+        self.start()
+        try:
+            while self._thread.is_alive():
+                self._stop.wait(1.0)
+        except KeyboardInterrupt:
+            print("\n正在停止...")
+        finally:
+            self.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the NDX daily auto-invest pipeline")
+    parser.add_argument("--db-url", default=None, help="PostgreSQL URL，默认读取 DATABASE_URL")
+    parser.add_argument("--once", action="store_true", help="立即执行一次（忽略执行时间与当天是否已执行）")
+    parser.add_argument("--run-at", default="21:30")
+    args = parser.parse_args()
+    scheduler = DailyScheduler(db_url=args.db_url, run_at=args.run_at)
+    if args.once:
+        run_id = scheduler.tick(force=True)
+        print(f"run_id={run_id}" if run_id else "其他副本正在执行，已跳过")
+    else:
+        scheduler.run_forever()
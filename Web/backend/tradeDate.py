@@ -3,9 +3,287 @@
 '''
 
 import os
-from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
-from sqlalchemy import create_engine, text
+import threading
+import time
+from datetime import date as date_type, datetime, timedelta
+import numpy as np
+from sqlalchemy import text
+from app.config import settings
+from app.utils.engines import get_engine
+from plan_schedule import build_schedule
+
+# 2024-2026年中国法定节假日（周末之外的休市日）
+# trading_calendar 表为空时以此初始化；之后以数据库为准
+CN_HOLIDAYS = frozenset({
+    # 2024年
+    '2024-01-01', '2024-02-10', '2024-02-11', '2024-02-12', '2024-02-13', '2024-02-14', '2024-02-15', '2024-02-16', '2024-02-17',
+    '2024-04-04', '2024-04-05', '2024-04-06',
+    '2024-05-01', '2024-05-02', '2024-05-03', '2024-05-04', '2024-05-05',
+    '2024-06-10',
+    '2024-09-15', '2024-09-16', '2024-09-17',
+    '2024-10-01', '2024-10-02', '2024-10-03', '2024-10-04', '2024-10-05', '2024-10-06', '2024-10-07',
+    
+    # 2025年
+    '2025-01-01', '2025-01-28', '2025-01-29', '2025-01-30', '2025-01-31', '2025-02-01', '2025-02-02', '2025-02-03', '2025-02-04',
+    '2025-04-04', '2025-04-05', '2025-04-06',
+    '2025-05-01', '2025-05-02', '2025-05-03', '2025-05-04', '2025-05-05',
+    '2025-05-31', '2025-06-01', '2025-06-02',
+    '2025-10-01', '2025-10-02', '2025-10-03', '2025-10-04', '2025-10-05', '2025-10-06', '2025-10-07', '2025-10-08',
+    
+    # 2026年（预估，实际以国务院公布为准）
+    '2026-01-01', '2026-01-02', '2026-01-03',
+    '2026-02-17', '2026-02-18', '2026-02-19', '2026-02-20', '2026-02-21', '2026-02-22', '2026-02-23',
+    '2026-04-04', '2026-04-05', '2026-04-06',
+    '2026-05-01', '2026-05-02', '2026-05-03', '2026-05-04', '2026-05-05',
+    '2026-06-19', '2026-06-20', '2026-06-21',
+    '2026-10-01', '2026-10-02', '2026-10-03', '2026-10-04', '2026-10-05', '2026-10-06', '2026-10-07',
+})
+# 内置节假日表覆盖的第一天，更早的日期无法区分节假日与缺失数据
+CALENDAR_START = '2024-01-01'
+# 日历索引覆盖的范围，范围外的日期按 工作日且非节假日 逐个判断
+INDEX_START = '1990-01-01'
+INDEX_END = '2040-12-31'
+
+
+def _to_date(value):
+    """datetime / date / 'YYYY-MM-DD' 统一为 date"""
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+class TradingCalendar:
+    def __init__(self, holidays, start: str = INDEX_START, end: str = INDEX_END,
+                 coverage_start: str = CALENDAR_START):
+        '''交易日历索引，按日期序数(date.toordinal)预先计算，查询均为 O(1)
+
+        - _open[i]: 第 i 天是否为交易日（位图）
+        - _prefix[i]: [start, start + i) 内的交易日数（前缀计数）
+        - _trading[k]: 第 k 个交易日的序数
+
+        coverage_start: 节假日数据可信的第一天，更早的工作日一律视为交易日
+        '''
+        self.holidays = frozenset(holidays)
+        self.coverage_start = coverage_start
+        self.start = datetime.strptime(start, '%Y-%m-%d').date()
+        self.end = datetime.strptime(end, '%Y-%m-%d').date()
+        self._base = self.start.toordinal()
+        days = np.arange(np.datetime64(start), np.datetime64(end) + 1)
+        weekday = (days.astype('int64') + 3) % 7  # 1970-01-01 为周四
+        is_open = (weekday < 5) & ~np.isin(days, np.array(sorted(self.holidays), dtype='datetime64[D]'))
+        self._open = is_open.tobytes()
+        self._prefix = np.concatenate(([0], np.cumsum(is_open))).tolist()
+        self._trading = (np.flatnonzero(is_open) + self._base).tolist()
+        # numpy busday 系列函数使用的等价日历（周一至周五，排除节假日）
+        self.busdaycal = np.busdaycalendar(weekmask='1111100',
+                                           holidays=np.array(sorted(self.holidays), dtype='datetime64[D]'))
+
+    def _index(self, day):
+        index = day.toordinal() - self._base
+        if index < 0 or index >= len(self._open):
+            return None
+        return index
+
+    def _slow_is_open(self, day):
+        return day.weekday() < 5 and day.strftime('%Y-%m-%d') not in self.holidays
+
+    def is_trading_day(self, day) -> bool:
+        index = self._index(day)
+        if index is None:
+            return self._slow_is_open(day)
+        return self._open[index] == 1
+
+    def count(self, start, end) -> int:
+        """[start, end] 闭区间内的交易日数"""
+        if end < start:
+            return 0
+        first, last = self._index(start), self._index(end)
+        if first is None or last is None:
+            return sum(1 for i in range((end - start).days + 1) if self.is_trading_day(start + timedelta(days=i)))
+        return self._prefix[last + 1] - self._prefix[first]
+
+    def shift(self, day, n: int):
+        """day 之后第 n 个交易日（n < 0 为之前第 -n 个），n = 0 返回 day 本身，结果为 date"""
+        if n == 0:
+            return day
+        index = self._index(day)
+        if index is not None:
+            if n > 0:
+                # _prefix[index + 1] 为 <= day 的交易日数
+                k = self._prefix[index + 1] + n - 1
+            else:
+                # _prefix[index] 为 < day 的交易日数
+                k = self._prefix[index] + n
+            if 0 <= k < len(self._trading):
+                return date_type.fromordinal(self._trading[k])
+        # 超出索引范围时逐日推移
+        step = timedelta(days=1 if n > 0 else -1)
+        current, remaining = day, abs(n)
+        while remaining:
+            current += step
+            if self.is_trading_day(current):
+                remaining -= 1
+        return current
+
+
+_calendars = {}     # 数据库URL -> {'calendar', 'version', 'checked'}
+_calendar_lock = threading.Lock()
+_builtin_calendar = None
+
+
+def _get_builtin_calendar():
+    """仅基于 CN_HOLIDAYS 的日历（无数据库或读取失败时使用）"""
+    global _builtin_calendar
+    if _builtin_calendar is None:
+        _builtin_calendar = TradingCalendar(CN_HOLIDAYS)
+    return _builtin_calendar
+
+
+def _seed_calendar(conn):
+    """trading_calendar 为空时写入内置节假日（已有记录时不写入，运维删除的内置记录不会被恢复）"""
+    conn.execute(
+        text("""
+            INSERT INTO trading_calendar (cal_date, is_trading, source)
+            SELECT d, false, 'seed' FROM unnest(CAST(:holidays AS date[])) AS d
+            WHERE NOT EXISTS (SELECT 1 FROM trading_calendar)
+            ON CONFLICT (cal_date) DO NOTHING
+        """),
+        {"holidays": sorted(CN_HOLIDAYS)},
+    )
+
+
+def _calendar_version(conn):
+    return tuple(conn.execute(text("""
+        SELECT COUNT(*), MAX(updated_at), (SELECT coverage_start FROM trading_calendar_coverage)
+        FROM trading_calendar
+    """)).one())
+
+
+def _load_calendar(conn):
+    """从 trading_calendar 构建索引：休市的工作日即节假日
+
+    覆盖起点取 trading_calendar_coverage 中记录的起点与内置节假日起点中较早者；
+    只有交易日记录、没有足够基准基金判断休市的早期日期不算覆盖。
+    """
+    rows = conn.execute(text("SELECT cal_date::text, is_trading FROM trading_calendar ORDER BY cal_date")).fetchall()
+    if not rows:
+        return _get_builtin_calendar()
+    holidays = [day for day, is_trading in rows if not is_trading]
+    learned = conn.execute(text("SELECT coverage_start::text FROM trading_calendar_coverage")).scalar()
+    return TradingCalendar(holidays, coverage_start=min(learned or CALENDAR_START, CALENDAR_START))
+
+
+def get_trading_calendar(engine=None) -> TradingCalendar:
+    """进程内共享的交易日历索引
+
+    不传 engine 时只使用内置节假日。传入 engine 时首次调用从 trading_calendar 加载（表为空则先写入内置节假日），
+    之后直接返回缓存；每隔 CALENDAR_REFRESH_SECONDS 用一条轻量查询检查表是否变化，变化才重新加载。
+    """
+    if engine is None:
+        return _get_builtin_calendar()
+    key = str(engine.url)
+    entry = _calendars.get(key)
+    if entry and time.monotonic() - entry['checked'] < settings.CALENDAR_REFRESH_SECONDS:
+        return entry['calendar']
+    with _calendar_lock:
+        entry = _calendars.get(key)
+        if entry and time.monotonic() - entry['checked'] < settings.CALENDAR_REFRESH_SECONDS:
+            return entry['calendar']
+        try:
+            with engine.begin() as conn:
+                if entry is None:
+                    _seed_calendar(conn)
+                version = _calendar_version(conn)
+                if entry is None or entry['version'] != version:
+                    calendar = _load_calendar(conn)
+                else:
+                    calendar = entry['calendar']
+        except Exception as e:
+            print(f"读取交易日历失败，使用内置节假日: {e}")
+            return entry['calendar'] if entry else _get_builtin_calendar()
+        _calendars[key] = {'calendar': calendar, 'version': version, 'checked': time.monotonic()}
+        return calendar
+
+
+def invalidate_trading_calendar(engine=None):
+    """本进程修改 trading_calendar 后调用，下次 get_trading_calendar 立即检查版本"""
+    with _calendar_lock:
+        for key, entry in _calendars.items():
+            if engine is None or key == str(engine.url):
+                entry['checked'] = float('-inf')
+
+
+def learn_trading_days(engine, fund_codes=None, min_funds: int = 2):
+    """根据宽基指数基金的净值日期回填 trading_calendar
+
+    - 任一基准基金在某个工作日有净值：该日为交易日
+    - 至少 min_funds 个基准基金的净值区间覆盖该工作日、但都没有净值：该日休市
+    来源为 'manual' 的记录不会被覆盖；内置节假日（'seed'）与推断结果不一致时以推断为准。
+    能够判断休市的第一天（至少 min_funds 个基准基金覆盖）记录为 trading_calendar_coverage.coverage_start。
+
+    Args:
+        fund_codes: 基准基金代码，默认 settings.CALENDAR_BENCHMARK_FUNDS
+
+    Returns:
+        int: 新增或改变的日期数（不含覆盖起点）
+    """
+    if fund_codes is None:
+        fund_codes = [code.strip() for code in settings.CALENDAR_BENCHMARK_FUNDS.split(',') if code.strip()]
+    with engine.begin() as conn:
+        changed, coverage_changed = conn.execute(
+            text("""
+                WITH bench AS (
+                    SELECT fund_code, MIN(price_date) AS lo, MAX(price_date) AS hi
+                    FROM fund_nav_history
+                    WHERE fund_code = ANY(CAST(:codes AS text[]))
+                    GROUP BY fund_code
+                ),
+                days AS (
+                    SELECT d::date AS cal_date
+                    FROM generate_series((SELECT MIN(lo) FROM bench), (SELECT MAX(hi) FROM bench), interval '1 day') d
+                    WHERE EXTRACT(ISODOW FROM d) < 6
+                ),
+                observed AS (
+                    SELECT days.cal_date,
+                           EXISTS (
+                               SELECT 1 FROM fund_nav_history h
+                               WHERE h.fund_code = ANY(CAST(:codes AS text[])) AND h.price_date = days.cal_date
+                           ) AS has_nav,
+                           (SELECT COUNT(*) FROM bench WHERE days.cal_date BETWEEN bench.lo AND bench.hi) AS covering
+                    FROM days
+                ),
+                learned AS (
+                    INSERT INTO trading_calendar (cal_date, is_trading, source)
+                    SELECT cal_date, has_nav, 'nav' FROM observed
+                    WHERE has_nav OR covering >= :min_funds
+                    ON CONFLICT (cal_date) DO UPDATE
+                        SET is_trading = EXCLUDED.is_trading, source = EXCLUDED.source, updated_at = CURRENT_TIMESTAMP
+                        WHERE trading_calendar.source <> 'manual'
+                          AND trading_calendar.is_trading IS DISTINCT FROM EXCLUDED.is_trading
+                    RETURNING cal_date
+                ),
+                coverage AS (
+                    INSERT INTO trading_calendar_coverage (id, coverage_start)
+                    SELECT 1, MIN(cal_date) FROM observed
+                    WHERE covering >= :min_funds
+                    HAVING MIN(cal_date) IS NOT NULL
+                    ON CONFLICT (id) DO UPDATE
+                        SET coverage_start = EXCLUDED.coverage_start, updated_at = CURRENT_TIMESTAMP
+                        WHERE trading_calendar_coverage.coverage_start <> EXCLUDED.coverage_start
+                    RETURNING coverage_start
+                )
+                SELECT (SELECT COUNT(*) FROM learned), (SELECT COUNT(*) FROM coverage)
+            """),
+            {"codes": list(fund_codes), "min_funds": min_funds},
+        ).one()
+    if changed:
+        print(f"交易日历: 根据基准基金净值更新 {changed} 天")
+    if changed or coverage_changed:
+        invalidate_trading_calendar(engine)
+    return changed
+
 
 class TradeDateChecker:
     def __init__(self, user_id: int = 1, db_url: str | None = None):
@@ -19,8 +297,9 @@ class TradeDateChecker:
             self.db_url = os.getenv('DATABASE_URL', 'postgresql://localhost:5432/ndx')
             self.db_url = self._resolve_db_url(self.db_url)
         
-        self.engine = create_engine(self.db_url, future=True)
-        self.plans = self.load_plans()
+        self.engine = get_engine(self.db_url)
+        # 交易日历在进程内共享，预热后不再访问数据库
+        self.calendar = get_trading_calendar(self.engine)
         self.holidays = self._load_holidays()
 
     def _resolve_db_url(self, raw: str) -> str:
@@ -72,95 +351,46 @@ class TradeDateChecker:
             return {"plans": []}
 
     def _load_holidays(self):
-        '''导入2024-2026年中国法定节假日'''
-        return {
-            # 2024年
-            '2024-01-01', '2024-02-10', '2024-02-11', '2024-02-12', '2024-02-13', '2024-02-14', '2024-02-15', '2024-02-16', '2024-02-17',
-            '2024-04-04', '2024-04-05', '2024-04-06',
-            '2024-05-01', '2024-05-02', '2024-05-03', '2024-05-04', '2024-05-05',
-            '2024-06-10',
-            '2024-09-15', '2024-09-16', '2024-09-17',
-            '2024-10-01', '2024-10-02', '2024-10-03', '2024-10-04', '2024-10-05', '2024-10-06', '2024-10-07',
-            
-            # 2025年
-            '2025-01-01', '2025-01-28', '2025-01-29', '2025-01-30', '2025-01-31', '2025-02-01', '2025-02-02', '2025-02-03', '2025-02-04',
-            '2025-04-04', '2025-04-05', '2025-04-06',
-            '2025-05-01', '2025-05-02', '2025-05-03', '2025-05-04', '2025-05-05',
-            '2025-05-31', '2025-06-01', '2025-06-02',
-            '2025-10-01', '2025-10-02', '2025-10-03', '2025-10-04', '2025-10-05', '2025-10-06', '2025-10-07', '2025-10-08',
-            
-            # 2026年（预估，实际以国务院公布为准）
-            '2026-01-01', '2026-01-02', '2026-01-03',
-            '2026-02-17', '2026-02-18', '2026-02-19', '2026-02-20', '2026-02-21', '2026-02-22', '2026-02-23',
-            '2026-04-04', '2026-04-05', '2026-04-06',
-            '2026-05-01', '2026-05-02', '2026-05-03', '2026-05-04', '2026-05-05',
-            '2026-06-19', '2026-06-20', '2026-06-21',
-            '2026-10-01', '2026-10-02', '2026-10-03', '2026-10-04', '2026-10-05', '2026-10-06', '2026-10-07',
-        }
+        '''交易日历中的节假日（工作日休市日）'''
+        return set(self.calendar.holidays)
     
     def is_trading_day(self, date):
         """
         判断是否为交易日（工作日且非节假日）
         Args:
-            date: datetime对象或字符串(YYYY-MM-DD)
+            date: datetime/date对象或字符串(YYYY-MM-DD)
         Returns:
             bool: True表示是交易日
         """
+        return self.calendar.is_trading_day(_to_date(date))
+
+    def count_trading_days(self, start_date, end_date):
+        """start_date ~ end_date（含两端）之间的交易日数"""
+        return self.calendar.count(_to_date(start_date), _to_date(end_date))
+
+    def _shift(self, date, offset):
+        '''按交易日推移，返回值与输入类型一致（datetime 保留时分秒）'''
         if isinstance(date, str):
             date = datetime.strptime(date, '%Y-%m-%d')
-        
-        if date.weekday() >= 5: 
-            return False
-        
-        date_str = date.strftime('%Y-%m-%d')
-        if date_str in self.holidays:
-            return False
-        
-        return True
+        target = self.calendar.shift(_to_date(date), offset)
+        return date + timedelta(days=target.toordinal() - _to_date(date).toordinal())
 
     def _generate_dates(self, plan, start_date, end_date):
-        """根据定投频率生成交易与确认日期 (确认日=T+1交易日)"""
+        """根据定投频率生成交易与确认日期 (确认日=T+1交易日)，锚点非交易日的一期跳过"""
+        schedule = build_schedule([{**plan, 'start_date': start_date, 'end_date': end_date}], end_date, self.calendar)
         transactions = []
-        anchor_date = start_date
-        while anchor_date <= end_date:
-            # 仅对每日频率跳过非交易日，其他频率按锚点生成（若锚点非交易日则跳过该期）
-            if plan['frequency'] == 'daily' and not self.is_trading_day(anchor_date):
-                anchor_date += timedelta(days=1)
-                continue
-            if plan['frequency'] != 'daily' and not self.is_trading_day(anchor_date):
-                # 对 weekly/monthly/quarterly 若锚点不是交易日，直接跳到下一个周期
-                if plan['frequency'] == 'weekly':
-                    anchor_date += timedelta(weeks=1)
-                elif plan['frequency'] == 'monthly':
-                    anchor_date += relativedelta(months=1)
-                elif plan['frequency'] == 'quarterly':
-                    anchor_date += relativedelta(months=3)
-                else:
-                    break
-                continue
-            buy_date = anchor_date
-            confirm_date = self.get_next_trading_day(buy_date, 1)
-            transaction = {
+        for buy_date, confirm_date in zip(schedule['trade_date'].astype(str).tolist(),
+                                         schedule['confirm_date'].astype(str).tolist()):
+            transactions.append({
                 'plan_name': plan['plan_name'],
                 'fund_code': plan['fund_code'],
                 'fund_name': plan['fund_name'],
-                'transaction_date': buy_date.strftime('%Y-%m-%d'),
-                'confirm_date': confirm_date.strftime('%Y-%m-%d'),
-                'current_date': confirm_date.strftime('%Y-%m-%d'),
+                'transaction_date': buy_date,
+                'confirm_date': confirm_date,
+                'current_date': confirm_date,
                 'amount': plan['amount'],
                 'transaction_type': '买入'
-            }
-            transactions.append(transaction)
-            if plan['frequency'] == 'daily':
-                anchor_date += timedelta(days=1)
-            elif plan['frequency'] == 'weekly':
-                anchor_date += timedelta(weeks=1)
-            elif plan['frequency'] == 'monthly':
-                anchor_date += relativedelta(months=1)
-            elif plan['frequency'] == 'quarterly':
-                anchor_date += relativedelta(months=3)
-            else:
-                break
+            })
         return transactions
     
     def _get_previous_trading_day(self, date, days_before):
@@ -176,34 +406,10 @@ class TradeDateChecker:
         """
         if days_before == 0:
             return date
-        
-        current = date
-        count = 0
-        
-        while count < days_before:
-            current -= timedelta(days=1)
-            # 只有交易日才计数
-            if self.is_trading_day(current):
-                count += 1
-        
-        return current
+        return self._shift(date, -days_before)
 
     def get_next_trading_day(self, date, offset=1):
         """向后寻找第 offset 个交易日"""
         if offset == 0:
             return date
-        current = date
-        count = 0
-        while count < offset:
-            current += timedelta(days=1)
-            if self.is_trading_day(current):
-                count += 1
-        return current
-
-
-
-
-
-
-
-
+        return self._shift(date, offset)
@@ -5,8 +5,9 @@
 """
 
 import os
-from datetime import datetime, timedelta
-from sqlalchemy import create_engine, text
+from datetime import date
+from sqlalchemy import text
+from app.utils.engines import get_engine
 from tradeDate import TradeDateChecker
 
 
@@ -22,7 +23,7 @@ class PendingTransactionUpdater:
             self.db_url = os.getenv('DATABASE_URL', 'postgresql://localhost:5432/ndx')
             self.db_url = self._resolve_db_url(self.db_url)
         
-        self.engine = create_engine(self.db_url, future=True)
+        self.engine = get_engine(self.db_url)
         # 先尝试从数据库加载，失败则从配置文件加载
         self.plans = self._build_plan_map()
 
@@ -81,143 +82,81 @@ class PendingTransactionUpdater:
             )
             return [tuple(row) for row in result.fetchall()]
     
-    def update_transaction(self, transaction_id, fund_name, unit_nav, shares, amount, note_original):
+    def confirm_pending(self, use_target_amount=True):
         """
-        更新交易记录的 shares/unit_nav/amount
-        
+        一条语句确认当前用户所有可确认的待确认记录
+
+        每条记录优先取交易日(transaction_date)净值，没有则取确认日(nav_date)净值；
+        同一天有多个数据源时取最近抓取的一条。可确认的记录在同一事务内一次 UPDATE 完成，
+        trg_update_fund_overview_after_fill 按行触发，持仓汇总照常更新。
+
         Args:
-            transaction_id: 交易ID
-            fund_name: 基金名称
-            unit_nav: 单位净值
-            shares: 份额
-            amount: 金额
-            note_original: 原始备注
-        
+            use_target_amount: True=使用记录的target_amount，False=使用定投计划金额(self.plans)
+
         Returns:
-            bool: 更新成功返回True
+            list[dict]: 每条待确认记录的结果，status 为 confirmed / no_amount / no_nav / conflict
         """
-        note_updated = note_original.replace('[待确认]', '').strip()
+        plans = self.plans or {}
         with self.engine.begin() as conn:
-            result = conn.execute(
-                text(
-                    """UPDATE transactions
-                         SET fund_name = :fund_name,
-                             shares = :shares,
-                             unit_nav = :unit_nav,
-                             amount = :amount,
-                             note = :note
-                         WHERE transaction_id = :transaction_id"""
-                ),
+            rows = conn.execute(
+                text(_confirm_sql(
+                    """plan AS (
+                           SELECT * FROM unnest(CAST(:plan_codes AS text[]), CAST(:plan_amounts AS numeric[]))
+                               AS p(fund_code, amount)
+                       ),
+                       pending AS (
+                           SELECT t.transaction_id, t.user_id, t.fund_code, t.transaction_date, t.nav_date,
+                                  CASE WHEN :use_target_amount THEN t.target_amount ELSE plan.amount END AS target_amount
+                             FROM transactions t
+                             LEFT JOIN plan ON plan.fund_code = t.fund_code
+                            WHERE t.user_id = :user_id AND t.shares IS NULL
+                       )"""
+                )),
                 {
-                    "fund_name": fund_name,
-                    "shares": shares,
-                    "unit_nav": unit_nav,
-                    "amount": amount,
-                    "note": note_updated,
-                    "transaction_id": transaction_id,
+                    "user_id": self.user_id,
+                    "use_target_amount": use_target_amount,
+                    "plan_codes": list(plans.keys()),
+                    "plan_amounts": list(plans.values()),
                 },
-            )
-            return bool(result.rowcount)
+            ).fetchall()
+        return _outcomes(rows)
 
     def _auto_clean_non_trading_days(self):
         """
         自动检测并清理所有非交易日的待确认记录
-        
-        检查逻辑：遍历所有待确认记录的nav_date，如果该日期无净值但次日有净值，判定为非交易日并删除
-        
+
+        判定逻辑：待确认记录的 nav_date 当天该基金无净值、但次日有净值，视为非交易日。
+        查找与删除在一条 DELETE 中完成（NOT EXISTS / EXISTS 各走一次索引）
+
         Returns:
-            int: 删除的记录数量
+            list[int]: 被删除的交易ID
         """
-        # 将所有数据库操作放在一个事务内
         with self.engine.begin() as conn:
-            pending_dates = [
-                row[0]
-                for row in conn.execute(
-                    text(
-                        """SELECT DISTINCT nav_date::text FROM transactions
-                             WHERE user_id = :user_id AND shares IS NULL
-                             ORDER BY nav_date"""
-                    ),
-                    {"user_id": self.user_id},
-                ).fetchall()
-            ]
-            
-            if not pending_dates:
-                print("没有待确认记录需要检查")
-                return
-            
-            print(f"检查 {len(pending_dates)} 个不同日期: {', '.join(pending_dates)}\n")
-            
-            total_deleted = 0
-            
-            for check_date in pending_dates:
-                check_dt = datetime.strptime(check_date, '%Y-%m-%d')
-                next_day = (check_dt + timedelta(days=1)).strftime('%Y-%m-%d')
-                
-                # 获取该日期的待确认基金代码
-                affected_funds = [
-                    row[0]
-                    for row in conn.execute(
-                        text(
-                            """SELECT DISTINCT fund_code FROM transactions
-                                 WHERE user_id = :user_id AND nav_date = :nav_date AND shares IS NULL"""
-                        ),
-                        {"user_id": self.user_id, "nav_date": check_date},
-                    ).fetchall()
-                ]
-                
-                # 检查每个基金是否符合非交易日条件
-                non_trading_funds = []
-                
-                for fund_code in affected_funds:
-                    # 检查check_date是否有净值
-                    count_check = conn.execute(
-                        text(
-                            """SELECT COUNT(*) FROM fund_nav_history
-                                 WHERE fund_code = :fund_code AND price_date = :price_date"""
-                        ),
-                        {"fund_code": fund_code, "price_date": check_date},
-                    ).scalar() or 0
-                    
-                    # 检查next_day是否有净值
-                    count_next = conn.execute(
-                        text(
-                            """SELECT COUNT(*) FROM fund_nav_history
-                                 WHERE fund_code = :fund_code AND price_date = :price_date"""
-                        ),
-                        {"fund_code": fund_code, "price_date": next_day},
-                    ).scalar() or 0
-                    
-                    if count_check == 0 and count_next > 0:
-                        non_trading_funds.append(fund_code)
-                
-                # 删除非交易日的待确认记录
-                if non_trading_funds:
-                    print(f"  {check_date}: 检测到非交易日 (基金: {', '.join(non_trading_funds)})")
-                    
-                    for fund_code in non_trading_funds:
-                        to_delete = conn.execute(
-                            text(
-                                """SELECT transaction_id, transaction_date, note FROM transactions
-                                     WHERE user_id = :user_id AND fund_code = :fund_code AND nav_date = :nav_date AND shares IS NULL"""
-                            ),
-                            {"user_id": self.user_id, "fund_code": fund_code, "nav_date": check_date},
-                        ).fetchall()
+            deleted = conn.execute(
+                text(
+                    """DELETE FROM transactions t
+                         WHERE t.user_id = :user_id AND t.shares IS NULL
+                           AND NOT EXISTS (
+                               SELECT 1 FROM fund_nav_history h
+                                WHERE h.fund_code = t.fund_code AND h.price_date = t.nav_date
+                           )
+                           AND EXISTS (
+                               SELECT 1 FROM fund_nav_history h
+                                WHERE h.fund_code = t.fund_code AND h.price_date = t.nav_date + 1
+                           )
+                       RETURNING t.transaction_id, t.fund_code, t.transaction_date::text, t.nav_date::text"""
+                ),
+                {"user_id": self.user_id},
+            ).fetchall()
 
-                        for tx_id, trans_date, note in to_delete:
-                            print(f"    删除: ID={tx_id} {fund_code} 交易日={trans_date}")
-                            conn.execute(
-                                text("DELETE FROM transactions WHERE transaction_id = :transaction_id"),
-                                {"transaction_id": tx_id},
-                            )
-                            total_deleted += 1
-            
-            if total_deleted > 0:
-                print(f"\n共删除 {total_deleted} 条非交易日待确认记录")
-            else:
-                print("未发现非交易日待确认记录")
-            
-            return total_deleted
+        if not deleted:
+            print("未发现非交易日待确认记录")
+            return []
+
+        for tx_id, fund_code, trans_date, nav_date in sorted(deleted, key=lambda row: (row[3], row[1], row[0])):
+            print(f"    删除: ID={tx_id} {fund_code} 交易日={trans_date} 净值日={nav_date}（非交易日）")
+        print(f"\n共删除 {len(deleted)} 条非交易日待确认记录")
+        return [row[0] for row in deleted]
 
     def process_pending_records(self, use_target_amount=True, auto_remove_non_trading=True):
         """
@@ -232,6 +171,7 @@ class PendingTransactionUpdater:
         """
         pending = self.get_pending_transactions()
         initial_count = len(pending)
+        deleted_ids = []
         deleted_count = 0
         
         if not pending:
@@ -249,7 +189,8 @@ class PendingTransactionUpdater:
         
         # 自动清理非交易日记录
         if auto_remove_non_trading:
-            deleted_count = self._auto_clean_non_trading_days()
+            deleted_ids = self._auto_clean_non_trading_days()
+            deleted_count = len(deleted_ids)
             print()
             
             # 重新获取待确认记录
@@ -262,71 +203,33 @@ class PendingTransactionUpdater:
                     "pending_count": initial_count,
                     "success_count": 0,
                     "skip_count": 0,
-                    "deleted_count": deleted_count
+                    "deleted_count": deleted_count,
+                    "deleted_ids": deleted_ids
                 }
             print(f"清理后剩余 {len(pending)} 条待确认记录\n")
         
-        success_count = 0
-        skip_count = 0
-        
-        for tx_id, fund_code, fund_name_old, trans_date, nav_date, note in pending:
-            print(f"交易ID {tx_id}: {fund_code} 交易日={trans_date} 净值日={nav_date}")
-            
-            # 获取金额
-            if use_target_amount:
-                # 从数据库读取target_amount
-                with self.engine.connect() as conn:
-                    result = conn.execute(
-                        text("SELECT target_amount FROM transactions WHERE user_id = :user_id AND transaction_id = :transaction_id"),
-                        {"user_id": self.user_id, "transaction_id": tx_id},
-                    ).first()
-                if not result or result[0] is None:
-                    print(f"target_amount为空，跳过\n")
-                    skip_count += 1
-                    continue
-                target_amount = result[0]
-            else:
-                # 从定投计划配置获取金额
-                if fund_code not in self.plans:
-                    print(f"未在定投计划中找到该基金，跳过\n")
-                    skip_count += 1
-                    continue
-                target_amount = self.plans[fund_code]
-            
-            # 使用交易日(trans_date)的净值,而不是确认日(nav_date)
-            # 如果交易日是非交易日,则使用下一个交易日的净值
-            nav_info = self._get_nav_for_date(fund_code, trans_date)
-            
-            # 如果交易日没有净值,尝试使用确认日净值(向后兼容)
-            if not nav_info and nav_date != trans_date:
-                print(f"交易日 {trans_date} 无净值,尝试使用确认日 {nav_date}")
-                nav_info = self._get_nav_for_date(fund_code, nav_date)
-            
-            if not nav_info:
-                print(f"净值仍未抓取，跳过\n")
-                skip_count += 1
-                continue
-            
-            fund_name, unit_nav = nav_info
-            # 确俟target_amount和unit_nav都是float类型
-            target_amount = float(target_amount)
-            unit_nav = float(unit_nav)
-            shares = round(target_amount / unit_nav, 2)
-            amount = round(shares * unit_nav, 2)
-            
-            print(f"金额: ¥{target_amount:.2f} 净值: ¥{unit_nav:.4f} 份额: {shares:.2f}")
-            
-            if self.update_transaction(tx_id, fund_name, unit_nav, shares, amount, note):
-                print(f"  已更新\n")
-                success_count += 1
+        outcomes = self.confirm_pending(use_target_amount)
+        skip_reasons = {
+            'no_amount': "target_amount为空" if use_target_amount else "未在定投计划中找到该基金",
+            'no_nav': "净值仍未抓取",
+            'conflict': "已被其他任务确认",
+        }
+        for item in outcomes:
+            print(f"交易ID {item['transaction_id']}: {item['fund_code']} "
+                  f"交易日={item['transaction_date']} 净值日={item['nav_date']}")
+            if item['status'] == 'confirmed':
+                print(f"金额: ¥{item['target_amount']:.2f} 净值({item['price_date']}): ¥{item['unit_nav']:.4f} "
+                      f"份额: {item['shares']:.2f}  已更新\n")
             else:
-                print(f"  更新失败\n")
-                skip_count += 1
-        
+                print(f"{skip_reasons[item['status']]}，跳过\n")
+
+        success_count = sum(1 for item in outcomes if item['status'] == 'confirmed')
+        skip_count = len(outcomes) - success_count
+
         print("=" * 50)
         print(f"更新完成: 成功 {success_count} 条，跳过 {skip_count} 条")
         print("=" * 50)
-        
+
         # 返回详细结果
         return {
             "success": success_count > 0 or deleted_count > 0,
@@ -334,22 +237,119 @@ class PendingTransactionUpdater:
             "pending_count": initial_count,
             "success_count": success_count,
             "skip_count": skip_count,
-            "deleted_count": deleted_count
+            "deleted_count": deleted_count,
+            "deleted_ids": deleted_ids,
+            "outcomes": outcomes
         }
 
-    def _get_nav_for_date(self, fund_code: str, nav_date: str):
-        with self.engine.connect() as conn:
-            row = conn.execute(
-                text(
-                    """SELECT fund_name, unit_nav FROM fund_nav_history
-                         WHERE fund_code = :fund_code AND price_date = :price_date
-                         ORDER BY fetched_at DESC LIMIT 1"""
-                ),
-                {"fund_code": fund_code, "price_date": nav_date},
-            ).first()
-        if not row:
-            return None
-        return row[0], float(row[1])
+
+def _confirm_sql(pending_ctes):
+    """拼出确认语句：pending_ctes 需定义 pending(transaction_id, user_id, fund_code,
+    transaction_date, nav_date, target_amount)，其余取净值、UPDATE 与结果部分共用"""
+    return f"""WITH {pending_ctes},
+               priced AS (
+                   SELECT pending.*, nav.fund_name, nav.unit_nav, nav.price_date,
+                          ROUND(pending.target_amount / nav.unit_nav, 2) AS shares
+                     FROM pending
+                     LEFT JOIN LATERAL (
+                         SELECT h.fund_name, h.unit_nav, h.price_date
+                           FROM fund_nav_history h
+                          WHERE h.fund_code = pending.fund_code
+                            AND h.price_date IN (pending.transaction_date, pending.nav_date)
+                            AND h.unit_nav > 0
+                          ORDER BY (h.price_date = pending.transaction_date) DESC, h.fetched_at DESC
+                          LIMIT 1
+                     ) nav ON pending.target_amount IS NOT NULL
+               ),
+               updated AS (
+                   UPDATE transactions t
+                      SET fund_name = priced.fund_name,
+                          shares = priced.shares,
+                          unit_nav = priced.unit_nav,
+                          amount = ROUND(priced.shares * priced.unit_nav, 2),
+                          note = btrim(replace(t.note, '[待确认]', ''), E' \\t\\r\\n')
+                     FROM priced
+                    WHERE t.transaction_id = priced.transaction_id
+                      AND priced.unit_nav IS NOT NULL
+                      AND t.shares IS NULL
+                   RETURNING t.transaction_id
+               )
+               SELECT priced.transaction_id, priced.user_id, priced.fund_code, priced.transaction_date::text,
+                      priced.nav_date::text, priced.target_amount, priced.price_date::text,
+                      priced.unit_nav, priced.shares, ROUND(priced.shares * priced.unit_nav, 2),
+                      priced.transaction_id IN (SELECT transaction_id FROM updated)
+                 FROM priced
+                ORDER BY priced.transaction_date, priced.transaction_id"""
+
+
+def _outcomes(rows):
+    """将确认语句的结果行转换为可JSON序列化的逐条结果"""
+    outcomes = []
+    for (tx_id, user_id, fund_code, trans_date, nav_date, target_amount, price_date,
+         unit_nav, shares, amount, updated) in rows:
+        if target_amount is None:
+            status = 'no_amount'
+        elif unit_nav is None:
+            status = 'no_nav'
+        elif updated:
+            status = 'confirmed'
+        else:
+            # 并发任务已先一步确认该记录
+            status = 'conflict'
+        outcomes.append({
+            "transaction_id": tx_id,
+            "user_id": user_id,
+            "fund_code": fund_code,
+            "transaction_date": trans_date,
+            "nav_date": nav_date,
+            "status": status,
+            "price_date": price_date,
+            "target_amount": float(target_amount) if target_amount is not None else None,
+            "unit_nav": float(unit_nav) if unit_nav is not None else None,
+            "shares": float(shares) if status == 'confirmed' else None,
+            "amount": float(amount) if status == 'confirmed' else None,
+        })
+    return outcomes
+
+
+def confirm_written_nav(conn, nav_keys):
+    """净值写入后的增量确认：只处理与新写入 (fund_code, price_date) 匹配的待确认记录，覆盖所有用户
+
+    交易日或确认日命中新净值的记录才会被处理，工作量与新数据量成正比，与待确认积压量无关。
+    使用记录自身的 target_amount，target_amount 为空的记录留给 process_pending_records。
+    在调用方事务中执行（与净值写入同一事务），可传入 Connection 或 Session。
+
+    Args:
+        conn: SQLAlchemy Connection / Session
+        nav_keys: 可迭代的 (fund_code, price_date)，price_date 为 date 或 'YYYY-MM-DD'
+
+    Returns:
+        list[dict]: 被处理记录的结果（字段同 confirm_pending，附 user_id）
+    """
+    keys = {(code, price_date if isinstance(price_date, date) else date.fromisoformat(str(price_date)[:10]))
+            for code, price_date in nav_keys}
+    if not keys:
+        return []
+    rows = conn.execute(
+        text(_confirm_sql(
+            """written AS (
+                   SELECT DISTINCT * FROM unnest(CAST(:codes AS text[]), CAST(:dates AS date[]))
+                       AS w(fund_code, price_date)
+               ),
+               pending AS (
+                   SELECT t.transaction_id, t.user_id, t.fund_code, t.transaction_date, t.nav_date, t.target_amount
+                     FROM transactions t
+                    WHERE t.shares IS NULL AND t.target_amount IS NOT NULL
+                      AND EXISTS (
+                          SELECT 1 FROM written w
+                           WHERE w.fund_code = t.fund_code
+                             AND w.price_date IN (t.transaction_date, t.nav_date)
+                      )
+               )"""
+        )),
+        {"codes": [code for code, _ in keys], "dates": [price_date for _, price_date in keys]},
+    ).fetchall()
+    return _outcomes(rows)
 
 
 # 向后兼容的函数接口
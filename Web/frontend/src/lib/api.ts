@@ -57,3 +57,37 @@ apiClient.interceptors.response.use(
 )
 
 export default apiClient
+
+// 后台任务：提交后轮询 /jobs/{id}，直到完成并返回任务结果
+export interface JobStatus {
+  job_id: number
+  job_type: string
+  status: 'queued' | 'running' | 'succeeded' | 'failed'
+  progress_current: number
+  progress_total: number | null
+  progress_message: string | null
+  result: any
+  error: string | null
+}
+
+export async function waitForJob(
+  jobId: number,
+  onProgress?: (job: JobStatus) => void,
+  intervalMs = 1500,
+): Promise<any> {
+  for (;;) {
+    const { data } = await apiClient.get<JobStatus>(`/jobs/${jobId}`)
+    onProgress?.(data)
+    if (data.status === 'succeeded') return data.result
+    if (data.status === 'failed') throw new Error(data.error || '任务执行失败')
+    await new Promise((resolve) => setTimeout(resolve, intervalMs))
+  }
+}
+
+export function formatJobProgress(job: JobStatus): string {
+  if (job.status === 'queued') return '排队中...'
+  if (job.progress_total) {
+    return `执行中 ${job.progress_current}/${job.progress_total}${job.progress_message ? ` (${job.progress_message})` : ''}`
+  }
+  return '执行中...'
+}
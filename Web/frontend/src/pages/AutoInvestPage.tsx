@@ -2,6 +2,7 @@ import { useState, useEffect } from 'react'
 import { motion, AnimatePresence } from 'framer-motion'
 import { Plus, Edit2, Trash2, Power, X, Play } from 'lucide-react'
 import Layout from '../components/Layout'
+import { waitForJob, formatJobProgress } from '../lib/api'
 
 interface AutoInvestPlan {
   plan_id: number
@@ -157,11 +158,12 @@ export default function AutoInvestPage() {
         method: 'POST',
         headers: { 'Authorization': `Bearer ${token}` }
       })
-      const data = await response.json()
+      const job = await response.json()
       if (response.ok) {
+        const data = await waitForJob(job.job_id, (j) => setExecuteMessage(`正在执行今日定投: ${formatJobProgress(j)}`))
         setExecuteMessage(`✅ ${data.message}`)
       } else {
-        setExecuteMessage(`❌ ${data.detail}`)
+        setExecuteMessage(`❌ ${job.detail}`)
       }
       setTimeout(() => setExecuteMessage(''), 5000)
     } catch (error: any) {
@@ -4,6 +4,7 @@ import {
   Plus, RefreshCw, TrendingUp
 } from 'lucide-react'
 import Layout from '../components/Layout'
+import { waitForJob, formatJobProgress } from '../lib/api'
 
 export default function ToolsPage() {
   const [loading, setLoading] = useState(false)
@@ -76,12 +77,17 @@ export default function ToolsPage() {
         body: JSON.stringify({})
       })
       
-      const data = await response.json()
+      const job = await response.json()
+      if (!response.ok) {
+        setMessage(`❌ 抓取失败: ${job.detail || job.message}`)
+        return
+      }
+      const data = await waitForJob(job.job_id, (j) => setMessage(`正在抓取历史净值: ${formatJobProgress(j)}`))
       
-      if (response.ok && data.success) {
+      if (data.success) {
         setMessage(`✅ ${data.message}`)
       } else {
-        setMessage(`❌ 抓取失败: ${data.detail || data.message}`)
+        setMessage(`❌ 抓取失败: ${data.message}`)
       }
     } catch (error: any) {
       setMessage(`❌ 网络错误: ${error.message}`)
@@ -104,12 +110,17 @@ export default function ToolsPage() {
         }
       })
       
-      const data = await response.json()
+      const job = await response.json()
+      if (!response.ok) {
+        setMessage(`❌ 更新失败: ${job.detail || job.message}`)
+        return
+      }
+      const data = await waitForJob(job.job_id, (j) => setMessage(`正在更新待确认交易: ${formatJobProgress(j)}`))
       
-      if (response.ok && data.success) {
+      if (data.success) {
         setMessage(`✅ ${data.message}`)
       } else {
-        setMessage(`❌ 更新失败: ${data.detail || data.message}`)
+        setMessage(`❌ 更新失败: ${data.message}`)
       }
     } catch (error: any) {
       setMessage(`❌ 网络错误: ${error.message}`)
@@ -1,5 +1,5 @@
 import { create } from 'zustand'
-import apiClient from '../lib/api'
+import apiClient, { waitForJob } from '../lib/api'
 import type { FundOverview, Transaction, NavHistory, ProfitSummary } from '../types'
 
 interface FundState {
@@ -78,7 +78,8 @@ export const useFundStore = create<FundState>((set) => ({
   fetchHistoricalNav: async (fundCodes?: string[]) => {
     set({ loading: true, error: null })
     try {
-      await apiClient.post('/funds/fetch-nav', fundCodes ? { fund_codes: fundCodes } : {})
+      const { data } = await apiClient.post('/funds/fetch-nav', fundCodes ? { fund_codes: fundCodes } : {})
+      await waitForJob(data.job_id)
       set({ loading: false })
     } catch (error: any) {
       set({ error: error.response?.data?.detail || '抓取历史净值失败', loading: false })
@@ -89,7 +90,8 @@ export const useFundStore = create<FundState>((set) => ({
   updatePending: async () => {
     set({ loading: true, error: null })
     try {
-      await apiClient.post('/funds/update-pending')
+      const { data } = await apiClient.post('/funds/update-pending')
+      await waitForJob(data.job_id)
       set({ loading: false })
     } catch (error: any) {
       set({ error: error.response?.data?.detail || '更新待确认交易失败', loading: false })
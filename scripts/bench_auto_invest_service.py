@@ -0,0 +1,164 @@
+"""
+定投计划接口并发基准 - 对比在 async 路由中直接调用同步 psycopg2 查询（旧实现）与 AutoInvestService 的 AsyncSession 实现
+模拟 --requests 个并发请求，每个请求 列出计划 + 切换启用状态；同时用一个定时协程测量事件循环延迟
+为指定用户创建 BENCH 开头的定投计划，结束后删除
+用法: python scripts/bench_auto_invest_service.py --db-url postgresql://... --requests 200 --user-id 1
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import os
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Web', 'backend'))
+
+from app.services.auto_invest_service import PLAN_COLUMNS, AutoInvestService  # noqa: E402
+from app.utils.engines import get_async_engine, get_engine  # noqa: E402
+
+PLANS = 20
+
+
+class LegacyAutoInvestService:
+    """旧实现：同步会话，toggle 先读取、再更新、再读取"""
+
+    def __init__(self, user_id, engine):
+        self.user_id = user_id
+        self.Session = sessionmaker(bind=engine)
+
+    def get_all_plans(self):
+        with self.Session() as session:
+            return session.execute(
+                text(f"SELECT {PLAN_COLUMNS} FROM auto_invest_plans WHERE user_id = :u "
+                     "ORDER BY enabled DESC, created_at DESC"),
+                {"u": self.user_id},
+            ).mappings().all()
+
+    def get_plan(self, plan_id):
+        with self.Session() as session:
+            return session.execute(
+                text(f"SELECT {PLAN_COLUMNS} FROM auto_invest_plans WHERE user_id = :u AND plan_id = :p"),
+                {"u": self.user_id, "p": plan_id},
+            ).mappings().first()
+
+    def toggle_plan(self, plan_id):
+        plan = self.get_plan(plan_id)
+        with self.Session() as session:
+            with session.begin():
+                session.execute(
+                    text("UPDATE auto_invest_plans SET enabled = :e, updated_at = CURRENT_TIMESTAMP "
+                         "WHERE user_id = :u AND plan_id = :p"),
+                    {"e": not plan['enabled'], "u": self.user_id, "p": plan_id},
+                )
+        return self.get_plan(plan_id)
+
+
+def to_sync_url(url):
+    url = url.replace('postgres://', 'postgresql://', 1)
+    if url.startswith('postgresql+asyncpg://'):
+        return url.replace('postgresql+asyncpg://', 'postgresql+psycopg2://', 1)
+    return url if '+' in url.split('://')[0] else url.replace('postgresql://', 'postgresql+psycopg2://', 1)
+
+
+def to_async_url(url):
+    return 'postgresql+asyncpg://' + to_sync_url(url).split('://', 1)[1]
+
+
+async def legacy_request(engine, user_id, plan_id):
+    # 与旧路由相同：async def 中直接调用同步方法
+    service = LegacyAutoInvestService(user_id, engine)
+    service.get_all_plans()
+    service.toggle_plan(plan_id)
+
+
+async def async_request(session_factory, user_id, plan_id):
+    async with session_factory() as session:
+        service = AutoInvestService(user_id, session)
+        await service.get_all_plans()
+        await service.toggle_plan(plan_id)
+
+
+async def measure(make_request, plan_ids):
+    """并发执行所有请求，返回 (总耗时, 每个请求的延迟, 事件循环延迟采样)"""
+    interval = 0.005
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            expected = time.perf_counter() + interval
+            await asyncio.sleep(interval)
+            lags.append(time.perf_counter() - expected)
+
+    async def timed_request(plan_id):
+        # 所有请求同时到达，延迟从到达时刻算起（包括等待事件循环的时间）
+        await make_request(plan_id)
+        return time.perf_counter() - start
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(timed_request(plan_id) for plan_id in plan_ids))
+    wall = time.perf_counter() - start
+    done.set()
+    await tick
+    return wall, latencies, lags or [0.0]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[max(0, int(len(values) * q) - 1)]
+
+
+def report(label, wall, latencies, lags):
+    print(f"{label}: 总耗时 {wall * 1000:7.1f}ms  请求延迟 p50 {statistics.median(latencies) * 1000:7.1f}ms "
+          f"p95 {percentile(latencies, 0.95) * 1000:7.1f}ms  "
+          f"事件循环阻塞 p95 {percentile(lags, 0.95) * 1000:7.1f}ms 最大 {max(lags) * 1000:7.1f}ms")
+
+
+async def run(db_url, requests, user_id):
+    sync_engine = get_engine(to_sync_url(db_url))
+    async_engine = get_async_engine(to_async_url(db_url))
+    session_factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+    with sync_engine.begin() as conn:
+        conn.execute(text("DELETE FROM auto_invest_plans WHERE user_id = :u AND plan_name LIKE 'BENCH%'"),
+                     {"u": user_id})
+        plan_ids = conn.execute(
+            text("""INSERT INTO auto_invest_plans (user_id, plan_name, fund_code, fund_name, amount, frequency,
+                                                   start_date, end_date)
+                    SELECT :u, 'BENCH' || i, '000001', '接口测试', 100, 'daily', DATE '2024-01-01', DATE '2024-12-31'
+                      FROM generate_series(1, :plans) i
+                    RETURNING plan_id"""),
+            {"u": user_id, "plans": PLANS},
+        ).scalars().all()
+    targets = [plan_ids[i % len(plan_ids)] for i in range(requests)]
+    try:
+        # 预热连接池
+        await measure(lambda p: async_request(session_factory, user_id, p), targets[:10])
+        await measure(lambda p: legacy_request(sync_engine, user_id, p), targets[:10])
+        report('同步会话', *await measure(lambda p: legacy_request(sync_engine, user_id, p), targets))
+        report('异步会话', *await measure(lambda p: async_request(session_factory, user_id, p), targets))
+    finally:
+        with sync_engine.begin() as conn:
+            conn.execute(text("DELETE FROM auto_invest_plans WHERE user_id = :u AND plan_name LIKE 'BENCH%'"),
+                         {"u": user_id})
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sync vs async auto-invest service under concurrency")
+    parser.add_argument("--db-url", default=os.getenv('DATABASE_URL'), help="PostgreSQL URL，默认读取 DATABASE_URL")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--user-id", type=int, default=1, help="需要是已存在的用户")
+    args = parser.parse_args()
+    if not args.db_url:
+        parser.error("需要 --db-url 或 DATABASE_URL")
+    asyncio.run(run(args.db_url, args.requests, args.user_id))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+fund_nav_history 批量写入基准 - 对比参数化 INSERT ... ON CONFLICT executemany 与 bulk_load.bulk_upsert (COPY + 合并)
+每个规模分别测首次写入（全部插入）与重复写入（全部命中冲突更新）
+使用 BENCH 开头的基金代码，结束后删除
+用法: python scripts/bench_bulk_load.py --db-url postgresql://... --rows 10000 100000 1000000
+"""
+import argparse
+import sys
+import os
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Web', 'backend'))
+
+from bulk_load import bulk_upsert  # noqa: E402
+
+LEGACY_SQL = text(
+    """
+    INSERT INTO fund_nav_history (
+        fund_code, fund_name, price_date, unit_nav, cumulative_nav, daily_growth_rate, data_source
+    ) VALUES (
+        :fund_code, :fund_name, :price_date, :unit_nav, :cumulative_nav, :daily_growth_rate, :data_source
+    )
+    ON CONFLICT (fund_code, price_date, data_source) DO UPDATE SET
+        unit_nav = EXCLUDED.unit_nav,
+        cumulative_nav = EXCLUDED.cumulative_nav,
+        daily_growth_rate = EXCLUDED.daily_growth_rate,
+        fetched_at = CURRENT_TIMESTAMP
+    """
+)
+DAYS_PER_FUND = 5000
+
+
+def make_rows(rows):
+    """每个基金 5000 个日期，按需要的行数生成多个基金"""
+    base = date(2000, 1, 3)
+    return [
+        {
+            'fund_code': f"BENCH{i // DAYS_PER_FUND:04d}",
+            'fund_name': '基准测试',
+            'price_date': base + timedelta(days=i % DAYS_PER_FUND),
+            'unit_nav': 1.0 + (i % 997) / 1000,
+            'cumulative_nav': 1.5 + (i % 991) / 1000,
+            'daily_growth_rate': None if i % 50 == 0 else ((i % 401) - 200) / 100,
+            'data_source': 'fundSpider',
+        }
+        for i in range(rows)
+    ]
+
+
+def cleanup(engine):
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM fund_nav_history WHERE fund_code LIKE 'BENCH%'"))
+
+
+def run_legacy(engine, rows):
+    with engine.begin() as conn:
+        conn.execute(LEGACY_SQL, rows)
+
+
+def run_bulk(engine, rows):
+    with engine.begin() as conn:
+        return bulk_upsert(conn, 'fund_nav_history', rows)
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark executemany upsert vs COPY bulk load")
+    parser.add_argument("--db-url", default=os.getenv('DATABASE_URL'), help="PostgreSQL URL，默认读取 DATABASE_URL")
+    parser.add_argument("--rows", type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument("--legacy-max-rows", type=int, default=None,
+                        help="超过该行数时跳过 executemany（1M 行可能需要数十分钟）")
+    args = parser.parse_args()
+    if not args.db_url:
+        parser.error("需要 --db-url 或 DATABASE_URL")
+
+    db_url = args.db_url.replace('postgres://', 'postgresql://', 1)
+    if db_url.startswith('postgresql://'):
+        db_url = db_url.replace('postgresql://', 'postgresql+psycopg2://', 1)
+    engine = create_engine(db_url, future=True)
+
+    print(f"{'行数':>9} {'方式':<12} {'首次写入':>10} {'重复写入':>10} {'行/秒(首次)':>12}")
+    try:
+        for n in args.rows:
+            rows = make_rows(n)
+            runs = [('COPY+合并', run_bulk)]
+            if args.legacy_max_rows is None or n <= args.legacy_max_rows:
+                runs.insert(0, ('executemany', run_legacy))
+            else:
+                print(f"{n:>9} {'executemany':<12} {'跳过':>10}")
+            for label, func in runs:
+                cleanup(engine)
+                first = timed(func, engine, rows)
+                again = timed(func, engine, rows)
+                print(f"{n:>9} {label:<12} {first:9.2f}s {again:9.2f}s {n / first:12.0f}")
+    finally:
+        cleanup(engine)
+
+
+if __name__ == '__main__':
+    main()
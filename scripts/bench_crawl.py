@@ -0,0 +1,51 @@
+"""
+抓取吞吐基准 - 在本地模拟 lsjz 服务上比较不同并发设置
+无需网络与数据库
+用法: python scripts/bench_crawl.py --funds 5 --latency-ms 80 --concurrency 1 2 4 8
+"""
+import argparse
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Web', 'backend'))
+
+from fundSpider.fake_server import start_fake_server  # noqa: E402
+from fundSpider.http_client import SpiderHttpClient  # noqa: E402
+from fundSpider.sources import EastmoneyNavSource  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark NAV crawl throughput against a fake lsjz server")
+    parser.add_argument("--funds", type=int, default=5, help="基金数量")
+    parser.add_argument("--start-date", default="2018-01-01")
+    parser.add_argument("--end-date", default="2024-12-31")
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--page-size", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    server = start_fake_server(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                               error_rate=args.error_rate, page_size=args.page_size)
+    print(f"模拟服务: {server.url}  延迟 {args.latency_ms}±{args.jitter_ms}ms  错误率 {args.error_rate}")
+    codes = [f"{100000 + i:06d}" for i in range(args.funds)]
+    try:
+        for concurrency in args.concurrency:
+            client = SpiderHttpClient(rate_limit=None, pool_size=max(concurrency, 1), backoff_base=0.05)
+            source = EastmoneyNavSource(client=client, concurrency=concurrency if concurrency > 1 else None,
+                                        url=server.url)
+            start = time.perf_counter()
+            rows = sum(len(source.fetch(code, args.start_date, args.end_date)) for code in codes)
+            elapsed = time.perf_counter() - start
+            stats = client.stats.snapshot()
+            print(f"并发 {concurrency:>2}: {elapsed:6.2f}s  {stats['requests'] / elapsed:7.1f} 页/s  "
+                  f"{rows / elapsed:8.0f} 行/s  重试 {stats['retries']}  平均延迟 {stats['avg_latency_ms']}ms")
+            client.close()
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
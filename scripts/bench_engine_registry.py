@@ -0,0 +1,83 @@
+"""
+数据库连接复用基准 - 对比每个实例各自 create_engine（旧行为）与进程共享引擎注册表
+模拟 --requests 次 API 调用，每次构造后台任务用到的模块实例并各执行一次查询，统计新建 PostgreSQL 连接数
+用法: python scripts/bench_engine_registry.py --db-url postgresql://... --requests 50
+"""
+import argparse
+import contextlib
+import io
+import sys
+import os
+import time
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.pool import Pool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Web', 'backend'))
+
+import execute_plans  # noqa: E402
+import fetch_history_nav  # noqa: E402
+import tradeDate  # noqa: E402
+import update_pending_transactions  # noqa: E402
+from app.utils import engines  # noqa: E402
+
+MODULES = (execute_plans, fetch_history_nav, tradeDate, update_pending_transactions)
+connects = 0
+
+
+def _on_connect(dbapi_connection, connection_record):
+    global connects
+    connects += 1
+
+
+def legacy_engine(db_url=None):
+    """旧行为：每个实例一个新引擎（新连接池）"""
+    return create_engine(db_url, future=True)
+
+
+def simulate_request(db_url):
+    """一次 fetch-nav / update-pending / execute-today 调用中构造的对象"""
+    instances = [
+        fetch_history_nav.HistoryNavFetcher(db_url=db_url),
+        update_pending_transactions.PendingTransactionUpdater(db_url=db_url),
+        tradeDate.TradeDateChecker(db_url=db_url),
+        execute_plans.AutoInvestExecutor(db_url=db_url),
+    ]
+    for instance in instances:
+        with instance.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+
+def run(db_url, requests, factory):
+    global connects
+    for module in MODULES:
+        module.get_engine = factory
+    connects = 0
+    start = time.perf_counter()
+    for _ in range(requests):
+        simulate_request(db_url)
+    return connects, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Count Postgres connection setups: per-instance engines vs registry")
+    parser.add_argument("--db-url", default=os.getenv('DATABASE_URL'), help="PostgreSQL URL，默认读取 DATABASE_URL")
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+    if not args.db_url:
+        parser.error("需要 --db-url 或 DATABASE_URL")
+    db_url = fetch_history_nav.HistoryNavFetcher._resolve_db_url(None, args.db_url)
+
+    event.listen(Pool, 'connect', _on_connect)
+    with contextlib.redirect_stdout(io.StringIO()):
+        legacy = run(db_url, args.requests, legacy_engine)
+        shared = run(db_url, args.requests, engines.get_engine)
+
+    print(f"{args.requests} 次模拟请求")
+    for label, (count, elapsed) in (("每实例引擎", legacy), ("共享注册表", shared)):
+        print(f"{label}: 新建连接 {count:5d} 次（{count / args.requests:.2f}/请求），"
+              f"耗时 {elapsed:.2f}s（{elapsed / args.requests * 1000:.1f}ms/请求）")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+定投补齐基准 - 对比逐日期 SELECT COUNT(*) + 单条 INSERT（旧实现）与 execute_today 单条 INSERT ... SELECT FROM unnest
+为指定用户创建 BENCH 开头的每日定投计划，结束后删除计划与生成的交易记录
+用法: python scripts/bench_execute_today.py --db-url postgresql://... --plans 5 --start 2023-10-01 --user-id 1
+"""
+import argparse
+import contextlib
+import io
+import sys
+import os
+import time
+
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Web', 'backend'))
+
+from execute_plans import AutoInvestExecutor  # noqa: E402
+from plan_schedule import build_schedule  # noqa: E402
+from tradeDate import get_trading_calendar  # noqa: E402
+
+
+def cleanup(engine, user_id):
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM transactions WHERE user_id = :u AND fund_code LIKE 'BENCH%'"), {"u": user_id})
+        conn.execute(text("DELETE FROM auto_invest_plans WHERE user_id = :u AND plan_name LIKE 'BENCH%'"), {"u": user_id})
+
+
+def seed(engine, user_id, plans, start):
+    with engine.begin() as conn:
+        conn.execute(
+            text("""INSERT INTO auto_invest_plans (user_id, plan_name, fund_code, fund_name, amount, frequency,
+                                                   start_date, end_date, enabled)
+                    SELECT :u, 'BENCH' || i, 'BENCH' || lpad(i::text, 2, '0'), '补齐测试', 100, 'daily',
+                           CAST(:start AS date), DATE '2099-12-31', true
+                      FROM generate_series(1, :plans) i"""),
+            {"u": user_id, "plans": plans, "start": start},
+        )
+
+
+def execute_row_by_row(executor):
+    """旧实现：每个候选日期 SELECT COUNT(*)，缺失时单条 INSERT"""
+    plans = [p for p in executor.load_enabled_plans() if p['plan_name'].startswith('BENCH')]
+    schedule = build_schedule(plans, time.strftime('%Y-%m-%d'), get_trading_calendar(executor.engine))
+    created = 0
+    with executor.engine.begin() as conn:
+        for index, trade_date, confirm_date in zip(schedule['plan_index'].tolist(), schedule['trade_date'].tolist(),
+                                                   schedule['confirm_date'].tolist()):
+            plan = plans[index]
+            exists = conn.execute(
+                text("""SELECT COUNT(*) FROM transactions
+                         WHERE user_id = :u AND fund_code = :c AND transaction_date = :d"""),
+                {"u": executor.user_id, "c": plan['fund_code'], "d": trade_date},
+            ).scalar()
+            if exists:
+                continue
+            conn.execute(
+                text("""INSERT INTO transactions (user_id, plan_id, fund_code, fund_name, transaction_date, nav_date,
+                                                  transaction_type, target_amount, note)
+                        VALUES (:u, :p, :c, :n, :d, :nav, '买入', :amount, :note)"""),
+                {"u": executor.user_id, "p": plan['plan_id'], "c": plan['fund_code'], "n": plan['fund_name'],
+                 "d": trade_date, "nav": confirm_date, "amount": plan['amount'],
+                 "note": f"[待确认] {plan['plan_name']}"},
+            )
+            created += 1
+    return created
+
+
+def execute_set_based(executor):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return executor.execute_today()['transactions_created']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark row-by-row vs set-based execute-today")
+    parser.add_argument("--db-url", default=os.getenv('DATABASE_URL'), help="PostgreSQL URL，默认读取 DATABASE_URL")
+    parser.add_argument("--plans", type=int, default=5)
+    parser.add_argument("--start", default="2023-10-01")
+    parser.add_argument("--user-id", type=int, default=1, help="需要是已存在的用户，且没有其他启用的定投计划")
+    args = parser.parse_args()
+    if not args.db_url:
+        parser.error("需要 --db-url 或 DATABASE_URL")
+
+    executor = AutoInvestExecutor(user_id=args.user_id, db_url=args.db_url)
+    engine = executor.engine
+    timings = {}
+    try:
+        cleanup(engine, args.user_id)
+        seed(engine, args.user_id, args.plans, args.start)
+        for label, func in (('逐条检查', execute_row_by_row), ('单条语句', execute_set_based)):
+            with engine.begin() as conn:
+                conn.execute(text("DELETE FROM transactions WHERE user_id = :u AND fund_code LIKE 'BENCH%'"),
+                             {"u": args.user_id})
+            start = time.perf_counter()
+            created = func(executor)
+            timings[label] = time.perf_counter() - start
+            rerun = execute_set_based(executor)
+            print(f"{label}: 新建 {created} 条，{timings[label]:.2f}s，再次执行新建 {rerun} 条")
+    finally:
+        cleanup(engine, args.user_id)
+    print(f"加速 {timings['逐条检查'] / timings['单条语句']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+最新净值查询基准 - 对比视图关联 DISTINCT ON 全表子查询（旧实现）与关联 fund_latest_nav 表
+写入 SYN 开头基金的合成净值历史（默认 2000 个基金 x 2500 天 = 500 万行）并为指定用户建立持仓汇总，
+测量仪表盘的两个查询（持仓列表 + 收益汇总）的延迟，以及每日增量写入净值时维护最新净值表的开销；结束后删除
+用法: python scripts/bench_latest_nav.py --db-url postgresql://... --funds 2000 --days 2500 --user-id 1
+"""
+import argparse
+import statistics
+import sys
+import os
+import time
+
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Web', 'backend'))
+
+from app.utils.engines import get_engine  # noqa: E402
+
+HELD_FUNDS = 20
+
+# 旧视图中的最新净值子查询
+LEGACY_LATEST = """(
+    SELECT DISTINCT ON (fund_code) fund_code, price_date, unit_nav, daily_growth_rate, data_source
+    FROM fund_nav_history
+    ORDER BY fund_code, price_date DESC, fetched_at DESC
+)"""
+
+OVERVIEW_SQL = """
+    SELECT fo.fund_code, fo.total_shares * COALESCE(mp.unit_nav, 0) AS current_value,
+           COALESCE(mp.price_date::text, '') AS last_nav_date, COALESCE(mp.daily_growth_rate, 0) AS daily_growth_rate
+    FROM fund_overview fo
+    LEFT JOIN {latest} mp ON fo.fund_code = mp.fund_code
+    WHERE fo.user_id = :u
+    ORDER BY fo.fund_code
+"""
+
+SUMMARY_SQL = """
+    SELECT fo.user_id, COUNT(*), COALESCE(SUM(fo.total_shares * COALESCE(mp.unit_nav, 0)), 0) AS total_value
+    FROM fund_overview fo
+    LEFT JOIN {latest} mp ON fo.fund_code = mp.fund_code
+    WHERE fo.user_id = :u
+    GROUP BY fo.user_id
+"""
+
+
+def to_sync_url(url):
+    url = url.replace('postgres://', 'postgresql://', 1)
+    if url.startswith('postgresql+asyncpg://'):
+        return url.replace('postgresql+asyncpg://', 'postgresql+psycopg2://', 1)
+    return url if '+' in url.split('://')[0] else url.replace('postgresql://', 'postgresql+psycopg2://', 1)
+
+
+def cleanup(engine, user_id):
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM fund_overview WHERE user_id = :u AND fund_code LIKE 'SYN%'"), {"u": user_id})
+        conn.execute(text("DELETE FROM fund_nav_history WHERE fund_code LIKE 'SYN%'"))
+
+
+def seed(engine, user_id, funds, days):
+    with engine.begin() as conn:
+        conn.execute(
+            text("""INSERT INTO fund_nav_history (fund_code, fund_name, price_date, unit_nav, daily_growth_rate)
+                    SELECT 'SYN' || lpad(f::text, 5, '0'), '合成基金', DATE '2000-01-03' + d,
+                           1 + (f % 100) / 100.0 + d / 10000.0, 0.1
+                      FROM generate_series(0, :funds - 1) f, generate_series(0, :days - 1) d"""),
+            {"funds": funds, "days": days},
+        )
+        conn.execute(
+            text("""INSERT INTO fund_overview (user_id, fund_code, fund_name, total_shares, total_cost, average_buy_nav)
+                    SELECT :u, 'SYN' || lpad((f * (:funds / :held))::text, 5, '0'), '合成基金', 1000, 1000, 1
+                      FROM generate_series(0, :held - 1) f"""),
+            {"u": user_id, "funds": funds, "held": HELD_FUNDS},
+        )
+        conn.execute(text("ANALYZE fund_nav_history"))
+        conn.execute(text("ANALYZE fund_latest_nav"))
+
+
+def dashboard_latency(engine, user_id, latest, repeat):
+    timings = []
+    with engine.connect() as conn:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            overview = conn.execute(text(OVERVIEW_SQL.format(latest=latest)), {"u": user_id}).all()
+            summary = conn.execute(text(SUMMARY_SQL.format(latest=latest)), {"u": user_id}).one()
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings), overview, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DISTINCT ON latest NAV vs maintained fund_latest_nav")
+    parser.add_argument("--db-url", default=os.getenv('DATABASE_URL'), help="PostgreSQL URL，默认读取 DATABASE_URL")
+    parser.add_argument("--funds", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=2500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--user-id", type=int, default=1, help="需要是已存在的用户")
+    args = parser.parse_args()
+    if not args.db_url:
+        parser.error("需要 --db-url 或 DATABASE_URL")
+
+    engine = get_engine(to_sync_url(args.db_url))
+    try:
+        cleanup(engine, args.user_id)
+        start = time.perf_counter()
+        seed(engine, args.user_id, args.funds, args.days)
+        print(f"写入 {args.funds * args.days} 行合成净值 {time.perf_counter() - start:.1f}s")
+
+        legacy, legacy_overview, legacy_summary = dashboard_latency(engine, args.user_id, LEGACY_LATEST, args.repeat)
+        latest, overview, summary = dashboard_latency(engine, args.user_id, 'fund_latest_nav', args.repeat)
+        assert [tuple(r) for r in legacy_overview] == [tuple(r) for r in overview]
+        assert tuple(legacy_summary) == tuple(summary)
+        print(f"仪表盘查询（持仓 {HELD_FUNDS} 个基金，中位数）")
+        print(f"  DISTINCT ON 全表: {legacy * 1000:9.1f}ms")
+        print(f"  fund_latest_nav : {latest * 1000:9.1f}ms  (加速 {legacy / latest:.0f}x)")
+
+        # 每日增量：每个基金追加一天净值，最新净值表由触发器同步更新
+        with engine.begin() as conn:
+            start = time.perf_counter()
+            conn.execute(
+                text("""INSERT INTO fund_nav_history (fund_code, fund_name, price_date, unit_nav)
+                        SELECT 'SYN' || lpad(f::text, 5, '0'), '合成基金', DATE '2000-01-03' + :days, 2
+                          FROM generate_series(0, :funds - 1) f"""),
+                {"funds": args.funds, "days": args.days},
+            )
+            incremental = time.perf_counter() - start
+            refreshed = conn.execute(
+                text("SELECT COUNT(*) FROM fund_latest_nav WHERE fund_code LIKE 'SYN%' AND unit_nav = 2")
+            ).scalar()
+        print(f"每日增量写入 {args.funds} 行（含维护最新净值表）{incremental * 1000:.1f}ms，已更新 {refreshed} 个基金")
+    finally:
+        cleanup(engine, args.user_id)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+lsjz 响应解析基准 - 对比 BeautifulSoup 旧解析与 fundSpider.lsjz_parser
+先用 fixtures 中的样例响应校验两者结果一致，再计时
+用法: python scripts/bench_lsjz_parser.py [--rounds 200]
+"""
+import argparse
+import math
+import sys
+import os
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Web', 'backend'))
+
+from fundSpider.lsjz_parser import parse_rows  # noqa: E402
+
+FIXTURE_DIR = Path(__file__).parent / 'fixtures'
+
+
+def legacy_parse(text):
+    """原 FuncInfo.load_net_value_info 中的解析逻辑（返回字符串 dict）"""
+    soup = BeautifulSoup(text, 'lxml')
+    th_list = None
+    rows = []
+    for idx, tr in enumerate(soup.find_all('tr')):
+        if idx == 0:
+            th_list = [x.text for x in tr.find_all("th")]
+        else:
+            values = [w.text for w in tr.find_all('td')]
+            if values[0] == "暂无数据!":
+                break
+            rows.append(dict(zip(th_list, values)))
+    return rows
+
+
+def _to_float(value):
+    value = (value or '').strip().rstrip('%')
+    if value in ('', '--'):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _nan_to_none(value):
+    return None if math.isnan(value) else value
+
+
+def check_equivalence(text):
+    legacy = [
+        (d.get('净值日期'), _to_float(d.get('单位净值')), _to_float(d.get('累计净值')), _to_float(d.get('日增长率')))
+        for d in legacy_parse(text)
+    ]
+    fast = [(d, _nan_to_none(u), _nan_to_none(c), _nan_to_none(g)) for d, u, c, g in parse_rows(text)]
+    assert legacy == fast, "解析结果不一致"
+    return len(fast)
+
+
+def bench(func, text, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(text)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark lsjz page parsers")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    for path in sorted(FIXTURE_DIR.glob('lsjz_*.txt')):
+        text = path.read_text(encoding='utf-8')
+        rows = check_equivalence(text)
+        print(f"✓ {path.name}: {rows} 行，解析结果一致")
+
+    text = (FIXTURE_DIR / 'lsjz_page1.txt').read_text(encoding='utf-8')
+    legacy_ms = bench(legacy_parse, text, args.rounds)
+    fast_ms = bench(parse_rows, text, args.rounds)
+    print(f"BeautifulSoup: {legacy_ms:.3f} ms/页")
+    print(f"lxml.etree:    {fast_ms:.3f} ms/页")
+    print(f"加速比: {legacy_ms / fast_ms:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+净值写入前清洗基准 - 对比 save_nav_history 原 iterrows 逐行清洗与 normalize_nav_frame 整列清洗
+先在浮点列与字符串列（含 '%'、'--'、空值）两种输入上校验结果一致，再计时
+无需数据库
+用法: python scripts/bench_nav_normalize.py --rows 1000 5000 20000
+"""
+import argparse
+import sys
+import os
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Web', 'backend'))
+
+from fetch_history_nav import normalize_nav_frame  # noqa: E402
+
+
+def legacy_normalize(df, fund_code, fund_name, data_source, existing_dates):
+    """原 save_nav_history 中的逐行清洗逻辑"""
+    records = []
+    skipped_count = 0
+    for _, row in df.iterrows():
+        price_date = pd.Timestamp(row.get('净值日期')).date()
+        if price_date in existing_dates:
+            skipped_count += 1
+            continue
+
+        unit_nav, cumulative_nav, daily_growth = (
+            None if isinstance(v, float) and np.isnan(v) else v
+            for v in (row.get('单位净值'), row.get('累计净值'), row.get('日增长率'))
+        )
+
+        if isinstance(daily_growth, str):
+            if daily_growth.strip() == '--' or daily_growth.strip() == '':
+                daily_growth_rate = None
+            else:
+                daily_growth_rate = daily_growth.replace('%', '')
+                try:
+                    daily_growth_rate = float(daily_growth_rate)
+                except ValueError:
+                    daily_growth_rate = None
+        else:
+            try:
+                daily_growth_rate = float(daily_growth) if daily_growth is not None else None
+            except Exception:
+                daily_growth_rate = None
+        try:
+            unit_nav_f = float(unit_nav)
+        except Exception:
+            continue
+        cumulative_nav_f = None
+        try:
+            if cumulative_nav not in (None, '', '--'):
+                cumulative_nav_f = float(cumulative_nav)
+        except Exception:
+            cumulative_nav_f = None
+        records.append({
+            'fund_code': fund_code,
+            'fund_name': fund_name,
+            'price_date': price_date,
+            'unit_nav': unit_nav_f,
+            'cumulative_nav': cumulative_nav_f,
+            'daily_growth_rate': daily_growth_rate,
+            'data_source': data_source,
+        })
+    return records, skipped_count
+
+
+def make_frame(rows, as_text=False, seed=7):
+    """生成日期倒序的模拟净值，约 2% 的单位净值、累计净值、日增长率缺失"""
+    rng = np.random.default_rng(seed)
+    dates = np.array([date(2010, 1, 4) + timedelta(days=i) for i in range(rows)][::-1], dtype='datetime64[D]')
+    unit = np.round(rng.uniform(0.5, 3.0, rows), 4)
+    cum = np.round(unit + 0.5, 4)
+    growth = np.round(rng.normal(0, 1.2, rows), 2)
+    for column in (unit, cum, growth):
+        column[rng.random(rows) < 0.02] = np.nan
+    if as_text:
+        fmt = lambda v, suffix='': '--' if np.isnan(v) else f"{v:.4f}{suffix}"  # noqa: E731
+        unit = np.array([fmt(v) for v in unit], dtype=object)
+        cum = np.array([fmt(v) for v in cum], dtype=object)
+        growth = np.array([fmt(v, '%') for v in growth], dtype=object)
+    return pd.DataFrame({"净值日期": dates, "单位净值": unit, "累计净值": cum, "日增长率": growth})
+
+
+def existing_subset(df, fraction=0.3):
+    dates = pd.to_datetime(df['净值日期']).dt.date.tolist()
+    return set(dates[: int(len(dates) * fraction)])
+
+
+def check_equivalence(df, existing):
+    legacy = legacy_normalize(df, '000001', '测试基金', 'fundSpider', existing)
+    fast = normalize_nav_frame(df, '000001', '测试基金', 'fundSpider', existing)
+    assert legacy == fast, "清洗结果不一致"
+    return len(fast[0]), fast[1]
+
+
+def bench(func, df, existing, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(df, '000001', '测试基金', 'fundSpider', existing)
+    return (time.perf_counter() - start) / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark NAV row normalization: iterrows vs vectorized")
+    parser.add_argument("--rows", type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    for as_text in (False, True):
+        df = make_frame(2000, as_text=as_text)
+        written, skipped = check_equivalence(df, existing_subset(df))
+        print(f"一致性校验通过（{'字符串' if as_text else '浮点'}列）: 写入 {written} 行，跳过 {skipped} 行")
+
+    for rows in args.rows:
+        df = make_frame(rows)
+        existing = existing_subset(df)
+        legacy = bench(legacy_normalize, df, existing, args.rounds)
+        fast = bench(normalize_nav_frame, df, existing, args.rounds)
+        print(f"{rows:>7} 行: iterrows {legacy * 1000:9.2f}ms  整列 {fast * 1000:8.2f}ms  加速 {legacy / fast:6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+多基金净值同步基准 - 对比逐个基金 抓取->写入 与 NavPipeline 三阶段流水线
+使用本地模拟 lsjz 服务，写入 PIPE 开头的基金代码，结束后删除
+用法: python scripts/bench_nav_pipeline.py --db-url postgresql://... --funds 8 --latency-ms 80
+"""
+import argparse
+import sys
+import os
+import time
+
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Web', 'backend'))
+
+from fetch_history_nav import HistoryNavFetcher  # noqa: E402
+from fundSpider.fake_server import start_fake_server  # noqa: E402
+from fundSpider.http_client import SpiderHttpClient  # noqa: E402
+from fundSpider.sources import EastmoneyNavSource  # noqa: E402
+from nav_pipeline import NavPipeline  # noqa: E402
+
+
+def sequential_sync(fetcher, funds, windows):
+    """基线：逐个基金、逐个窗口 抓取完整序列 -> 写入，返回写入行数"""
+    rows = 0
+    for code, name in funds.items():
+        for window in windows[code]:
+            df = fetcher.fetch_fund_history(code, name, window['start'], window['end'])
+            rows += fetcher.save_nav_history(df, code, name)
+    return rows
+
+
+def cleanup(fetcher):
+    with fetcher.engine.begin() as conn:
+        conn.execute(text("DELETE FROM fund_nav_history WHERE fund_code LIKE 'PIPE%'"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sequential vs pipelined multi-fund NAV sync")
+    parser.add_argument("--db-url", default=os.getenv('DATABASE_URL'), help="PostgreSQL URL，默认读取 DATABASE_URL")
+    parser.add_argument("--funds", type=int, default=8)
+    parser.add_argument("--start-date", default="2015-01-01")
+    parser.add_argument("--end-date", default="2024-12-31")
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--concurrency", type=int, default=4, help="单个窗口内的分页并发")
+    parser.add_argument("--fetch-workers", type=int, default=2)
+    args = parser.parse_args()
+    if not args.db_url:
+        parser.error("需要 --db-url 或 DATABASE_URL")
+
+    server = start_fake_server(latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 4)
+    client = SpiderHttpClient(rate_limit=None, pool_size=args.concurrency * args.fetch_workers)
+    fetcher = HistoryNavFetcher(db_url=args.db_url)
+    fetcher.source = EastmoneyNavSource(client=client, concurrency=args.concurrency, url=server.url)
+    funds = {f"PIPE{i:03d}": f"流水线测试{i}" for i in range(args.funds)}
+    windows = {code: [{'kind': 'full', 'start': args.start_date, 'end': args.end_date, 'missing_days': None}]
+               for code in funds}
+
+    try:
+        cleanup(fetcher)
+        start = time.perf_counter()
+        sequential_sync(fetcher, funds, windows)
+        sequential = time.perf_counter() - start
+
+        cleanup(fetcher)
+        pipeline = NavPipeline(fetcher, fetch_workers=args.fetch_workers)
+        start = time.perf_counter()
+        results = pipeline.run(funds, windows, args.end_date)
+        pipelined = time.perf_counter() - start
+        rows = sum(r['rows_written'] for r in results.values())
+
+        print(f"\n{args.funds} 个基金，共 {rows} 行，模拟延迟 {args.latency_ms}ms")
+        print(f"逐个基金:   {sequential:7.2f}s")
+        print(f"流水线:     {pipelined:7.2f}s  (加速 {sequential / pipelined:.1f}x)")
+        slowest = max(stage.busy / (args.fetch_workers if stage.name == '抓取' else 1)
+                      for stage in pipeline.stats.values())
+        print(f"最慢阶段忙碌时间（抓取按线程数折算）: {slowest:.2f}s")
+    finally:
+        cleanup(fetcher)
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
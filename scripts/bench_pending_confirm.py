@@ -0,0 +1,122 @@
+"""
+待确认交易确认基准 - 对比逐条确认（每条记录 查金额 + 查净值 + 单独事务 UPDATE）与 confirm_pending 单条语句
+写入 CONF 开头的基金代码与对应的待确认交易，结束后删除
+用法: python scripts/bench_pending_confirm.py --db-url postgresql://... --rows 5000 --user-id 1
+"""
+import argparse
+import contextlib
+import io
+import sys
+import os
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Web', 'backend'))
+
+from update_pending_transactions import PendingTransactionUpdater  # noqa: E402
+
+FUNDS = 20
+
+
+def cleanup(engine, user_id):
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM transactions WHERE user_id = :u AND fund_code LIKE 'CONF%'"), {"u": user_id})
+        conn.execute(text("DELETE FROM fund_overview WHERE user_id = :u AND fund_code LIKE 'CONF%'"), {"u": user_id})
+        conn.execute(text("DELETE FROM fund_nav_history WHERE fund_code LIKE 'CONF%'"))
+
+
+def seed(engine, user_id, rows):
+    """每个基金一段连续日期的净值，待确认记录均匀分布在这些日期上"""
+    days = [date(2020, 1, 1) + timedelta(days=i) for i in range(rows // FUNDS + 1)]
+    with engine.begin() as conn:
+        conn.execute(
+            text("""INSERT INTO fund_nav_history (fund_code, fund_name, price_date, unit_nav)
+                    SELECT 'CONF' || lpad(f::text, 3, '0'), '确认测试', d::date, 1 + f / 100.0 + extract(doy FROM d) / 1000.0
+                      FROM generate_series(0, :funds - 1) f,
+                           generate_series(CAST(:start AS date), CAST(:end AS date), interval '1 day') d"""),
+            {"funds": FUNDS, "start": days[0], "end": days[-1]},
+        )
+        conn.execute(
+            text("""INSERT INTO transactions (user_id, fund_code, fund_name, transaction_date, nav_date,
+                                              transaction_type, target_amount, note)
+                    SELECT :u, 'CONF' || lpad((i % :funds)::text, 3, '0'), '确认测试',
+                           CAST(:start AS date) + (i / :funds), CAST(:start AS date) + (i / :funds) + 1,
+                           '买入', 100, '[待确认]'
+                      FROM generate_series(0, :rows - 1) i"""),
+            {"u": user_id, "funds": FUNDS, "rows": rows, "start": days[0]},
+        )
+
+
+def confirm_row_by_row(updater):
+    """旧实现：每条记录 SELECT target_amount、最多两次净值查询、单独事务 UPDATE"""
+    with updater.engine.connect() as conn:
+        pending = conn.execute(
+            text("""SELECT transaction_id, fund_code, transaction_date, nav_date, note FROM transactions
+                     WHERE user_id = :u AND shares IS NULL ORDER BY transaction_date, transaction_id"""),
+            {"u": updater.user_id},
+        ).fetchall()
+    nav_sql = text("""SELECT fund_name, unit_nav FROM fund_nav_history
+                       WHERE fund_code = :c AND price_date = :d ORDER BY fetched_at DESC LIMIT 1""")
+    confirmed = 0
+    for tx_id, fund_code, trans_date, nav_date, note in pending:
+        with updater.engine.connect() as conn:
+            target = conn.execute(text("SELECT target_amount FROM transactions WHERE transaction_id = :t"),
+                                  {"t": tx_id}).scalar()
+        with updater.engine.connect() as conn:
+            nav = conn.execute(nav_sql, {"c": fund_code, "d": trans_date}).first()
+        if not nav:
+            with updater.engine.connect() as conn:
+                nav = conn.execute(nav_sql, {"c": fund_code, "d": nav_date}).first()
+        if target is None or not nav:
+            continue
+        shares = round(float(target) / float(nav[1]), 2)
+        with updater.engine.begin() as conn:
+            conn.execute(
+                text("""UPDATE transactions SET fund_name = :n, shares = :s, unit_nav = :v, amount = :a, note = :note
+                         WHERE transaction_id = :t"""),
+                {"n": nav[0], "s": shares, "v": nav[1], "a": round(shares * float(nav[1]), 2),
+                 "note": note.replace('[待确认]', '').strip(), "t": tx_id},
+            )
+        confirmed += 1
+    return confirmed
+
+
+def confirm_set_based(updater):
+    return sum(1 for item in updater.confirm_pending(True) if item['status'] == 'confirmed')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark row-by-row vs set-based pending confirmation")
+    parser.add_argument("--db-url", default=os.getenv('DATABASE_URL'), help="PostgreSQL URL，默认读取 DATABASE_URL")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--user-id", type=int, default=1, help="需要是已存在的用户，且没有其他待确认记录")
+    args = parser.parse_args()
+    if not args.db_url:
+        parser.error("需要 --db-url 或 DATABASE_URL")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        updater = PendingTransactionUpdater(user_id=args.user_id, db_url=args.db_url)
+    engine = updater.engine
+    timings = {}
+    try:
+        for label, func in (('逐条确认', confirm_row_by_row), ('单条语句', confirm_set_based)):
+            cleanup(engine, args.user_id)
+            seed(engine, args.user_id, args.rows)
+            start = time.perf_counter()
+            confirmed = func(updater)
+            timings[label] = time.perf_counter() - start
+            with engine.connect() as conn:
+                overview = conn.execute(
+                    text("SELECT SUM(total_shares) FROM fund_overview WHERE user_id = :u AND fund_code LIKE 'CONF%'"),
+                    {"u": args.user_id},
+                ).scalar()
+            print(f"{label}: 确认 {confirmed} 条，{timings[label]:.2f}s，持仓汇总份额 {overview}")
+    finally:
+        cleanup(engine, args.user_id)
+    print(f"加速 {timings['逐条确认'] / timings['单条语句']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
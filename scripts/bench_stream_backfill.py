@@ -0,0 +1,90 @@
+"""
+全量回填内存基准 - 对比 fetch_fund_history + save_nav_history（整段 DataFrame）与按 iter_batches 逐批写入并提交
+使用本地模拟 lsjz 服务，用 tracemalloc 统计 Python 堆峰值；写入 STRM 开头的基金代码，结束后删除
+用法: python scripts/bench_stream_backfill.py --db-url postgresql://... --start-dates 2022-01-01 2016-01-01 2010-01-01
+"""
+import argparse
+import contextlib
+import io
+import sys
+import os
+import time
+import tracemalloc
+
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Web', 'backend'))
+
+from bulk_load import bulk_upsert  # noqa: E402
+from fetch_history_nav import HistoryNavFetcher, normalize_nav_frame  # noqa: E402
+from fundSpider.fake_server import start_fake_server  # noqa: E402
+from fundSpider.http_client import SpiderHttpClient  # noqa: E402
+from fundSpider.sources import EastmoneyNavSource  # noqa: E402
+
+FUND_CODE = 'STRM01'
+
+
+def cleanup(fetcher):
+    with fetcher.engine.begin() as conn:
+        conn.execute(text("DELETE FROM fund_nav_history WHERE fund_code LIKE 'STRM%'"))
+
+
+def full_frame(fetcher, start_date, end_date, batch_pages):
+    df = fetcher.fetch_fund_history(FUND_CODE, '回填测试', start_date, end_date)
+    return fetcher.save_nav_history(df, FUND_CODE, '回填测试')
+
+
+def streaming(fetcher, start_date, end_date, batch_pages):
+    # 每批页面解析后立即写入并提交，内存占用只与 batch_pages 有关
+    written = 0
+    for batch in fetcher.source.iter_batches(FUND_CODE, start_date, end_date, fund_name='回填测试',
+                                             batch_pages=batch_pages):
+        payloads, _ = normalize_nav_frame(batch.to_frame(), FUND_CODE, '回填测试', fetcher.data_source)
+        if not payloads:
+            continue
+        with fetcher.engine.begin() as conn:
+            result = bulk_upsert(conn, 'fund_nav_history', payloads)
+            fetcher.publish_written(conn, payloads)
+        written += result.inserted + result.updated
+    return written
+
+
+def measure(func, fetcher, start_date, end_date, batch_pages):
+    cleanup(fetcher)
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        rows = func(fetcher, start_date, end_date, batch_pages)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows, peak / 1024 / 1024, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark peak memory of full-frame vs streaming NAV backfill")
+    parser.add_argument("--db-url", default=os.getenv('DATABASE_URL'), help="PostgreSQL URL，默认读取 DATABASE_URL")
+    parser.add_argument("--start-dates", nargs='+', default=['2022-01-01', '2016-01-01', '2010-01-01'])
+    parser.add_argument("--end-date", default="2025-12-31")
+    parser.add_argument("--batch-pages", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+    if not args.db_url:
+        parser.error("需要 --db-url 或 DATABASE_URL")
+
+    server = start_fake_server(latency_ms=args.latency_ms, jitter_ms=0)
+    fetcher = HistoryNavFetcher(db_url=args.db_url)
+    fetcher.source = EastmoneyNavSource(client=SpiderHttpClient(rate_limit=None), concurrency=4, url=server.url)
+    print(f"{'起始日期':<12} {'方式':<10} {'行数':>7} {'堆峰值':>10} {'耗时':>8}")
+    try:
+        for start_date in args.start_dates:
+            for label, func in (('整段', full_frame), ('流式', streaming)):
+                rows, peak_mb, elapsed = measure(func, fetcher, start_date, args.end_date, args.batch_pages)
+                print(f"{start_date:<12} {label:<10} {rows:>7} {peak_mb:8.2f}MB {elapsed:7.2f}s")
+    finally:
+        cleanup(fetcher)
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+交易日历查询基准 - 对比逐日推移 + 字符串集合查找（旧实现）与 TradingCalendar 位图/前缀计数索引
+模拟 execute_today：每个计划逐日判断交易日，并为每个交易日计算 T+1 确认日；不访问数据库
+用法: python scripts/bench_trading_calendar.py --plans 20 --start 2024-01-01 --end 2026-10-16
+"""
+import argparse
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Web', 'backend'))
+
+from tradeDate import CN_HOLIDAYS, get_trading_calendar  # noqa: E402
+
+
+def legacy_is_trading_day(date):
+    if date.weekday() >= 5:
+        return False
+    return date.strftime('%Y-%m-%d') not in CN_HOLIDAYS
+
+
+def legacy_next_trading_day(date, offset=1):
+    current = date
+    count = 0
+    while count < offset:
+        current += timedelta(days=1)
+        if legacy_is_trading_day(current):
+            count += 1
+    return current
+
+
+def legacy_count(start, end):
+    return sum(1 for i in range((end - start).days + 1) if legacy_is_trading_day(start + timedelta(days=i)))
+
+
+def run_plans(plans, start, end, is_trading_day, next_trading_day):
+    confirms = 0
+    for _ in range(plans):
+        current = start
+        while current <= end:
+            if is_trading_day(current):
+                next_trading_day(current, 1)
+                confirms += 1
+            current += timedelta(days=1)
+    return confirms
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark day-stepping vs indexed trading calendar lookups")
+    parser.add_argument("--plans", type=int, default=20)
+    parser.add_argument("--start", default="2024-01-01")
+    parser.add_argument("--end", default="2026-10-16")
+    parser.add_argument("--count-queries", type=int, default=2000)
+    args = parser.parse_args()
+    start = datetime.strptime(args.start, '%Y-%m-%d')
+    end = datetime.strptime(args.end, '%Y-%m-%d')
+
+    _, build = timed(get_trading_calendar)
+    calendar = get_trading_calendar()
+
+    def indexed_next(date, offset):
+        return calendar.shift(date.date(), offset)
+
+    legacy, legacy_time = timed(run_plans, args.plans, start, end, legacy_is_trading_day, legacy_next_trading_day)
+    indexed, indexed_time = timed(run_plans, args.plans, start, end,
+                                  lambda d: calendar.is_trading_day(d.date()), indexed_next)
+    assert legacy == indexed
+    print(f"构建索引 {build * 1000:.1f}ms（每进程一次）")
+    print(f"{args.plans} 个每日计划 {args.start} ~ {args.end}，{legacy} 个定投日")
+    print(f"  逐日推移: {legacy_time * 1000:8.1f}ms")
+    print(f"  日历索引: {indexed_time * 1000:8.1f}ms  (加速 {legacy_time / indexed_time:.1f}x)")
+
+    spans = [(start, start + timedelta(days=30 * (i % 36 + 1))) for i in range(args.count_queries)]
+    _, legacy_time = timed(lambda: [legacy_count(a, b) for a, b in spans])
+    _, indexed_time = timed(lambda: [calendar.count(a.date(), b.date()) for a, b in spans])
+    print(f"{args.count_queries} 次区间交易日计数（30~1080 天）")
+    print(f"  逐日统计: {legacy_time * 1000:8.1f}ms")
+    print(f"  前缀计数: {indexed_time * 1000:8.1f}ms  (加速 {legacy_time / indexed_time:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
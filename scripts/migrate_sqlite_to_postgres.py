@@ -3,7 +3,7 @@ import argparse
 import sqlite3
 import sys
 from pathlib import Path
-from typing import Iterable, List, Dict, Any
+from typing import List
 import os
 
 from sqlalchemy import create_engine, text
@@ -20,19 +20,15 @@ elif db_url and db_url.startswith('postgresql://'):
     # 如果是外部 URL，添加 psycopg2 驱动
     db_url = db_url.replace('postgresql://', 'postgresql+psycopg2://')
 
-BACKEND_DIR = Path(__file__).resolve().parents[1]
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "Web" / "backend"
 if str(BACKEND_DIR) not in sys.path:
     sys.path.insert(0, str(BACKEND_DIR))
 
 from app.config import settings  # noqa: E402
+from bulk_load import bulk_upsert  # noqa: E402
 
 DEFAULT_SQLITE = (BACKEND_DIR / "ndx_users.db").resolve()
 
-def chunked(items: List[Dict[str, Any]], size: int = 2000) -> Iterable[List[Dict[str, Any]]]:
-    for idx in range(0, len(items), size):
-        yield items[idx: idx + size]
-
-
 def load_sqlite(path: Path) -> sqlite3.Connection:
     if not path.exists():
         raise FileNotFoundError(f"SQLite database not found: {path}")
@@ -81,44 +77,10 @@ def migrate_transactions(src: sqlite3.Connection, engine, user_id: int) -> int:
     total = len(rows)
     print(f"📦 准备迁移 {total} 条交易记录（user_id={user_id}）...")
 
-    payloads = [
-        {
-            "user_id": user_id,
-            "fund_code": row["fund_code"],
-            "fund_name": row["fund_name"],
-            "transaction_date": row["transaction_date"],
-            "nav_date": row["nav_date"],
-            "transaction_type": row["transaction_type"],
-            "target_amount": row["target_amount"],
-            "shares": row["shares"],
-            "unit_nav": row["unit_nav"],
-            "amount": row["amount"],
-            "note": row["note"],
-            "created_at": row["created_at"],
-        }
-        for row in rows
-    ]
-
-    insert_sql = text(
-        """
-        INSERT INTO transactions (
-            user_id, fund_code, fund_name, transaction_date, nav_date,
-            transaction_type, target_amount, shares, unit_nav, amount, note, created_at
-        ) VALUES (
-            :user_id, :fund_code, :fund_name, :transaction_date, :nav_date,
-            :transaction_type, :target_amount, :shares, :unit_nav, :amount, :note, :created_at
-        )
-        """
-    )
-
-    inserted = 0
-    print("🚀 开始插入数据...")
+    print("🚀 开始写入数据（COPY）...")
     with engine.begin() as conn:
-        for batch in chunked(payloads):
-            conn.execute(insert_sql, batch)
-            inserted += len(batch)
-            percentage = (inserted / total) * 100
-            print(f"   ⏳ 已插入 {inserted}/{total} 条交易记录 ({percentage:.1f}%)")
+        result = bulk_upsert(conn, "transactions", ({**dict(row), "user_id": user_id} for row in rows))
+    inserted = result.inserted
     print(f"✅ 交易记录迁移完成：{inserted} 条")
     return inserted
 
@@ -141,45 +103,11 @@ def migrate_nav_history(src: sqlite3.Connection, engine) -> int:
     total = len(rows)
     print(f"📦 准备迁移 {total} 条历史净值记录...")
 
-    payloads = [
-        {
-            "fund_code": row["fund_code"],
-            "fund_name": row["fund_name"],
-            "price_date": row["price_date"],
-            "unit_nav": row["unit_nav"],
-            "cumulative_nav": row["cumulative_nav"],
-            "daily_growth_rate": row["daily_growth_rate"],
-            "data_source": row["data_source"],
-            "fetched_at": row["fetched_at"],
-        }
-        for row in rows
-    ]
-
-    insert_sql = text(
-        """
-        INSERT INTO fund_nav_history (
-            fund_code, fund_name, price_date, unit_nav,
-            cumulative_nav, daily_growth_rate, data_source, fetched_at
-        ) VALUES (
-            :fund_code, :fund_name, :price_date, :unit_nav,
-            :cumulative_nav, :daily_growth_rate, :data_source, :fetched_at
-        )
-        ON CONFLICT (fund_code, price_date, data_source) DO UPDATE SET
-            unit_nav = EXCLUDED.unit_nav,
-            cumulative_nav = EXCLUDED.cumulative_nav,
-            daily_growth_rate = EXCLUDED.daily_growth_rate,
-            fetched_at = EXCLUDED.fetched_at
-        """
-    )
-
-    inserted = 0
-    print("🚀 开始插入数据...")
+    print("🚀 开始写入数据（COPY）...")
     with engine.begin() as conn:
-        for batch in chunked(payloads):
-            conn.execute(insert_sql, batch)
-            inserted += len(batch)
-            percentage = (inserted / total) * 100
-            print(f"   ⏳ 已插入 {inserted}/{total} 条历史净值 ({percentage:.1f}%)")
+        result = bulk_upsert(conn, "fund_nav_history", map(dict, rows))
+    inserted = result.inserted + result.updated
+    print(f"   新增 {result.inserted} 条，更新已存在 {result.updated} 条")
     print(f"✅ 历史净值迁移完成：{inserted} 条")
     return inserted
 
@@ -1,39 +1,129 @@
 """
 数据同步脚本 - 定期更新净值数据
 可以设置为定时任务（cron/scheduled task）
+
+流程:
+  1. 汇总所有活跃用户启用计划中的基金，每个基金只抓取一次
+  2. 按用户并行处理待确认交易（进程池，--workers 控制进程数）
+  3. 输出每个用户的耗时与行数报告
+
+用法: python scripts/sync_nav_data.py --workers 4
 """
+import argparse
+import contextlib
+import io
+import multiprocessing
 import sys
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Web', 'backend'))
 
-from fetch_history_nav import HistoryNavFetcher
-from update_pending_transactions import process_pending_records
+from fetch_history_nav import HistoryNavFetcher, list_active_users  # noqa: E402
+
+
+def confirm_user(db_url, user_id):
+    """在子进程中处理单个用户的待确认交易，输出收集到缓冲区，避免多进程日志交错"""
+    from update_pending_transactions import PendingTransactionUpdater
+
+    start = time.perf_counter()
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log):
+            updater = PendingTransactionUpdater(user_id=user_id, db_url=db_url)
+            result = updater.process_pending_records()
+        error = ''
+    except Exception as e:
+        result = {}
+        error = str(e)
+    return {
+        "user_id": user_id,
+        "seconds": time.perf_counter() - start,
+        "pending_count": result.get("pending_count", 0),
+        "success_count": result.get("success_count", 0),
+        "skip_count": result.get("skip_count", 0),
+        "deleted_count": result.get("deleted_count", 0),
+        "error": error,
+        "log": log.getvalue(),
+    }
+
+
+def confirm_all_users(db_url, user_ids, workers):
+    """按用户并行处理待确认交易
+
+    使用 spawn 启动子进程：子进程各自建立连接池，不继承父进程中已打开的数据库连接。
+    """
+    reports = {}
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=max(1, workers), mp_context=context) as pool:
+        futures = {pool.submit(confirm_user, db_url, user_id): user_id for user_id in user_ids}
+        for future in as_completed(futures):
+            user_id = futures[future]
+            try:
+                reports[user_id] = future.result()
+            except Exception as e:
+                # 子进程异常退出等情况
+                reports[user_id] = {"user_id": user_id, "seconds": 0.0, "pending_count": 0, "success_count": 0,
+                                    "skip_count": 0, "deleted_count": 0, "error": str(e), "log": ""}
+    return reports
 
-def sync_nav_data():
-    """同步所有启用计划的净值数据"""
+
+def print_report(user_ids, crawl_rows, crawl_seconds, confirm_wall, reports):
+    print(f"\n{'用户':>6} {'净值行数':>8} {'待确认':>6} {'已确认':>6} {'跳过':>6} {'删除':>6} {'确认耗时':>8}  错误")
+    for user_id in user_ids:
+        report = reports[user_id]
+        print(f"{user_id:>6} {crawl_rows.get(user_id, 0):>8} {report['pending_count']:>6} "
+              f"{report['success_count']:>6} {report['skip_count']:>6} {report['deleted_count']:>6} "
+              f"{report['seconds']:>7.2f}s  {report['error']}")
+    print(f"净值共写入 {sum(crawl_rows.values())} 行（多个用户持有的基金只计入第一个用户）")
+    confirm_seconds = sum(r['seconds'] for r in reports.values())
+    print(f"抓取耗时 {crawl_seconds:.2f}s（所有用户共享），确认耗时合计 {confirm_seconds:.2f}s，"
+          f"并行实际耗时 {confirm_wall:.2f}s")
+
+
+def sync_nav_data(workers=4, verbose=False):
+    """同步所有活跃用户启用计划的净值数据，并按用户并行更新待确认交易"""
     print(f"\n[{datetime.now()}] 开始同步净值数据...")
-    
+
     # 从环境变量获取数据库URL
     db_url = os.getenv('DATABASE_URL')
     if not db_url:
         print("错误：未设置DATABASE_URL环境变量")
         return False
-    
+
     try:
-        # 抓取最新净值（仅更新增量数据）
+        # 所有用户的基金去重后只抓取一次（仅更新增量数据）
         fetcher = HistoryNavFetcher(db_url=db_url)
-        details = fetcher.import_enabled_plans()
-        
+        user_ids = list_active_users(fetcher.engine)
+        if not user_ids:
+            print("没有活跃用户")
+            return True
+        start = time.perf_counter()
+        per_user = fetcher.import_all_users_plans()
+        crawl_seconds = time.perf_counter() - start
+
+        details = [record for records in per_user.values() for record in records]
         success_count = sum(1 for d in details if d['success'])
-        print(f"✓ 净值同步完成: {success_count}/{len(details)} 个基金成功")
-        
+        print(f"✓ 净值同步完成: {success_count}/{len(details)} 个计划成功")
+        crawl_rows = {user_id: sum(r['rows_written'] for r in records) for user_id, records in per_user.items()}
+
         # 更新待确认交易
-        print("\n更新待确认交易...")
-        process_pending_records(db_url=db_url)
+        print(f"\n并行更新 {len(user_ids)} 个用户的待确认交易（{workers} 个进程）...")
+        start = time.perf_counter()
+        reports = confirm_all_users(fetcher.db_url, user_ids, workers)
+        confirm_wall = time.perf_counter() - start
+        if verbose:
+            for user_id in user_ids:
+                print(f"\n----- 用户 {user_id} -----\n{reports[user_id]['log']}")
+        print_report(user_ids, crawl_rows, crawl_seconds, confirm_wall, reports)
+
+        failed = [user_id for user_id, report in reports.items() if report['error']]
+        if failed:
+            print(f"✗ 待确认交易更新失败的用户: {', '.join(map(str, failed))}")
+            return False
         print("✓ 待确认交易更新完成")
-        
         return True
     except Exception as e:
         print(f"✗ 同步失败: {e}")
@@ -41,6 +131,12 @@ def sync_nav_data():
         traceback.print_exc()
         return False
 
+
 if __name__ == '__main__':
-    success = sync_nav_data()
+    parser = argparse.ArgumentParser(description="Sync NAV data for all active users")
+    parser.add_argument("--workers", type=int, default=int(os.getenv('SYNC_WORKERS', '4')),
+                        help="处理待确认交易的进程数，默认读取 SYNC_WORKERS 或 4")
+    parser.add_argument("--verbose", action="store_true", help="输出每个用户的处理日志")
+    args = parser.parse_args()
+    success = sync_nav_data(workers=args.workers, verbose=args.verbose)
     sys.exit(0 if success else 1)